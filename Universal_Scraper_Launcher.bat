@@ -46,7 +46,7 @@ if errorlevel 1 (
     echo [WARNING] Some dependencies might be missing!
     echo.
     echo If the scraper fails, please run:
-    echo   pip install playwright aiohttp beautifulsoup4 tqdm aiofiles requests pillow
+    echo   pip install playwright aiohttp beautifulsoup4 tqdm requests pillow
     echo   playwright install chromium
     echo.
     pause
@@ -0,0 +1,96 @@
+"""Achieved vs target rate of the global bandwidth shaper (user-010)
+
+A local server streams files as fast as it can. They are downloaded with
+--max-rate set to 20 MB/s (1 and 8 transfers) and to 50 MB/s (16
+transfers), and the achieved total rate is compared with the target. Then
+two files from a host with share 3 and two from a host with share 1 are
+downloaded together at 16 MB/s. The weight-3 files should get about 6 MB/s
+each and finish first.
+
+    python benchmarks/bench_bandwidth.py
+
+Reference result: 20.2, 20.1 and 49.8 MB/s achieved. The share-3 files
+finished in 2.6s and the share-1 files in 3.9s.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import universal  # noqa: E402
+
+PORT = 8772
+BLOCK = os.urandom(256 * 1024)
+MB = 2 ** 20
+
+
+async def serve(request):
+    blocks = int(request.query.get('mb', '8')) * 4
+    response = web.StreamResponse(headers={'Content-Type': 'video/mp4',
+                                           'Content-Length': str(len(BLOCK) * blocks)})
+    await response.prepare(request)
+    for _ in range(blocks):
+        await response.write(BLOCK)
+    return response
+
+
+async def achieved_rate(output: Path, rate: int, transfers: int, megabytes: int) -> float:
+    universal.BANDWIDTH.configure(rate)
+    jobs = [universal.DownloadJob(url=f'http://127.0.0.1:{PORT}/file?mb={megabytes}', path=str(output / f'{i}.mp4'))
+            for i in range(transfers)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        async with universal.DownloadEngine(jobs=transfers, per_host=transfers) as engine:
+            results = await engine.run(jobs)
+    return sum(result.size for result in results) / (time.perf_counter() - started)
+
+
+async def weighted_finish_times(output: Path) -> list:
+    universal.BANDWIDTH.configure(16 * MB)
+    finished = []
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        async with universal.DownloadEngine(jobs=8, per_host=8) as engine:
+            futures = [engine.submit(universal.DownloadJob(url=f'http://{host}:{PORT}/file?mb=16',
+                                                           path=str(output / f'{host}-{i}.mp4')))
+                       for host in ('localhost', '127.0.0.1') for i in range(2)]
+            for future in asyncio.as_completed(futures):
+                result = await future
+                finished.append((time.perf_counter() - started, result.job.url.split('/')[2].split(':')[0]))
+    return finished
+
+
+async def main():
+    # localhost and 127.0.0.1 are the same server with different weights
+    universal.RATE_LIMITER.limits['127.0.0.1'] = universal.HostLimit(rate=0, share=1)
+    universal.RATE_LIMITER.limits['localhost'] = universal.HostLimit(rate=0, share=3)
+    app = web.Application()
+    app.router.add_get('/file', serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', PORT).start()
+    output = Path(tempfile.mkdtemp(prefix='bench_bandwidth_'))
+    try:
+        for rate, transfers, megabytes in ((20 * MB, 1, 64), (20 * MB, 8, 8), (50 * MB, 16, 8)):
+            achieved = await achieved_rate(output, rate, transfers, megabytes)
+            print(f"target {rate / MB:4.0f} MB/s, {transfers:2d} transfers: achieved {achieved / MB:5.2f} MB/s "
+                  f"({(achieved / rate - 1) * 100:+.1f}%)")
+            shutil.rmtree(output, ignore_errors=True)
+        for elapsed, host in await weighted_finish_times(output):
+            share = universal.RATE_LIMITER.limit_for(host).share
+            print(f"share {share:.0f} ({host}) finished after {elapsed:.2f}s")
+    finally:
+        await runner.cleanup()
+        shutil.rmtree(output, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
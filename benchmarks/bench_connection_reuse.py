@@ -0,0 +1,88 @@
+"""Connection reuse of UniversalScraper's shared aiohttp session (user-001)
+
+Starts a local aiohttp server that counts the TCP connections it accepts,
+then fetches 20 HTML pages and downloads 20 files through one scraper,
+the way a Bunkr album does. For comparison it repeats the same requests
+with a new ClientSession per request, as the scraper used to.
+
+    python benchmarks/bench_connection_reuse.py
+
+Reference result: 40 requests over 1 connection with the shared session
+(one per request before).
+"""
+import asyncio
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import universal  # noqa: E402
+
+PORT = 8765
+REQUESTS = 20
+connections = set()
+
+
+async def file_handler(request):
+    connections.add(id(request.transport))
+    return web.Response(body=b'x' * 20000, content_type='application/octet-stream')
+
+
+async def page_handler(request):
+    connections.add(id(request.transport))
+    return web.Response(text='<html><h1>album</h1></html>', content_type='text/html')
+
+
+async def shared_session(output: Path):
+    scraper = universal.UniversalScraper(output_dir=str(output))
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            for i in range(REQUESTS):
+                await scraper.fetch_page(f'http://127.0.0.1:{PORT}/page')
+                await scraper.download_file(f'http://127.0.0.1:{PORT}/file/{i}', output / f'{i}.bin')
+        finally:
+            await scraper.close_session()
+
+
+async def session_per_request(output: Path):
+    output.mkdir(parents=True, exist_ok=True)
+    for i in range(REQUESTS):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{PORT}/page') as response:
+                await response.text()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{PORT}/file/{i}') as response:
+                (output / f'{i}.bin').write_bytes(await response.read())
+
+
+async def main():
+    # Measure the transport, not the politeness delays
+    universal.RATE_LIMITER.limits['127.0.0.1'] = universal.HostLimit(rate=0)
+    app = web.Application()
+    app.router.add_get('/page', page_handler)
+    app.router.add_get('/file/{n}', file_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', PORT).start()
+    output = Path(tempfile.mkdtemp(prefix='bench_reuse_'))
+    try:
+        for label, run in (("shared session", shared_session), ("session per request", session_per_request)):
+            connections.clear()
+            started = time.perf_counter()
+            await run(output / label.replace(' ', '_'))
+            elapsed = time.perf_counter() - started
+            print(f"{label:20s} {REQUESTS * 2} requests over {len(connections)} connection(s) in {elapsed:.2f}s")
+    finally:
+        await runner.cleanup()
+        shutil.rmtree(output, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,267 @@
+"""HTTP/1.1 vs HTTP/2 downloads from one image host at high concurrency (user-012)
+
+Runs two local TLS servers that hold every request for 30ms and then send a
+120 KB image. One speaks HTTP/1.1 (aiohttp) and the other HTTP/2 (the h2
+package that httpx[http2] installs). Each sits behind a proxy that adds
+network round-trip time. 600 images are downloaded through the
+DownloadEngine with 32 slots, once per protocol, and the script reports the
+connections opened and the per-file latency.
+
+    python benchmarks/bench_http2.py [--rtt 100] [--files 600]
+
+Needs httpx[http2] and the openssl command (for a throwaway certificate).
+
+Reference result from the original change, which used a Go net/http TLS
+server behind the same delay proxy, at 100ms RTT:
+  HTTP/1.1: 33 connections, p50 161ms, p99 400ms, total 5.3s
+  HTTP/2:    2 connections, p50 246ms, p99 488ms, total 6.8s
+This script's own run at 100ms RTT (single core):
+  HTTP/1.1: 32 connections, p50 144ms, p99 394ms, total 4.8s
+  HTTP/2:    1 connection,  p50 181ms, p99 486ms, total 5.7s
+Connections drop from one per slot to one, and per-file latency rises
+because every stream shares a single TCP window.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import universal  # noqa: E402
+
+try:
+    import httpx
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    sys.exit("This benchmark needs httpx[http2]: pip install httpx[http2]")
+
+H1_PORT, H1_PROXY = 8773, 8774
+H2_PORT, H2_PROXY = 8775, 8776
+BODY = b'x' * (120 * 1024)
+SERVER_DELAY = 0.03
+connections = {'h1': set(), 'h2': 0}
+
+
+# ---- HTTP/1.1 server ----
+
+async def h1_handler(request):
+    connections['h1'].add(id(request.transport))
+    await asyncio.sleep(SERVER_DELAY)
+    return web.Response(body=BODY, content_type='image/jpeg')
+
+
+# ---- HTTP/2 server ----
+
+class H2Server(asyncio.Protocol):
+    def __init__(self):
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False,
+                                                                         header_encoding='utf-8'))
+        self.window = asyncio.Event()
+        self.transport = None
+        self.closed = False
+    
+    def connection_made(self, transport):
+        connections['h2'] += 1
+        self.transport = transport
+        self.conn.initiate_connection()
+        self.flush()
+    
+    def connection_lost(self, exc):
+        self.closed = True
+        self.window.set()
+    
+    def flush(self):
+        data = self.conn.data_to_send()
+        if data and not self.closed:
+            self.transport.write(data)
+    
+    def data_received(self, data):
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.flush()
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self.respond(event.stream_id))
+            elif isinstance(event, (h2.events.WindowUpdated, h2.events.RemoteSettingsChanged)):
+                self.window.set()
+        self.flush()
+    
+    async def respond(self, stream_id: int):
+        await asyncio.sleep(SERVER_DELAY)
+        try:
+            self.conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'image/jpeg'),
+                                               ('content-length', str(len(BODY)))])
+            offset = 0
+            while offset < len(BODY):
+                if self.closed:
+                    return
+                size = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size,
+                           len(BODY) - offset)
+                if size <= 0:
+                    # Wait for the client's WINDOW_UPDATE
+                    self.window.clear()
+                    await self.window.wait()
+                    continue
+                self.conn.send_data(stream_id, BODY[offset:offset + size])
+                offset += size
+                self.flush()
+            self.conn.end_stream(stream_id)
+            self.flush()
+        except (h2.exceptions.StreamClosedError, h2.exceptions.ProtocolError):
+            pass
+
+
+# ---- Round-trip delay proxy ----
+
+async def pipe(reader, writer, one_way: float):
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue()
+    
+    async def feed():
+        while True:
+            data = await reader.read(65536)
+            await pending.put((loop.time() + one_way, data))
+            if not data:
+                return
+    
+    async def drain():
+        while True:
+            due, data = await pending.get()
+            await asyncio.sleep(max(0, due - loop.time()))
+            if not data:
+                writer.close()
+                return
+            writer.write(data)
+            await writer.drain()
+    
+    try:
+        await asyncio.gather(feed(), drain())
+    except Exception:
+        writer.close()
+
+
+async def start_proxy(listen: int, target: int, rtt: float):
+    async def handle(client_reader, client_writer):
+        try:
+            await asyncio.sleep(rtt)    # TCP handshake
+            server_reader, server_writer = await asyncio.open_connection('127.0.0.1', target)
+            await asyncio.gather(pipe(client_reader, server_writer, rtt / 2),
+                                 pipe(server_reader, client_writer, rtt / 2), return_exceptions=True)
+        except (asyncio.CancelledError, OSError):
+            client_writer.close()
+    return await asyncio.start_server(handle, '127.0.0.1', listen)
+
+
+# ---- Benchmark ----
+
+def make_certificate(folder: Path) -> ssl.SSLContext:
+    cert, key = folder / 'cert.pem', folder / 'key.pem'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', str(key),
+                    '-out', str(cert), '-days', '1', '-subj', '/CN=localhost'],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(str(cert), str(key))
+    return context
+
+
+def untrusted_clients():
+    """Let the engine's clients accept the throwaway certificate"""
+    def h1_session(limit: int = 32, limit_per_host: int = 6):
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host,
+                                                                    ssl=False))
+    
+    def h2_client(max_connections: int = 32):
+        return httpx.AsyncClient(http2=True, verify=False, limits=httpx.Limits(max_connections=max_connections))
+    
+    universal.create_client_session = h1_session
+    universal.create_http2_client = h2_client
+
+
+async def run(http2: bool, files: int, output: Path) -> str:
+    universal.RATE_LIMITER.limits['localhost'] = universal.HostLimit(rate=0, max_concurrency=32, http2=http2)
+    universal.RATE_LIMITER.host_limits = {}
+    connections['h1'].clear()
+    connections['h2'] = 0
+    port = H2_PROXY if http2 else H1_PROXY
+    latencies = []
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        async with universal.DownloadEngine(jobs=32, per_host=8) as engine:
+            fetch = engine._fetch
+            
+            async def timed(*args):
+                begun = time.perf_counter()
+                try:
+                    return await fetch(*args)
+                finally:
+                    latencies.append(time.perf_counter() - begun)
+            
+            engine._fetch = timed
+            results = await engine.run([universal.DownloadJob(url=f'https://localhost:{port}/{i}.jpg',
+                                                              path=str(output / f'{i}.jpg'))
+                                        for i in range(files)])
+    total = time.perf_counter() - started
+    shutil.rmtree(output, ignore_errors=True)
+    latencies.sort()
+    
+    def quantile(q):
+        return latencies[int(q * (len(latencies) - 1))] * 1000
+    
+    opened = connections['h2'] if http2 else len(connections['h1'])
+    return (f"{'HTTP/2  ' if http2 else 'HTTP/1.1'} ok={sum(result.ok for result in results)} "
+            f"connections={opened:3d} p50={quantile(0.5):.0f}ms p99={quantile(0.99):.0f}ms total={total:.2f}s")
+
+
+async def main(rtt: float, files: int):
+    folder = Path(tempfile.mkdtemp(prefix='bench_http2_'))
+    try:
+        context = make_certificate(folder)
+        context.set_alpn_protocols(['http/1.1'])
+        app = web.Application()
+        app.router.add_get('/{name}', h1_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', H1_PORT, ssl_context=context).start()
+        
+        h2_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        h2_context.load_cert_chain(str(folder / 'cert.pem'), str(folder / 'key.pem'))
+        h2_context.set_alpn_protocols(['h2'])
+        h2_server = await asyncio.get_running_loop().create_server(H2Server, '127.0.0.1', H2_PORT, ssl=h2_context)
+        proxies = [await start_proxy(H1_PROXY, H1_PORT, rtt), await start_proxy(H2_PROXY, H2_PORT, rtt)]
+        
+        untrusted_clients()
+        print(f"{files} x {len(BODY) // 1024} KB, 32 slots, {rtt * 1000:.0f}ms RTT")
+        for http2 in (False, True):
+            print(await run(http2, files, folder / 'out'))
+        
+        for server in proxies + [h2_server]:
+            server.close()
+        await runner.cleanup()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt', type=float, default=100, help='Round-trip time added by the proxy in ms (default: 100)')
+    parser.add_argument('--files', type=int, default=600, help='Images to download per protocol (default: 600)')
+    args = parser.parse_args()
+    if not universal.HTTP2_AVAILABLE:
+        sys.exit("universal.py didn't find httpx[http2]")
+    asyncio.run(main(args.rtt / 1000, args.files))
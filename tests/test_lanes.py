@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+import universal
+from universal import VIDEO_LANE_THRESHOLD, DownloadEngine, DownloadJob, DownloadResult, expected_size, job_lane
+
+MB = 1024 * 1024
+
+
+@pytest.mark.parametrize('job, lane', [
+    (DownloadJob(url='https://example.com/a.jpg', path='a.jpg'), 'image'),
+    (DownloadJob(url='https://example.com/a.mp4', path='a.mp4'), 'video'),
+    (DownloadJob(url='https://example.com/a.MKV?x=1', path=''), 'video'),     # Extension from the URL
+    (DownloadJob(url='https://example.com/a', path='a.zip'), 'video'),
+    (DownloadJob(url='https://example.com/a', path='a'), 'image'),
+    # Content-Length from a HEAD request, or a size from API metadata, beats the extension
+    (DownloadJob(url='https://example.com/a.jpg', path='a.jpg', size_hint=VIDEO_LANE_THRESHOLD), 'video'),
+    (DownloadJob(url='https://example.com/a.mp4', path='a.mp4', size_hint=VIDEO_LANE_THRESHOLD - 1), 'image'),
+    # An explicit lane beats both
+    (DownloadJob(url='https://example.com/a.mp4', path='a.mp4', size_hint=50 * MB, lane='image'), 'image'),
+])
+def test_job_lane(job, lane):
+    assert job_lane(job) == lane
+
+
+def test_expected_size_prefers_the_hint():
+    assert expected_size(DownloadJob(url='', path='a.mp4', size_hint=123)) == 123
+    assert expected_size(DownloadJob(url='', path='a.jpg')) < expected_size(DownloadJob(url='', path='a.bin'))
+    assert expected_size(DownloadJob(url='', path='a.bin')) < expected_size(DownloadJob(url='', path='a.webm'))
+
+
+class FakeDownloads:
+    """Stands in for DownloadEngine._download, recording start order and concurrency per lane"""
+    
+    def __init__(self, engine: DownloadEngine, seconds: float = 0.01):
+        self.seconds = seconds
+        self.started = []
+        self.running = {'image': 0, 'video': 0}
+        self.peak = {'image': 0, 'video': 0}
+        engine._download = self.download
+    
+    async def download(self, job: DownloadJob) -> DownloadResult:
+        lane = job_lane(job)
+        self.started.append(job.path)
+        self.running[lane] += 1
+        self.peak[lane] = max(self.peak[lane], self.running[lane])
+        await asyncio.sleep(self.seconds * (10 if lane == 'video' else 1))
+        self.running[lane] -= 1
+        return DownloadResult(job, 'done')
+
+
+@pytest.fixture(autouse=True)
+def quiet_engine(monkeypatch):
+    # No session, writer thread or manifest needed for fake downloads
+    monkeypatch.setattr(universal, 'create_client_session', lambda **kwargs: None)
+    monkeypatch.setattr(DownloadEngine, 'print_host_stats', lambda self: None)
+    monkeypatch.setattr(DownloadEngine, '_report', lambda self, result: None)
+
+
+def jobs(count: int, ext: str, prefix: str = '', **kwargs) -> list:
+    return [DownloadJob(url=f'https://example.com/{prefix}{i}{ext}', path=f'{prefix}{i}{ext}', **kwargs)
+            for i in range(count)]
+
+
+def run(engine: DownloadEngine, batch: list) -> list:
+    async def go():
+        async with engine:
+            return await engine.run(batch)
+    return asyncio.run(go())
+
+
+def test_each_lane_has_its_own_workers():
+    engine = DownloadEngine(jobs=4, video_jobs=2)
+    downloads = FakeDownloads(engine)
+    
+    results = run(engine, jobs(20, '.jpg') + jobs(2, '.mp4'))
+    
+    assert all(result.ok for result in results)
+    assert downloads.peak == {'image': 4, 'video': 2}
+
+
+def test_videos_queued_first_do_not_delay_images():
+    engine = DownloadEngine(jobs=2, video_jobs=1)
+    downloads = FakeDownloads(engine)
+    
+    run(engine, jobs(5, '.mp4') + jobs(4, '.jpg'))
+    
+    # The video worker takes one video; the image workers clear the images before borrowing
+    assert sorted(downloads.started[:5]) == ['0.jpg', '0.mp4', '1.jpg', '2.jpg', '3.jpg']
+
+
+def test_sjf_runs_smallest_first_within_a_lane():
+    sizes = [9, 3, 7, 1, 5]
+    batch = [DownloadJob(url=f'https://example.com/{i}.jpg', path=f'{i}.jpg', size_hint=size * MB)
+             for i, size in enumerate(sizes)]
+    
+    sjf = DownloadEngine(jobs=1, video_jobs=1, order='sjf')
+    sjf_downloads = FakeDownloads(sjf)
+    run(sjf, batch)
+    fifo = DownloadEngine(jobs=1, video_jobs=1, order='fifo')
+    fifo_downloads = FakeDownloads(fifo)
+    run(fifo, batch)
+    
+    assert sjf_downloads.started == ['3.jpg', '1.jpg', '4.jpg', '2.jpg', '0.jpg']
+    assert fifo_downloads.started == ['0.jpg', '1.jpg', '2.jpg', '3.jpg', '4.jpg']
+
+
+def test_sjf_keeps_submission_order_for_equal_sizes():
+    engine = DownloadEngine(jobs=1, video_jobs=1, order='sjf')
+    downloads = FakeDownloads(engine)
+    
+    run(engine, jobs(5, '.jpg'))
+    
+    assert downloads.started == [f'{i}.jpg' for i in range(5)]
+
+
+@pytest.mark.parametrize('image_jobs, can_borrow', [(1, 0), (4, 2), (5, 2), (8, 4)])
+def test_image_workers_borrow_at_most_half(image_jobs, can_borrow):
+    engine = DownloadEngine(jobs=image_jobs, video_jobs=1)
+    engine.lanes['video'] = [(0, i, job, None) for i, job in enumerate(jobs(10, '.mp4'))]
+    
+    taken = []
+    while True:
+        item = engine._take('image')
+        if item is None:
+            break
+        assert item[1] is True
+        taken.append(item)
+        engine.borrowed += 1
+    
+    assert len(taken) == can_borrow
+    assert engine._take('video')[1] is False     # Video workers never count as borrowing
+    engine.borrowed -= 1
+    assert engine._take('image') is not None
+
+
+def test_borrowing_cap_holds_while_running():
+    engine = DownloadEngine(jobs=4, video_jobs=1)
+    downloads = FakeDownloads(engine)
+    
+    run(engine, jobs(8, '.mp4'))
+    
+    # One video worker plus at most two borrowing image workers
+    assert downloads.peak['video'] == 3
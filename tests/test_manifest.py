@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from universal import DownloadManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = DownloadManifest()
+    manifest.open(tmp_path / '.manifest.sqlite')
+    yield manifest
+    manifest.close()
+
+
+def download(manifest, folder, name: str, data: bytes, source: str):
+    path = folder / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    manifest.record(f'https://example.com/{name}', path, 'done', len(data), source=source)
+    return path
+
+
+def test_finished_post_is_done_while_its_files_are_intact(manifest, tmp_path):
+    folder = tmp_path / 'creator'
+    first = download(manifest, folder, 'a.jpg', b'a' * 10, 'post/1')
+    download(manifest, folder, 'b.jpg', b'b' * 20, 'post/1')
+    manifest.mark_page_done('post/1', 2)
+    
+    assert manifest.page_done('post/1', folder) == 2
+    assert manifest.page_done('post/1', tmp_path / 'elsewhere') is None
+    first.write_bytes(b'short')
+    assert manifest.page_done('post/1', folder) is None
+    first.unlink()
+    assert manifest.page_done('post/1', folder) is None
+    assert manifest.completed('https://example.com/a.jpg') is None
+    assert manifest.completed('https://example.com/b.jpg')['size'] == 20
+
+
+def test_state_round_trips(manifest):
+    assert manifest.get_state('sync:x') == {}
+    manifest.set_state('sync:x', {'newest': '12', 'pending': []})
+    assert manifest.get_state('sync:x') == {'newest': '12', 'pending': []}
+
+
+def test_broken_database_turns_the_manifest_off(manifest, tmp_path, capsys):
+    download(manifest, tmp_path, 'a.jpg', b'a' * 10, 'post/1')
+    manifest.db.execute('DROP TABLE items')
+    
+    assert manifest.completed('https://example.com/a.jpg') is None
+    assert manifest.db is None
+    assert capsys.readouterr().out.count('Download manifest error') == 1
+    
+    # From here on it behaves like --no-manifest
+    download(manifest, tmp_path, 'b.jpg', b'b' * 10, 'post/2')
+    manifest.set_state('sync:x', {'newest': '1'})
+    assert manifest.get_state('sync:x') == {}
+    assert manifest.page_done('post/2') is None
+    assert capsys.readouterr().out == ''
+
+
+def test_locked_database_turns_the_manifest_off(manifest, tmp_path, capsys):
+    manifest.db.execute('PRAGMA busy_timeout = 0')
+    other = sqlite3.connect(str(tmp_path / '.manifest.sqlite'), isolation_level=None)
+    other.execute('BEGIN EXCLUSIVE')
+    try:
+        manifest.set_state('sync:x', {'newest': '1'})
+    finally:
+        other.close()
+    
+    assert manifest.db is None
+    assert 'locked' in capsys.readouterr().out
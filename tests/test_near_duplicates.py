@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+import universal
+from universal import NEAR_DUPLICATE_DISTANCE, HashIndex, near_duplicate_clusters
+
+
+def bits(*positions) -> int:
+    return sum(1 << position for position in positions)
+
+
+def brute_force(hashes, order=None, distance=NEAR_DUPLICATE_DISTANCE):
+    """Same greedy leader clustering, comparing every pair"""
+    grouped = set()
+    clusters = []
+    for i in (range(len(hashes)) if order is None else order):
+        if i in grouped:
+            continue
+        cluster = {i} | {j for j in range(len(hashes)) if j not in grouped
+                         and bin(hashes[i] ^ hashes[j]).count('1') <= distance}
+        grouped |= cluster
+        clusters.append(cluster)
+    return clusters
+
+
+# 64 bits in 5 bands: [0, 12), [12, 25), [25, 38), [38, 51), [51, 64)
+@pytest.mark.parametrize('difference', [
+    bits(0, 1, 2, 3),           # All in one band
+    bits(0, 12, 25, 38),        # One in each of four bands, only the last agrees
+    bits(11, 24, 37, 63),       # Last bit of bands
+], ids=['one-band', 'four-bands', 'band-edges'])
+def test_distance_at_threshold_is_a_duplicate(difference):
+    base = 0x0123456789ABCDEF
+    assert near_duplicate_clusters([base, base ^ difference]) == [[0, 1]]
+
+
+@pytest.mark.parametrize('difference', [
+    bits(0, 1, 2, 3, 4),
+    bits(0, 12, 25, 38, 51),    # Every band differs
+], ids=['one-band', 'every-band'])
+def test_distance_over_threshold_is_not(difference):
+    base = 0x0123456789ABCDEF
+    assert near_duplicate_clusters([base, base ^ difference]) == [[0], [1]]
+
+
+def test_distance_parameter_changes_bands():
+    difference = bits(0, 20, 40, 60)
+    assert near_duplicate_clusters([0, difference], distance=3) == [[0], [1]]
+    assert near_duplicate_clusters([0, difference], distance=4) == [[0, 1]]
+    assert near_duplicate_clusters([0, bits(0, 1)], distance=1) == [[0], [1]]
+
+
+def test_equal_hashes_are_grouped():
+    assert near_duplicate_clusters([7, 2 ** 64 - 1, 7, 7]) == [[0, 2, 3], [1]]
+
+
+def test_chains_are_not_transitive():
+    # 0 -> 1 is 4 bits and 1 -> 2 is 4 bits, but 0 -> 2 is 8
+    hashes = [0, 0b1111, 0b11111111]
+    assert near_duplicate_clusters(hashes) == [[0, 1], [2]]
+    assert near_duplicate_clusters(hashes, order=[1, 0, 2]) == [[1, 0, 2]]
+    assert near_duplicate_clusters(hashes, order=[2, 1, 0]) == [[2, 1], [0]]
+
+
+def test_members_are_within_distance_of_their_leader():
+    rng = random.Random(1)
+    centers = [rng.getrandbits(64) for _ in range(30)]
+    hashes = []
+    for _ in range(600):
+        value = rng.choice(centers)
+        for position in rng.sample(range(64), rng.randint(0, 6)):
+            value ^= 1 << position
+        hashes.append(value)
+    order = list(range(len(hashes)))
+    rng.shuffle(order)
+    
+    clusters = near_duplicate_clusters(hashes, order)
+    
+    assert sorted(i for cluster in clusters for i in cluster) == list(range(len(hashes)))
+    for cluster in clusters:
+        assert all(bin(hashes[cluster[0]] ^ hashes[i]).count('1') <= NEAR_DUPLICATE_DISTANCE for i in cluster)
+    assert [set(cluster) for cluster in clusters] == brute_force(hashes, order)
+    leaders = [cluster[0] for cluster in clusters]
+    assert leaders == sorted(leaders, key=order.index)
+
+
+def test_crowded_band_gets_its_own_index(monkeypatch):
+    monkeypatch.setattr(universal, 'NEAR_DUPLICATE_BUCKET', 8)
+    rng = random.Random(2)
+    # Dark pictures (bottom four rows all zero), plus near copies of some that differ in those rows too
+    hashes = [value << 32 for value in rng.sample(range(1 << 32), 1000)]
+    hashes += [value ^ bits(3, 40) for value in hashes[:50]]
+    hashes += [value ^ bits(0, 1, 2, 3, 4) for value in hashes[:50]]
+    
+    index = HashIndex(sorted(set(hashes)))
+    
+    assert any(isinstance(members, HashIndex) for _, buckets in index.bands for members in buckets.values())
+    clusters = near_duplicate_clusters(hashes)
+    assert [set(cluster) for cluster in clusters] == brute_force(hashes)
+    assert clusters[:50] == [[i, 1000 + i] for i in range(50)]
+
+
+def test_shared_band_does_not_compare_every_pair(monkeypatch):
+    compared = []
+    popcount = universal.popcount
+    monkeypatch.setattr(universal, 'popcount', lambda value: compared.append(value) or popcount(value))
+    hashes = [(value << 12) | 0xABC for value in random.Random(3).sample(range(1 << 52), 5000)]
+    
+    assert len(near_duplicate_clusters(hashes)) == len(hashes)
+    assert len(compared) < 20 * len(hashes)      # Every pair would be 12.5 million
+
+
+def test_removed_hashes_are_not_found():
+    index = HashIndex([0, 0b1, 0b11, 0b111110000])
+    
+    assert index.near(0) == {0, 0b1, 0b11}
+    index.remove(0b1)
+    assert index.near(0) == {0, 0b11}
+    assert index.near(0b111110000) == {0b111110000}
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from universal import run_post_pipeline
+
+
+async def pages(*batches):
+    for batch in batches:
+        await asyncio.sleep(0)
+        yield batch
+
+
+def posts(start: int, count: int) -> list:
+    return [f'https://kemono.cr/patreon/user/1/post/{i}' for i in range(start, start + count)]
+
+
+def test_posts_come_back_in_profile_order():
+    async def download_post(post_url, header):
+        await asyncio.sleep(0.001 * (int(post_url.rsplit('/', 1)[-1]) % 3))
+        return post_url
+    
+    results = asyncio.run(run_post_pipeline(posts(1, 5), pages(posts(6, 5), posts(11, 5)), download_post,
+                                            first=3, last=12, workers=2))
+    
+    assert [(index, post_id) for index, post_id, _ in results] == [(i, str(i)) for i in range(3, 13)]
+
+
+def test_failing_post_cancels_the_rest():
+    started = []
+    
+    async def endless_pages():
+        start = 11
+        while True:
+            yield posts(start, 10)
+            start += 10
+    
+    async def download_post(post_url, header):
+        started.append(post_url)
+        if post_url.endswith('/2'):
+            raise RuntimeError("broken post")
+        await asyncio.sleep(10)
+    
+    async def run():
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(run_post_pipeline(posts(1, 10), endless_pages(), download_post, workers=2), 5)
+        assert all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+    
+    asyncio.run(run())
+    assert len(started) == 2
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import universal
+from universal import DownloadManifest, PostSync
+
+PROFILE = 'https://kemono.cr/patreon/user/1'
+
+
+@pytest.fixture(autouse=True)
+def manifest(tmp_path, monkeypatch):
+    manifest = DownloadManifest()
+    manifest.open(tmp_path / '.manifest.sqlite')
+    monkeypatch.setattr(universal, 'MANIFEST', manifest)
+    yield manifest
+    manifest.close()
+
+
+def posts(*ids) -> list:
+    return [f'{PROFILE}/post/{post_id}' for post_id in ids]
+
+
+async def pages(*batches):
+    for batch in batches:
+        yield batch
+
+
+def run_sync(*batches, listing_complete=True, failed=()):
+    """One --sync run over these listing pages, returning the posts it queued"""
+    sync = PostSync(PROFILE)
+    first, more = sync.start(batches[0], pages(*batches[1:]))
+    
+    async def collect():
+        return first + [post_url for batch in [b async for b in more] for post_url in batch]
+    
+    queued = asyncio.run(collect())
+    sync.save([(i, universal.post_id_of(url), (1, int(universal.post_id_of(url) in failed), []))
+               for i, url in enumerate(queued)], listing_complete=listing_complete)
+    return [universal.post_id_of(url) for url in queued]
+
+
+def test_second_run_only_queues_new_posts():
+    assert run_sync(posts(30, 29, 28), posts(27, 26)) == ['30', '29', '28', '27', '26']
+    assert run_sync(posts(32, 31, 30), posts(29, 28), posts(27, 26)) == ['32', '31']
+
+
+def test_pinned_old_post_does_not_end_the_sync():
+    run_sync(posts(30, 29))
+    
+    assert run_sync(posts(5, 34, 33), posts(32, 31), posts(30, 29)) == ['34', '33', '32', '31']
+
+
+def test_failed_listing_page_keeps_the_old_cursor(manifest):
+    run_sync(posts(30, 29))
+    
+    # The page with 32 and 31 didn't load
+    assert run_sync(posts(34, 33), posts(30, 29), listing_complete=False) == ['34', '33']
+    assert manifest.get_state(f'sync:{PROFILE}')['newest'] == '30'
+    
+    assert run_sync(posts(34, 33), posts(32, 31), posts(30, 29)) == ['34', '33', '32', '31']
+    assert manifest.get_state(f'sync:{PROFILE}')['newest'] == '34'
+
+
+def test_failed_listing_on_first_run_saves_no_cursor(manifest):
+    run_sync(posts(30, 29), listing_complete=False)
+    
+    assert manifest.get_state(f'sync:{PROFILE}')['newest'] == ''
+    assert run_sync(posts(30, 29), posts(28, 27)) == ['30', '29', '28', '27']
+
+
+def test_failed_posts_are_retried_next_time():
+    run_sync(posts(30, 29, 28), failed={'29'})
+    
+    assert run_sync(posts(31, 30, 29)) == ['31', '29']
@@ -0,0 +1,171 @@
+import pytest
+
+import universal
+from universal import CircuitBreaker, HostLimit, RateLimiter, RetryPolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(universal.time, 'monotonic', clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    
+    assert not breaker.record(False)
+    assert not breaker.record(False)
+    assert breaker.allow()
+    assert breaker.record(False)
+    
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+    assert breaker.opened == 1
+
+
+def test_success_resets_consecutive_failures(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(False)
+    
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+
+def test_half_open_lets_one_probe_through_after_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record(False)
+    
+    clock.now += 9.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == 'half-open'
+    assert not breaker.allow()      # Only the probe
+
+
+def test_successful_probe_closes_breaker(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record(False)
+    clock.now += 10
+    breaker.allow()
+    
+    assert not breaker.record(True)
+    assert breaker.state == 'closed'
+    assert breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_with_doubled_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, max_cooldown=30)
+    breaker.record(False)
+    
+    for cooldown in (20, 30, 30):
+        clock.now = breaker.open_until
+        assert breaker.allow()
+        assert breaker.record(False)
+        assert breaker.state == 'open'
+        assert breaker.cooldown == cooldown
+        assert breaker.open_until == clock.now + cooldown
+    
+    clock.now = breaker.open_until
+    breaker.allow()
+    breaker.record(True)
+    assert breaker.cooldown == 10
+
+
+def test_failures_while_open_do_not_extend_it(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record(False)
+    open_until = breaker.open_until
+    
+    clock.now += 5
+    assert not breaker.record(False)    # A request that was already in flight
+    assert breaker.open_until == open_until
+    assert breaker.opened == 1
+
+
+def test_retry_policy_keeps_a_breaker_per_host(clock, capsys):
+    policy = RetryPolicy(breaker_threshold=2)
+    
+    policy.record('https://a.example/1', False)
+    policy.record('https://a.example/2', False)
+    
+    assert not policy.allow('https://a.example/3')
+    assert policy.allow('https://b.example/1')
+    assert 'a.example' in capsys.readouterr().out
+
+
+def test_retry_budget_is_shared_by_the_run(capsys):
+    policy = RetryPolicy(budget=2)
+    
+    assert policy.take_retry('https://a.example/')
+    assert policy.take_retry('https://b.example/')
+    assert not policy.take_retry('https://a.example/')
+    assert not policy.take_retry('https://b.example/')
+    assert policy.denied == 2
+    assert capsys.readouterr().out.count('Retry budget') == 1
+
+
+def test_backoff_stays_within_jittered_ceiling():
+    policy = RetryPolicy(max_delay=8)
+    for attempt, ceiling in ((1, 1), (2, 2), (3, 4), (4, 8), (10, 8)):
+        delays = [policy.backoff(attempt, 1) for _ in range(50)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+
+
+def test_rate_limiter_spends_burst_then_paces(clock):
+    limiter = RateLimiter({'default': HostLimit(rate=2, burst=3)})
+    
+    assert [limiter._reserve('https://a.example/') for _ in range(3)] == [0, 0, 0]
+    assert limiter._reserve('https://a.example/') == pytest.approx(0.5)
+    assert limiter._reserve('https://a.example/') == pytest.approx(1.0)
+    assert limiter._reserve('https://b.example/') == 0    # Hosts have their own buckets
+    
+    clock.now += 1.0
+    assert limiter._reserve('https://a.example/') == pytest.approx(0.5)
+
+
+def test_rate_limiter_refill_is_capped_at_burst(clock):
+    limiter = RateLimiter({'default': HostLimit(rate=1, burst=2)})
+    limiter._reserve('a.example')
+    
+    clock.now += 60
+    assert [limiter._reserve('a.example') for _ in range(2)] == [0, 0]
+    assert limiter._reserve('a.example') == pytest.approx(1.0)
+
+
+def test_retry_after_blocks_host_even_without_rate(clock, capsys):
+    limiter = RateLimiter({'default': HostLimit(rate=0)})
+    
+    limiter.observe('https://a.example/x', 429, {'Retry-After': '30'})
+    assert limiter._reserve('https://a.example/y') == pytest.approx(30)
+    assert limiter._reserve('https://b.example/') == 0
+    
+    limiter.observe('https://a.example/x', 404, {'Retry-After': '300'})
+    clock.now += 30
+    assert limiter._reserve('https://a.example/y') == 0
+
+
+def test_longest_matching_pattern_wins_and_ignores_port():
+    limiter = RateLimiter({'default': HostLimit(rate=5), 'coomer.*': HostLimit(rate=1),
+                           'n1.coomer.*': HostLimit(rate=3)})
+    
+    assert limiter.limit_for('https://coomer.st/x').rate == 1
+    assert limiter.limit_for('https://n2.coomer.st/x').rate == 1
+    assert limiter.limit_for('https://n1.coomer.st:8443/x').rate == 3
+    assert limiter.limit_for('https://example.com/').rate == 5
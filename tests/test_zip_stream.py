@@ -0,0 +1,125 @@
+import hashlib
+import io
+import zipfile
+
+import pytest
+
+from universal import ZipStreamExtractor
+
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream, which makes zipfile put a data descriptor after every entry"""
+    
+    def __init__(self):
+        self.data = bytearray()
+    
+    def writable(self):
+        return True
+    
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+def build_zip(entries: dict, method: int, streamed: bool) -> bytes:
+    target = Unseekable() if streamed else io.BytesIO()
+    with zipfile.ZipFile(target, 'w', compression=method) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return bytes(target.data) if streamed else target.getvalue()
+
+
+def extract(data: bytes, output_dir, chunk: int = 7, expected: dict = None) -> ZipStreamExtractor:
+    extractor = ZipStreamExtractor(output_dir, expected)
+    for offset in range(0, len(data), chunk):
+        extractor.feed(data[offset:offset + chunk])
+    extractor.finish()
+    return extractor
+
+
+ENTRIES = {
+    'a.jpg': bytes(range(256)) * 40,
+    'sub/b.png': b'PK\x07\x08 looks like a descriptor ' * 50,   # Signature inside stored data
+    'empty.txt': b'',
+}
+
+
+@pytest.mark.parametrize('method', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED], ids=['stored', 'deflated'])
+@pytest.mark.parametrize('streamed', [False, True], ids=['sizes', 'descriptor'])
+def test_entries_are_extracted_and_verified(tmp_path, method, streamed):
+    data = build_zip(ENTRIES, method, streamed)
+    if streamed:
+        assert all(info.flag_bits & 0x08 for info in zipfile.ZipFile(io.BytesIO(data)).infolist())
+    
+    extractor = extract(data, tmp_path)
+    
+    assert extractor.failed == []
+    assert [name for name, _, _ in extractor.extracted] == ['a.jpg', 'b.png', 'empty.txt']
+    for name, content in ENTRIES.items():
+        filename = name.rsplit('/', 1)[-1]
+        assert (tmp_path / filename).read_bytes() == content
+        assert (filename, len(content), hashlib.sha256(content).hexdigest()) in extractor.extracted
+    assert not list(tmp_path.glob('*.part'))
+    assert (tmp_path / 'SHA256SUMS').read_text().count('\n') == 3
+
+
+def test_whole_archive_in_one_chunk(tmp_path):
+    data = build_zip(ENTRIES, zipfile.ZIP_STORED, True)
+    assert len(extract(data, tmp_path, chunk=len(data)).extracted) == 3
+
+
+def test_only_expected_entries_are_written(tmp_path):
+    content = ENTRIES['a.jpg']
+    expected = {'a.jpg': (len(content), hashlib.sha256(content).hexdigest())}
+    
+    extractor = extract(build_zip(ENTRIES, zipfile.ZIP_DEFLATED, True), tmp_path, expected=expected)
+    
+    assert [name for name, _, _ in extractor.extracted] == ['a.jpg']
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['SHA256SUMS', 'a.jpg']
+
+
+def test_expected_hash_mismatch_fails_entry(tmp_path):
+    expected = {'a.jpg': (len(ENTRIES['a.jpg']), '0' * 64)}
+    
+    extractor = extract(build_zip(ENTRIES, zipfile.ZIP_STORED, False), tmp_path, expected=expected)
+    
+    assert extractor.extracted == []
+    assert extractor.failed == [('a.jpg', 'SHA-256 mismatch')]
+    assert not (tmp_path / 'a.jpg').exists()
+    assert not (tmp_path / 'a.jpg.part').exists()
+
+
+def test_corrupted_stored_entry_fails_crc(tmp_path):
+    data = bytearray(build_zip({'a.jpg': ENTRIES['a.jpg']}, zipfile.ZIP_STORED, False))
+    data[100] ^= 0xFF
+    
+    extractor = extract(bytes(data), tmp_path)
+    
+    assert extractor.failed == [('a.jpg', 'CRC mismatch')]
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize('method', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED], ids=['stored', 'deflated'])
+@pytest.mark.parametrize('streamed', [False, True], ids=['sizes', 'descriptor'])
+def test_truncated_stream_raises_and_removes_part_file(tmp_path, method, streamed):
+    data = build_zip(ENTRIES, method, streamed)
+    second = data.index(b'PK\x03\x04', 4)
+    
+    extractor = ZipStreamExtractor(tmp_path)
+    extractor.feed(data[:second + 45])      # Cut just past the second entry's header
+    with pytest.raises(ValueError):
+        extractor.finish()
+    
+    assert [name for name, _, _ in extractor.extracted] == ['a.jpg']
+    assert not list(tmp_path.glob('*.part'))
+    assert not (tmp_path / 'b.png').exists()
+
+
+def test_stream_cut_inside_a_header_raises(tmp_path):
+    data = build_zip(ENTRIES, zipfile.ZIP_STORED, False)
+    
+    extractor = ZipStreamExtractor(tmp_path)
+    extractor.feed(data[:20])
+    with pytest.raises(ValueError):
+        extractor.finish()
+    assert extractor.extracted == []
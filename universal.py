@@ -2,7 +2,7 @@
 """
 Universal Scraper for Bunkr, Pixeldrain, and Simpcity Forums, viralthots.tv, coomer.st, Fapello, Pixhost, Kemono
 
-Requires: pip install playwright aiohttp beautifulsoup4 tqdm aiofiles requests pillow
+Requires: pip install playwright aiohttp beautifulsoup4 tqdm requests pillow
 
 Do the below AFTER you have installed the ABOVE
 
@@ -14,6 +14,21 @@ import re
 import base64
 import time
 import sys
+import json
+import heapq
+import hashlib
+import struct
+import zlib
+import random
+import shutil
+import sqlite3
+import concurrent.futures
+import queue
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from email.utils import parsedate_to_datetime
+from fnmatch import fnmatch
 from pathlib import Path
 from urllib.parse import urlparse, urljoin, parse_qs
 from typing import Optional
@@ -24,16 +39,2735 @@ from io import BytesIO
 import aiohttp
 from bs4 import BeautifulSoup
 from tqdm import tqdm
-import aiofiles
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 
 # Sync imports for forum scraper
 import requests
 from PIL import Image
 
+# Optional HTTP/2 transport: pip install httpx[http2]
+try:
+    import httpx
+    import h2  # noqa: F401 (httpx needs it for http2=True)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Optional fast checksum next to SHA-256: pip install xxhash
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Optional better compression for the page cache: pip install zstandard
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Reflinks (copy-on-write clones) for the object store, Linux only
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# ============ SHARED HTTP TRANSPORT ============
+
+def create_client_session(limit: int = 32, limit_per_host: int = 6) -> aiohttp.ClientSession:
+    """Create a long-lived aiohttp session with a pooled, keep-alive connector"""
+    connector = aiohttp.TCPConnector(
+        limit=limit,                    # Total open connections across all hosts
+        limit_per_host=limit_per_host,  # Stay polite to each CDN
+        ttl_dns_cache=300,              # Resolve each host once per 5 minutes
+        keepalive_timeout=60,           # Reuse idle connections between files
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+def create_http2_client(max_connections: int = 32) -> 'httpx.AsyncClient':
+    """Create an httpx client that multiplexes requests to each origin over one HTTP/2 connection"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                          keepalive_expiry=60)
+    return httpx.AsyncClient(http2=True, limits=limits)
+
+
+class Http2Response:
+    """aiohttp-style view of a streamed httpx response, so the engine reads both the same way"""
+    
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self.content = self
+    
+    async def iter_any(self):
+        try:
+            async for chunk in self.response.aiter_bytes():
+                yield chunk
+        except httpx.TimeoutException:
+            raise asyncio.TimeoutError()
+        except httpx.TransportError as e:
+            raise aiohttp.ClientPayloadError(f"HTTP/2 stream failed: {e}")
+
+
+class Http2Transport:
+    """HTTP/2 requests for hosts with http2 enabled in the rate limit config
+    
+    Parallel downloads from one CDN share a single connection instead of one
+    connection each. Hosts that don't negotiate h2, or whose h2 connection
+    fails, are handed back to the aiohttp HTTP/1.1 pool for the rest of the run.
+    """
+    
+    def __init__(self, rate_limiter: 'RateLimiter', max_connections: int = 32):
+        self.rate_limiter = rate_limiter
+        self.max_connections = max_connections
+        self.client = None
+        self.fallback_hosts = set()
+        self.http2_hosts = set()
+    
+    def wants(self, url: str) -> bool:
+        host = urlparse(url).netloc.lower()
+        return (HTTP2_AVAILABLE and host not in self.fallback_hosts
+                and self.rate_limiter.limit_for(host).http2)
+    
+    def _fall_back(self, host: str, reason: str):
+        if host not in self.fallback_hosts:
+            self.fallback_hosts.add(host)
+            print(f"    ⚠ {host}: {reason}, using HTTP/1.1")
+    
+    @asynccontextmanager
+    async def get(self, url: str, headers: dict, read_timeout: float):
+        """Stream a GET, translating httpx errors into the aiohttp ones the engine retries on"""
+        if self.client is None:
+            self.client = create_http2_client(self.max_connections)
+        host = urlparse(url).netloc.lower()
+        request = self.client.build_request('GET', url, headers=headers,
+                                            timeout=httpx.Timeout(30, read=read_timeout))
+        try:
+            response = await self.client.send(request, stream=True, follow_redirects=True)
+        except httpx.TimeoutException:
+            raise asyncio.TimeoutError()
+        except httpx.TransportError as e:
+            self._fall_back(host, f"HTTP/2 connection failed ({type(e).__name__})")
+            raise aiohttp.ClientConnectionError(str(e))
+        try:
+            if response.http_version == 'HTTP/2':
+                self.http2_hosts.add(host)
+            else:
+                self._fall_back(host, "server did not negotiate HTTP/2")
+            yield Http2Response(response)
+        finally:
+            await response.aclose()
+    
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+# ============ RATE LIMITING ============
+
+@dataclass
+class HostLimit:
+    """Politeness settings for one host pattern"""
+    rate: float = 5.0                       # Requests per second, refilled continuously (0 = unlimited)
+    burst: int = 5                          # Requests allowed back to back after being idle
+    max_concurrency: Optional[int] = None   # Parallel downloads cap (None = use --per-host)
+    share: float = 1.0                      # Weight of this host's transfers under --max-rate
+    http2: bool = False                     # Multiplex downloads over one HTTP/2 connection (needs httpx[http2])
+    page_ttl: float = 60                    # Seconds a cached HTML page is reused before revalidating it
+
+
+DEFAULT_RATE_LIMITS = {
+    'default': HostLimit(rate=5, burst=5),
+    'jpg*.su': HostLimit(rate=2, burst=4),          # Bans clients that hammer it
+    'pixeldrain.com': HostLimit(rate=2, burst=2),
+    'bunkr.*': HostLimit(rate=1, burst=2, page_ttl=600),   # Album pages are read several times per run
+    'coomer.*': HostLimit(rate=0.67, burst=2),
+    'kemono.*': HostLimit(rate=0.67, burst=2),
+    'fapello.com': HostLimit(rate=2, burst=2),
+    'pixhost.to': HostLimit(rate=3, burst=3, page_ttl=86400),   # Galleries don't change once posted
+}
+
+# Image CDNs that serve whole forum threads; --http2 turns HTTP/2 on for these
+HTTP2_HOSTS = ('jpg*.su', 'selti-delivery.ru', 'i.imgur.com', 'ibb.co')
+
+
+def retry_after_seconds(value) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class RateLimiter:
+    """Per-host token buckets shared by the sync scrapers and the async engine
+    
+    Host patterns use fnmatch syntax and also cover subdomains, so 'coomer.*'
+    matches n1.coomer.st. The longest matching pattern wins.
+    """
+    
+    def __init__(self, limits: dict = None):
+        self.limits = dict(limits or DEFAULT_RATE_LIMITS)
+        self.lock = threading.Lock()
+        self.buckets = {}           # host -> (tokens, last refill time)
+        self.blocked_until = {}     # host -> monotonic time set by Retry-After
+        self.host_limits = {}
+    
+    def load(self, path: str):
+        """Merge host limits from a JSON file: {"default": {...}, "hosts": {"pattern": {...}}}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        with self.lock:
+            if 'default' in config:
+                self.limits['default'] = HostLimit(**config['default'])
+            for pattern, settings in config.get('hosts', {}).items():
+                self.limits[pattern.lower()] = HostLimit(**settings)
+            self.host_limits = {}
+    
+    def enable_http2(self, patterns):
+        """Use HTTP/2 for these host patterns, keeping their other limits"""
+        with self.lock:
+            for pattern in patterns:
+                self.limits[pattern] = replace(self.limits.get(pattern, self.limits['default']), http2=True)
+            self.host_limits = {}
+    
+    def host_of(self, target: str) -> str:
+        return urlparse(target).netloc.lower() if '://' in target else target.lower()
+    
+    def limit_for(self, target: str) -> HostLimit:
+        host = self.host_of(target)
+        limit = self.host_limits.get(host)
+        if limit is None:
+            hostname = host.rsplit(':', 1)[0] if host.count(':') == 1 else host  # Patterns ignore the port
+            matches = [pattern for pattern in self.limits
+                       if pattern != 'default' and (fnmatch(hostname, pattern) or fnmatch(hostname, '*.' + pattern))]
+            limit = self.limits[max(matches, key=len)] if matches else self.limits['default']
+            self.host_limits[host] = limit
+        return limit
+    
+    def _reserve(self, target: str) -> float:
+        """Take a token for the host and return how long to wait before using it"""
+        host = self.host_of(target)
+        limit = self.limit_for(host)
+        with self.lock:
+            now = time.monotonic()
+            blocked = self.blocked_until.get(host, 0) - now
+            if not limit.rate:
+                return max(0.0, blocked)
+            tokens, last = self.buckets.get(host, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - last) * limit.rate) - 1
+            self.buckets[host] = (tokens, now)
+            delay = -tokens / limit.rate if tokens < 0 else 0.0
+            return max(delay, blocked)
+    
+    def wait(self, target: str):
+        """Block until a request to this URL/host is allowed"""
+        delay = self._reserve(target)
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def acquire(self, target: str):
+        """Async version of wait()"""
+        delay = self._reserve(target)
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def observe(self, target: str, status: int, headers, fallback: float = None):
+        """Pause the host after a 429/503, for Retry-After seconds if it sent one"""
+        if status not in (429, 503):
+            return
+        seconds = retry_after_seconds(headers.get('Retry-After'))
+        if seconds is None:
+            seconds = fallback
+        if not seconds:
+            return
+        seconds = min(seconds, 600)
+        host = self.host_of(target)
+        with self.lock:
+            self.blocked_until[host] = max(self.blocked_until.get(host, 0), time.monotonic() + seconds)
+        print(f"    ⏸ {host} asked us to slow down, pausing it for {seconds:.0f}s")
+
+
+RATE_LIMITER = RateLimiter()
+
+
+# ============ RETRY POLICY ============
+
+class CircuitBreaker:
+    """Fails requests to a host fast once it keeps erroring, then lets one probe through after a cooldown"""
+    
+    def __init__(self, threshold: int = 5, cooldown: float = 30, max_cooldown: float = 300):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = 'closed'           # 'closed', 'open' or 'half-open'
+        self.failures = 0               # Consecutive failures
+        self.open_until = 0.0
+        self.retries = 0
+        self.opened = 0
+        self.rejected = 0
+    
+    def allow(self) -> bool:
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() >= self.open_until:
+            self.state = 'half-open'    # Exactly one request probes the host
+            return True
+        self.rejected += 1
+        return False
+    
+    def record(self, healthy: bool) -> bool:
+        """Count a request outcome, returning True if it opened the breaker"""
+        if healthy:
+            self.state = 'closed'
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            return False
+        self.failures += 1
+        if self.state == 'half-open':
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        elif self.state == 'open' or self.failures < self.threshold:
+            return False
+        self.state = 'open'
+        self.open_until = time.monotonic() + self.cooldown
+        self.opened += 1
+        return True
+
+
+class RetryPolicy:
+    """Jittered backoff, a retry budget for the whole run and a circuit breaker per host
+    
+    Only server errors, timeouts and dropped connections count against a
+    host's breaker; 4xx responses and throttling mean the host is up.
+    """
+    
+    def __init__(self, budget: int = 200, max_delay: float = 60, breaker_threshold: int = 5,
+                 breaker_cooldown: float = 30):
+        self.budget = budget            # Retries allowed per run (0 = unlimited)
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.lock = threading.Lock()
+        self.breakers = {}
+        self.retries = 0
+        self.denied = 0
+    
+    def backoff(self, attempt: int, base: float) -> float:
+        """Delay before retry number attempt: exponential, with jitter so retries don't arrive in waves"""
+        ceiling = min(self.max_delay, base * 2 ** (attempt - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+    
+    def _breaker(self, target: str) -> CircuitBreaker:
+        host = RATE_LIMITER.host_of(target)
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return breaker
+    
+    def take_retry(self, target: str) -> bool:
+        """Spend one retry from the run's budget, or return False if it's used up"""
+        with self.lock:
+            if self.budget and self.retries >= self.budget:
+                if not self.denied:
+                    print(f"    ⚠ Retry budget of {self.budget} used up, failures are no longer retried")
+                self.denied += 1
+                return False
+            self.retries += 1
+            self._breaker(target).retries += 1
+            return True
+    
+    def allow(self, target: str) -> bool:
+        with self.lock:
+            return self._breaker(target).allow()
+    
+    def record(self, target: str, healthy: bool):
+        with self.lock:
+            breaker = self._breaker(target)
+            if breaker.record(healthy):
+                print(f"    ⛔ {RATE_LIMITER.host_of(target)}: {breaker.failures} failures in a row, "
+                      f"pausing it for {breaker.cooldown:.0f}s")
+    
+    def print_stats(self):
+        """Summarize retries and breaker trips for the run"""
+        if not self.retries and not any(b.opened for b in self.breakers.values()):
+            return
+        budget = f" of {self.budget}" if self.budget else ""
+        print(f"\n🔁 Retries: {self.retries}{budget} used" + (f", {self.denied} denied" if self.denied else ""))
+        for host, breaker in sorted(self.breakers.items()):
+            if breaker.retries or breaker.opened:
+                print(f"  {host}: {breaker.retries} retries, breaker opened {breaker.opened}x, "
+                      f"{breaker.rejected} requests failed fast ({breaker.state})")
+
+
+RETRY_POLICY = RetryPolicy()
+
+
+class BandwidthFlow:
+    """One transfer's claim on the shared bandwidth"""
+    
+    def __init__(self, weight: float):
+        self.weight = max(0.01, weight)
+        self.next_time = 0.0
+        self.last_active = time.monotonic()
+
+
+class BandwidthShaper:
+    """Global byte-rate limit shared by every transfer (--max-rate)
+    
+    Chunks reserve bytes from one token bucket and only sleep once the debt is
+    worth more than a few milliseconds, so there is no per-chunk latency. While
+    several flows are receiving data, each is paced at its weighted share of
+    the rate; flows that stall for a second stop counting towards the split.
+    """
+    
+    def __init__(self, rate: int = 0):
+        self.lock = threading.Lock()
+        self.flows = set()
+        self.configure(rate)
+    
+    def configure(self, rate: int):
+        """Set the limit in bytes per second (0 disables shaping)"""
+        with self.lock:
+            self.rate = max(0, rate)
+            self.burst = max(256 * 1024, self.rate // 10)
+            self.tokens = float(self.burst)
+            self.last = time.monotonic()
+    
+    def open_flow(self, weight: float = 1.0) -> BandwidthFlow:
+        flow = BandwidthFlow(weight)
+        with self.lock:
+            self.flows.add(flow)
+        return flow
+    
+    def close_flow(self, flow: BandwidthFlow):
+        with self.lock:
+            self.flows.discard(flow)
+    
+    def _reserve(self, num_bytes: int, flow: BandwidthFlow) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate) - num_bytes
+            self.last = now
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            
+            flow.last_active = now
+            active_weight = sum(f.weight for f in self.flows if now - f.last_active < 1.0)
+            if active_weight > flow.weight:
+                # Allow a little catch-up so scheduling jitter doesn't cost throughput
+                start = max(flow.next_time, now - 0.05)
+                flow.next_time = start + num_bytes / (self.rate * flow.weight / active_weight)
+                delay = max(delay, flow.next_time - now)
+            return delay
+    
+    async def throttle(self, num_bytes: int, flow: BandwidthFlow):
+        """Account for a received chunk, sleeping if the transfer is ahead of its budget"""
+        if not self.rate:
+            return
+        delay = self._reserve(num_bytes, flow)
+        if delay > 0.005:
+            await asyncio.sleep(delay)
+
+
+BANDWIDTH = BandwidthShaper()
+
+
+# ============ SHARED DOWNLOAD ENGINE ============
+
+def format_size(num_bytes: int) -> str:
+    """Format a byte count the way the download output shows it"""
+    size_kb = num_bytes / 1024
+    if size_kb > 1024:
+        return f"{size_kb / 1024:.2f} MB"
+    return f"{size_kb:.1f} KB"
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as '512K', '50M' or '1.5G' into bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    multiplier = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[match.group(2).upper()]
+    return int(float(match.group(1)) * multiplier)
+
+
+@dataclass
+class DownloadJob:
+    """A single file for the download engine to fetch"""
+    url: str
+    path: str
+    headers: dict = field(default_factory=dict)
+    label: str = ""
+    min_size: int = 1               # Smaller downloads are deleted and count as failed
+    min_remote_size: int = 0        # Skip without downloading if Content-Length is below this
+    reject_html: bool = True        # An HTML response means an error page, not the file
+    skip_existing: bool = True      # Keep files that are already complete on disk
+    timeout: int = 60               # Seconds without data before an attempt is abandoned
+    retries: Optional[int] = None   # Override the engine's attempt count
+    expected_sha256: str = ""       # Known hash from the host; a mismatch counts as a corrupt download
+    expected_size: int = 0          # Exact size from the host's metadata; other sizes are incomplete
+    share: Optional[float] = None   # Bandwidth weight under --max-rate (default: the host's share)
+    size_hint: int = 0              # Expected size from HEAD or API metadata (0 if unknown)
+    lane: str = ""                  # 'image' or 'video' (default: guessed from size_hint and extension)
+    source: str = ""                # Page the file was found on, kept in the manifest
+
+
+# Jobs at least this big (or with these extensions when the size is unknown) use the video lane
+VIDEO_LANE_THRESHOLD = 20 * 1024 * 1024
+VIDEO_EXTENSIONS = ('.mp4', '.m4v', '.mov', '.webm', '.mkv', '.avi', '.wmv', '.flv', '.ts',
+                    '.zip', '.rar', '.7z')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.avif', '.jfif')
+
+
+def job_extension(job: DownloadJob) -> str:
+    ext = os.path.splitext(str(job.path))[1].lower()
+    return ext or os.path.splitext(urlparse(job.url).path)[1].lower()
+
+
+def job_lane(job: DownloadJob) -> str:
+    """Pick the lane for a job: an explicit lane, then its size hint, then its extension"""
+    if job.lane:
+        return job.lane
+    if job.size_hint:
+        return 'video' if job.size_hint >= VIDEO_LANE_THRESHOLD else 'image'
+    return 'video' if job_extension(job) in VIDEO_EXTENSIONS else 'image'
+
+
+def expected_size(job: DownloadJob) -> int:
+    """Best guess at a job's size in bytes, used to order jobs within a lane"""
+    if job.size_hint:
+        return job.size_hint
+    ext = job_extension(job)
+    if ext in IMAGE_EXTENSIONS:
+        return 512 * 1024
+    if ext in VIDEO_EXTENSIONS:
+        return 200 * 1024 * 1024
+    return 5 * 1024 * 1024
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a DownloadJob"""
+    job: DownloadJob
+    status: str                     # 'done', 'exists', 'linked', 'skipped' or 'failed'
+    size: int = 0
+    error: str = ""
+    sha256: str = ""                # Computed while downloading ('done'), known beforehand ('linked')
+    xxh64: str = ""                 # Only when xxhash is installed
+    etag: str = ""                  # Server's ETag for the downloaded file, if any
+    
+    @property
+    def ok(self) -> bool:
+        return self.status in ('done', 'exists', 'linked')
+
+
+class RetryableDownloadError(Exception):
+    """Transient failure (429, 5xx) that is worth another attempt"""
+
+
+class ServerError(RetryableDownloadError):
+    """5xx response, counted against the host's circuit breaker"""
+
+
+class FileHasher:
+    """Checksums of a file, fed the same buffers that are written to disk"""
+    
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.xxh64 = xxhash.xxh64() if XXHASH_AVAILABLE else None
+    
+    def update(self, data):
+        self.sha256.update(data)
+        if self.xxh64 is not None:
+            self.xxh64.update(data)
+    
+    def digests(self) -> dict:
+        return {'sha256': self.sha256.hexdigest(),
+                'xxh64': self.xxh64.hexdigest() if self.xxh64 is not None else ""}
+
+
+def hash_file(path: Path, length: int = None, hasher: FileHasher = None) -> FileHasher:
+    """Feed the first length bytes of a file (all of it by default) to a hasher"""
+    hasher = hasher or FileHasher()
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(1024 * 1024 if remaining is None else min(1024 * 1024, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return hasher
+
+
+def sha256_from_url(url: str) -> str:
+    """The SHA-256 in content-addressed paths like /data/ab/cd/<sha256>.jpg (Kemono, Coomer)"""
+    match = re.search(r'/([0-9a-f]{64})(?:\.[A-Za-z0-9]+)?$', urlparse(url).path)
+    return match.group(1) if match else ""
+
+
+class DiskWriter:
+    """Dedicated thread that performs every file write for the download engine
+    
+    Downloads copy network chunks into preallocated buffers from a fixed pool.
+    Full buffers are queued here and written in one call, so the event loop
+    never touches the disk and writes are large instead of one per chunk.
+    """
+    
+    def __init__(self, buffers: int = 16, buffer_size: int = 512 * 1024):
+        self.buffer_size = buffer_size
+        self.free_buffers = asyncio.Queue()
+        for _ in range(buffers):
+            self.free_buffers.put_nowait(bytearray(buffer_size))
+        # Queued writes each hold a pool buffer and each open sink queues one close,
+        # and the engine sizes the pool above its stream count, so this never fills
+        self.ops = queue.Queue(maxsize=buffers * 2)
+        self.thread = threading.Thread(target=self._run, name="download-writer", daemon=True)
+        self.thread.start()
+    
+    def _run(self):
+        while True:
+            op = self.ops.get()
+            if op is None:
+                return
+            action, sink, buffer, length, offset, loop, future = op
+            error = None
+            try:
+                if action == 'write':
+                    data = memoryview(buffer)[:length]
+                    if sink.hasher is not None:
+                        sink.hasher.update(data)
+                    sink.file.seek(offset)
+                    sink.file.write(data)
+                else:
+                    sink.file.close()
+            except Exception as e:
+                error = e
+            loop.call_soon_threadsafe(self._settle, buffer, future, error)
+    
+    def _settle(self, buffer, future, error):
+        if buffer is not None:
+            self.free_buffers.put_nowait(buffer)
+        if not future.done():
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+    
+    def submit(self, action: str, sink, buffer=None, length: int = 0, offset: int = 0) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.ops.put_nowait((action, sink, buffer, length, offset, loop, future))
+        return future
+    
+    async def stop(self):
+        self.ops.put_nowait(None)
+        await asyncio.get_running_loop().run_in_executor(None, self.thread.join)
+
+
+class FileSink:
+    """Buffered writer for one file (or one segment of it) at a starting offset
+    
+    A hasher, if given, sees every buffer on the writer thread just before it's
+    written, so a sequential download is checksummed without reading it back.
+    """
+    
+    def __init__(self, writer: DiskWriter, path: Path, offset: int = 0, truncate: bool = False,
+                 hasher: FileHasher = None):
+        self.writer = writer
+        self.file = open(path, 'wb' if truncate else 'r+b', buffering=0)
+        self.offset = offset
+        self.hasher = hasher
+        self.buffer = None
+        self.view = None
+        self.filled = 0
+        self.pending = []
+    
+    async def write(self, chunk: bytes):
+        data = memoryview(chunk)
+        while data:
+            if self.buffer is None:
+                self.buffer = await self.writer.free_buffers.get()
+                self.view = memoryview(self.buffer)
+            take = min(len(data), len(self.buffer) - self.filled)
+            self.view[self.filled:self.filled + take] = data[:take]
+            self.filled += take
+            data = data[take:]
+            if self.filled == len(self.buffer):
+                self._flush()
+    
+    def _flush(self):
+        if not self.filled:
+            return
+        self.view.release()
+        self.pending.append(self.writer.submit('write', self, self.buffer, self.filled, self.offset))
+        self.offset += self.filled
+        self.buffer = None
+        self.view = None
+        self.filled = 0
+        # Surface write errors early instead of buffering the rest of the file
+        done = [f for f in self.pending if f.done()]
+        self.pending = [f for f in self.pending if not f.done()]
+        for future in done:
+            future.result()
+    
+    async def close(self):
+        """Write what's buffered, wait for the writer to catch up and close the file"""
+        try:
+            self._flush()
+        finally:
+            if self.buffer is not None:
+                self.view.release()
+                self.writer.free_buffers.put_nowait(self.buffer)
+                self.buffer = None
+            self.pending.append(self.writer.submit('close', self))
+            results = await asyncio.gather(*self.pending, return_exceptions=True)
+            self.pending = []
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit for one host
+    
+    The limit grows by about one slot per window of healthy responses and is
+    halved on 429/5xx, timeouts, dropped connections or a sharp rise in
+    time-to-first-byte. It never leaves the 1..ceiling range.
+    """
+    
+    def __init__(self, initial: int, ceiling: int):
+        self.ceiling = max(1, ceiling)
+        self.limit = float(min(max(1, initial), self.ceiling))
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.ttfb_baseline = None       # Moving average of healthy time-to-first-byte
+        self.last_decrease = 0.0
+        self.peak = self.slots
+        self.successes = 0
+        self.throttled = 0
+        self.decreases = 0
+    
+    @property
+    def slots(self) -> int:
+        return int(self.limit + 1e-9)
+    
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.slots)
+            self.in_flight += 1
+    
+    async def __aexit__(self, *exc_info):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+    
+    def on_success(self, ttfb: float):
+        self.successes += 1
+        if self.ttfb_baseline is not None and ttfb > max(1.0, self.ttfb_baseline * 3):
+            self._decrease()
+            return
+        self.ttfb_baseline = ttfb if self.ttfb_baseline is None else 0.8 * self.ttfb_baseline + 0.2 * ttfb
+        self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+        self.peak = max(self.peak, self.slots)
+    
+    def on_throttle(self):
+        self.throttled += 1
+        self._decrease()
+    
+    def _decrease(self):
+        # Failures from one burst arrive together; only halve once per round trip
+        now = time.monotonic()
+        if now - self.last_decrease < max(0.2, 2 * (self.ttfb_baseline or 0.5)):
+            return
+        self.last_decrease = now
+        self.limit = max(1.0, self.limit / 2)
+        self.decreases += 1
+
+
+class DownloadEngine:
+    """Concurrent downloader shared by all scrapers
+    
+    Jobs are split into an image lane and a video lane (see job_lane), each with
+    its own worker pool (--jobs and --video-jobs) so a few large videos can't
+    hold up hundreds of small files; idle image workers may borrow video jobs,
+    but at least half of them stay free for images. Within a lane, jobs run in
+    submission order ('fifo') or smallest expected size first ('sjf').
+    Each host gets an adaptive slot limit that starts at per_host and can
+    grow to 4x that, and request starts go through the per-host RateLimiter.
+    Files of at least segment_threshold bytes can be split into ranged segments
+    fetched over parallel connections (opt-in with segments > 1).
+    """
+    
+    def __init__(self, jobs: int = 4, per_host: int = 2, retries: int = 3, retry_delay: float = 1,
+                 rate_limiter: RateLimiter = None, bandwidth: BandwidthShaper = None,
+                 retry_policy: RetryPolicy = None, manifest: 'DownloadManifest' = None,
+                 session: aiohttp.ClientSession = None,
+                 segments: int = 1, segment_threshold: int = 50 * 1024 * 1024,
+                 video_jobs: int = 2, order: str = 'sjf'):
+        self.jobs = max(1, jobs)
+        self.video_jobs = max(1, video_jobs)
+        self.order = order
+        self.per_host = max(1, per_host)
+        self.max_per_host = self.per_host * 4
+        self.retries = max(1, retries)
+        self.retry_delay = retry_delay
+        self.rate_limiter = rate_limiter or RATE_LIMITER
+        self.bandwidth = bandwidth or BANDWIDTH
+        self.retry_policy = retry_policy or RETRY_POLICY
+        self.manifest = manifest or MANIFEST
+        self.segments = max(1, segments)
+        self.segment_threshold = segment_threshold
+        self.session = session
+        self.owns_session = session is None
+        self.http2 = Http2Transport(self.rate_limiter)
+        self.lanes = {'image': [], 'video': []}  # Heaps of (priority, sequence, job, future)
+        self.job_ready = None
+        self.borrowed = 0                         # Image workers busy with video jobs
+        self.workers = []
+        self.host_slots = {}
+        self.writer = None
+        self.completed = 0
+        self.submitted = 0
+    
+    async def __aenter__(self):
+        self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    def start(self):
+        """Create the session (if not shared) and launch the worker pool"""
+        if self.workers:
+            return
+        if self.session is None:
+            self.session = create_client_session(limit=max(32, self.workers_total * self.segments * 2),
+                                                 limit_per_host=self.max_per_host * self.segments)
+        self.job_ready = asyncio.Event()
+        # Enough buffers for every concurrent stream to have one filling and one being written
+        self.writer = DiskWriter(buffers=self.workers_total * self.segments * 2 + 2)
+        self.workers = [asyncio.create_task(self._worker('image')) for _ in range(self.jobs)]
+        self.workers += [asyncio.create_task(self._worker('video')) for _ in range(self.video_jobs)]
+    
+    @property
+    def workers_total(self) -> int:
+        return self.jobs + self.video_jobs
+    
+    async def close(self):
+        """Stop the workers and release the session if the engine created it"""
+        if self.completed:
+            self.print_host_stats()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.writer:
+            await self.writer.stop()
+            self.writer = None
+        await self.http2.close()
+        if self.owns_session and self.session and not self.session.closed:
+            await self.session.close()
+            self.session = None
+    
+    def submit(self, job: DownloadJob) -> asyncio.Future:
+        """Queue a job and return a future that resolves to its DownloadResult"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.submitted += 1
+        # The submission counter breaks ties, so equal priorities stay in FIFO order
+        priority = expected_size(job) if self.order == 'sjf' else 0
+        heapq.heappush(self.lanes[job_lane(job)], (priority, self.submitted, job, future))
+        self.job_ready.set()
+        return future
+    
+    async def run(self, jobs: list) -> list:
+        """Download a batch of jobs concurrently, returning results in job order"""
+        return list(await asyncio.gather(*[self.submit(job) for job in jobs]))
+    
+    def _take(self, lane: str):
+        """Pop the next job for a worker of this lane, or None if it has nothing to do"""
+        if self.lanes[lane]:
+            return heapq.heappop(self.lanes[lane]), False
+        if lane == 'image' and self.lanes['video'] and self.borrowed < self.jobs // 2:
+            return heapq.heappop(self.lanes['video']), True
+        return None
+    
+    async def _worker(self, lane: str):
+        while True:
+            taken = self._take(lane)
+            if taken is None:
+                self.job_ready.clear()
+                await self.job_ready.wait()
+                continue
+            (_, _, job, future), borrowed = taken
+            self.borrowed += borrowed
+            try:
+                result = await self._download(job)
+            except Exception as e:
+                result = DownloadResult(job, 'failed', error=f"{type(e).__name__}: {e}")
+            finally:
+                if borrowed:
+                    self.borrowed -= 1
+                    self.job_ready.set()
+            self.completed += 1
+            self._report(result)
+            if self.manifest.db is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self.manifest.record_result, result)
+            if not future.done():
+                future.set_result(result)
+    
+    def _report(self, result: DownloadResult):
+        label = result.job.label or os.path.basename(str(result.job.path))
+        counter = f"[{self.completed}/{self.submitted}]"
+        if result.status == 'done':
+            print(f"    {counter} ✓ {label} ({format_size(result.size)})")
+        elif result.status == 'exists':
+            print(f"    {counter} ⊙ Exists: {label}")
+        elif result.status == 'linked':
+            print(f"    {counter} 🔗 {label} ({format_size(result.size)}, already in the object store)")
+        elif result.status == 'skipped':
+            print(f"    {counter} ⊘ Skipped {label}: {result.error}")
+        else:
+            print(f"    {counter} ✗ {label}: {result.error}")
+    
+    def _host_slot(self, host: str) -> AdaptiveConcurrency:
+        slot = self.host_slots.get(host)
+        if slot is None:
+            # A max_concurrency from the rate limit config is a hard ceiling
+            ceiling = self.rate_limiter.limit_for(host).max_concurrency or self.max_per_host
+            slot = self.host_slots[host] = AdaptiveConcurrency(self.per_host, ceiling)
+        return slot
+    
+    def print_host_stats(self):
+        """Show where each host's adaptive concurrency ended up"""
+        if not self.host_slots:
+            return
+        print("\n📈 Per-host concurrency:")
+        for host, slot in sorted(self.host_slots.items()):
+            ttfb = f"{slot.ttfb_baseline:.2f}s" if slot.ttfb_baseline is not None else "n/a"
+            protocol = " [HTTP/2]" if host in self.http2.http2_hosts else ""
+            print(f"  {host}{protocol}: {slot.slots} slots (peak {slot.peak}/{slot.ceiling}), "
+                  f"{slot.successes} ok, {slot.throttled} throttled, {slot.decreases} backoffs, ttfb {ttfb}")
+    
+    async def _download(self, job: DownloadJob) -> DownloadResult:
+        if ARCHIVE.replaying:
+            return DownloadResult(job, 'skipped', error="replaying, not downloaded")
+        path = Path(job.path)
+        if job.skip_existing and self.manifest.db is not None:
+            # Finished in an earlier run (possibly under another name) and still intact on disk
+            done = await asyncio.get_running_loop().run_in_executor(None, self.manifest.completed, job.url)
+            if done and (path.exists() or not OBJECT_STORE.holds(done['sha256'])):
+                return DownloadResult(job, 'exists', size=done['size'], sha256=done['sha256'], etag=done['etag'])
+        if job.skip_existing and path.exists():
+            size = path.stat().st_size
+            if size >= max(1, job.min_size) and (not job.expected_size or size == job.expected_size):
+                return DownloadResult(job, 'exists', size=size)
+        if OBJECT_STORE.root is not None:
+            linked = await asyncio.get_running_loop().run_in_executor(None, self._link_stored, job, path)
+            if linked:
+                return linked
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        host = urlparse(job.url).netloc.lower()
+        retries = job.retries or self.retries
+        error = ""
+        for attempt in range(retries):
+            if attempt > 0:
+                if not self.retry_policy.take_retry(host):
+                    return DownloadResult(job, 'failed', error=f"{error} (retry budget used up)")
+                wait_time = self.retry_policy.backoff(attempt, self.retry_delay)
+                label = job.label or path.name
+                print(f"    ⏳ {label}: {error}, retry {attempt}/{retries - 1} in {wait_time:.1f}s")
+                await asyncio.sleep(wait_time)
+            if not self.retry_policy.allow(host):
+                return DownloadResult(job, 'failed', error=f"{host} keeps failing, skipped (circuit open)")
+            slot = self._host_slot(host)
+            healthy = True
+            try:
+                async with slot:
+                    await self.rate_limiter.acquire(host)
+                    return await self._fetch(job, path, slot)
+            except ServerError as e:
+                healthy = False
+                error = str(e)
+            except RetryableDownloadError as e:
+                error = str(e)
+            except asyncio.TimeoutError:
+                slot.on_throttle()
+                healthy = False
+                error = "Timeout"
+            except aiohttp.ClientError as e:
+                if isinstance(e, aiohttp.ClientConnectionError):
+                    slot.on_throttle()
+                    healthy = False
+                error = type(e).__name__
+            finally:
+                self.retry_policy.record(host, healthy)
+        return DownloadResult(job, 'failed', error=f"{error} (exhausted retries)")
+    
+    async def _fetch(self, job: DownloadJob, path: Path, slot: AdaptiveConcurrency) -> DownloadResult:
+        # Data goes to <name>.part and is renamed into place only once complete.
+        # The sidecar <name>.part.meta holds the ETag/Last-Modified used for If-Range.
+        part_path = path.with_name(path.name + '.part')
+        meta_path = path.with_name(path.name + '.part.meta')
+        headers = dict(job.headers)
+        resume_from = 0
+        validator = read_part_validator(meta_path) if part_path.exists() else None
+        if validator:
+            resume_from = part_path.stat().st_size
+            if resume_from:
+                headers['Range'] = f'bytes={resume_from}-'
+                headers['If-Range'] = validator
+        
+        started = time.monotonic()
+        async with self._get(job.url, headers, job.timeout) as response:
+            ttfb = time.monotonic() - started
+            etag = response.headers.get('etag', '')
+            if response.status == 416 and resume_from:
+                # Range starts at the end: the partial file may already be the whole body
+                _, total = parse_content_range(response.headers.get('content-range', ''))
+                if total == resume_from and resume_from >= job.min_size:
+                    return await self._complete(job, path, part_path, meta_path, resume_from, etag=etag)
+                discard_part(part_path, meta_path)
+                raise RetryableDownloadError("Stale partial file")
+            if response.status == 429 or response.status >= 500:
+                slot.on_throttle()
+                self.rate_limiter.observe(job.url, response.status, response.headers)
+                if response.status >= 500:
+                    raise ServerError(f"HTTP {response.status}")
+                raise RetryableDownloadError(f"HTTP {response.status}")
+            if response.status not in (200, 206):
+                return DownloadResult(job, 'failed', error=f"HTTP {response.status}")
+            slot.on_success(ttfb)
+            
+            content_type = response.headers.get('content-type', '').lower()
+            if job.reject_html and 'text/html' in content_type:
+                return DownloadResult(job, 'failed', error="Got HTML instead of file")
+            
+            if response.status == 206:
+                start, total_size = parse_content_range(response.headers.get('content-range', ''))
+                if start != resume_from:
+                    discard_part(part_path, meta_path)
+                    raise RetryableDownloadError("Server returned the wrong range")
+            else:
+                # Full body: either no partial, or the file changed and If-Range failed
+                resume_from = 0
+                total_size = int(response.headers.get('content-length', 0) or 0)
+            
+            if job.min_remote_size and 0 < total_size < job.min_remote_size:
+                return DownloadResult(job, 'skipped', size=total_size,
+                                      error=f"Too small ({format_size(total_size)} < {format_size(job.min_remote_size)} minimum)")
+            
+            if resume_from:
+                print(f"    ↻ Resuming {job.label or path.name} at {format_size(resume_from)}")
+            elif self._can_segment(response, total_size):
+                return await self._fetch_segmented(job, path, part_path, meta_path, response, total_size)
+            else:
+                write_part_validator(meta_path, response.headers)
+            
+            # Progress bars only for large files, otherwise concurrent output gets noisy
+            pbar = None
+            if total_size > 10 * 1024 * 1024:
+                pbar = tqdm(
+                    total=total_size,
+                    initial=resume_from,
+                    unit='B',
+                    unit_scale=True,
+                    desc=f"    ↓ {path.name[:50]}",
+                    leave=False
+                )
+            
+            # A resumed file's existing bytes are read once so the checksum covers the whole file
+            hasher = FileHasher()
+            if resume_from:
+                await asyncio.get_running_loop().run_in_executor(None, hash_file, part_path, resume_from, hasher)
+            
+            # On errors the .part file is kept so the next attempt can resume it
+            bytes_downloaded = 0
+            sink = FileSink(self.writer, part_path, offset=resume_from, truncate=not resume_from, hasher=hasher)
+            flow = self.bandwidth.open_flow(self._share(job))
+            try:
+                async for chunk in response.content.iter_any():
+                    await sink.write(chunk)
+                    bytes_downloaded += len(chunk)
+                    if pbar:
+                        pbar.update(len(chunk))
+                    await self.bandwidth.throttle(len(chunk), flow)
+            finally:
+                self.bandwidth.close_flow(flow)
+                await sink.close()
+                if pbar:
+                    pbar.close()
+        
+        size = resume_from + bytes_downloaded
+        if size < job.min_size:
+            discard_part(part_path, meta_path)
+            if size == 0:
+                return DownloadResult(job, 'failed', error="Downloaded 0 bytes")
+            return DownloadResult(job, 'failed', size=size, error=f"Too small ({format_size(size)})")
+        if total_size and size < total_size:
+            raise RetryableDownloadError(f"Connection closed at {format_size(size)} of {format_size(total_size)}")
+        
+        return await self._complete(job, path, part_path, meta_path, size, hasher, etag)
+    
+    async def _complete(self, job: DownloadJob, path: Path, part_path: Path, meta_path: Path, size: int,
+                        hasher: FileHasher = None, etag: str = "") -> DownloadResult:
+        """Check a finished .part against the expected hash, then move it into place"""
+        if hasher is None:
+            # Segments arrive out of order, so those files are read back once to hash them
+            hasher = await asyncio.get_running_loop().run_in_executor(None, hash_file, part_path)
+        if job.expected_size and size != job.expected_size:
+            discard_part(part_path, meta_path)
+            raise RetryableDownloadError(f"Size mismatch ({format_size(size)}, expected {format_size(job.expected_size)})")
+        digests = hasher.digests()
+        if job.expected_sha256 and digests['sha256'] != job.expected_sha256.lower():
+            discard_part(part_path, meta_path)
+            raise RetryableDownloadError(f"SHA-256 mismatch (got {digests['sha256'][:12]}, "
+                                         f"expected {job.expected_sha256[:12].lower()})")
+        return finish_part(job, path, part_path, meta_path, size, digests, etag)
+    
+    def _link_stored(self, job: DownloadJob, path: Path) -> Optional[DownloadResult]:
+        """Link a file whose hash is known up front from the object store instead of downloading it"""
+        if OBJECT_STORE.root is None:
+            return None
+        sha256 = (job.expected_sha256 or sha256_from_url(job.url) or self.manifest.sha256_of(job.url)).lower()
+        size = OBJECT_STORE.size_of(sha256)
+        if size is None or (job.expected_size and size != job.expected_size):
+            return None
+        existed = path.exists()
+        if not OBJECT_STORE.link(sha256, path):
+            return None
+        if existed:
+            forget_checksum(path)
+        record_checksum(path, sha256)
+        return DownloadResult(job, 'linked', size=size, sha256=sha256)
+    
+    def _get(self, url: str, headers: dict, read_timeout: float):
+        """GET over HTTP/2 for hosts that have it enabled, otherwise over the aiohttp pool"""
+        if self.http2.wants(url):
+            return self.http2.get(url, headers, read_timeout)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=read_timeout)
+        return self.session.get(url, headers=headers, allow_redirects=True, timeout=timeout)
+    
+    def _share(self, job: DownloadJob) -> float:
+        """Bandwidth weight of a job under --max-rate"""
+        if job.share is not None:
+            return job.share
+        return self.rate_limiter.limit_for(job.url).share
+    
+    def _can_segment(self, response, total_size: int) -> bool:
+        """Whether a fresh 200 response is worth splitting into ranged segments"""
+        if self.segments < 2 or total_size < self.segment_threshold:
+            return False
+        if response.headers.get('Accept-Ranges', '').lower() != 'bytes':
+            return False
+        if response.headers.get('Content-Encoding', 'identity').lower() != 'identity':
+            return False
+        # Without a validator the ranges could come from different versions of the file
+        return part_validator(response.headers) is not None
+    
+    async def _fetch_segmented(self, job: DownloadJob, path: Path, part_path: Path, meta_path: Path,
+                               response, total_size: int) -> DownloadResult:
+        """Download one large file over several ranged connections into a preallocated .part"""
+        validator = part_validator(response.headers)
+        # A preallocated file can't be resumed from its size, so drop any sidecar
+        if meta_path.exists():
+            meta_path.unlink()
+        with open(part_path, 'wb') as f:
+            preallocate(f, total_size)
+        
+        segment_size = -(-total_size // self.segments)
+        segments = [{'pos': start, 'end': min(start + segment_size, total_size) - 1}
+                    for start in range(0, total_size, segment_size)]
+        print(f"    ⇶ {job.label or path.name}: {format_size(total_size)} in {len(segments)} segments")
+        
+        pbar = None
+        if total_size > 10 * 1024 * 1024:
+            pbar = tqdm(
+                total=total_size,
+                unit='B',
+                unit_scale=True,
+                desc=f"    ⇶ {path.name[:50]}",
+                leave=False
+            )
+        
+        # The first segment reads from the response that's already open.
+        # All segments share one bandwidth flow, so splitting doesn't multiply a job's share
+        flow = self.bandwidth.open_flow(self._share(job))
+        tasks = [asyncio.ensure_future(self._fetch_segment(job, part_path, segments[0], validator, pbar, flow, response))]
+        tasks += [asyncio.ensure_future(self._fetch_segment(job, part_path, segment, validator, pbar, flow))
+                  for segment in segments[1:]]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            discard_part(part_path, meta_path)
+            raise
+        finally:
+            self.bandwidth.close_flow(flow)
+            if pbar:
+                pbar.close()
+        
+        return await self._complete(job, path, part_path, meta_path, total_size,
+                                    etag=response.headers.get('etag', ''))
+    
+    async def _fetch_segment(self, job: DownloadJob, part_path: Path, segment: dict, validator: str, pbar,
+                             flow: BandwidthFlow, response=None):
+        """Fetch one byte range, resuming it from where it stopped on transient errors"""
+        error = ""
+        if response is not None:
+            try:
+                await self._write_segment(response, part_path, segment, pbar, flow)
+                self.retry_policy.record(job.url, True)
+                return
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                error = type(e).__name__
+        for attempt in range(self.retries):
+            if attempt > 0:
+                if not self.retry_policy.take_retry(job.url):
+                    break
+                await asyncio.sleep(self.retry_policy.backoff(attempt, self.retry_delay))
+            await self.rate_limiter.acquire(job.url)
+            headers = dict(job.headers)
+            headers['Range'] = f"bytes={segment['pos']}-{segment['end']}"
+            headers['If-Range'] = validator
+            try:
+                async with self._get(job.url, headers, job.timeout) as response:
+                    if response.status == 429 or response.status >= 500:
+                        self.rate_limiter.observe(job.url, response.status, response.headers)
+                        self.retry_policy.record(job.url, response.status == 429)
+                        error = f"HTTP {response.status}"
+                        continue
+                    if response.status != 206:
+                        raise RetryableDownloadError(f"Segment got HTTP {response.status}, file may have changed")
+                    start, _ = parse_content_range(response.headers.get('content-range', ''))
+                    if start != segment['pos']:
+                        raise RetryableDownloadError("Server returned the wrong range")
+                    await self._write_segment(response, part_path, segment, pbar, flow)
+                    # Successes count too, or a few blips among many segments would open the breaker
+                    self.retry_policy.record(job.url, True)
+                    return
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                self.retry_policy.record(job.url, not isinstance(e, (asyncio.TimeoutError, aiohttp.ClientConnectionError)))
+                error = type(e).__name__
+        raise RetryableDownloadError(f"Segment failed: {error}")
+    
+    async def _write_segment(self, response, part_path: Path, segment: dict, pbar, flow: BandwidthFlow):
+        """Write a response body into its slot of the preallocated file"""
+        sink = FileSink(self.writer, part_path, offset=segment['pos'])
+        try:
+            async for chunk in response.content.iter_any():
+                remaining = segment['end'] + 1 - segment['pos']
+                if len(chunk) > remaining:
+                    chunk = chunk[:remaining]
+                await sink.write(chunk)
+                segment['pos'] += len(chunk)
+                if pbar:
+                    pbar.update(len(chunk))
+                await self.bandwidth.throttle(len(chunk), flow)
+                if segment['pos'] > segment['end']:
+                    break
+        finally:
+            await sink.close()
+        if segment['pos'] <= segment['end']:
+            raise aiohttp.ClientPayloadError("Segment ended early")
+
+
+def parse_content_range(value: str) -> tuple:
+    """Parse 'bytes START-END/TOTAL' (or 'bytes */TOTAL') into (start, total)"""
+    match = re.match(r'bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)', value.strip())
+    if not match:
+        return None, 0
+    start = int(match.group(1)) if match.group(1) is not None else None
+    total = int(match.group(2)) if match.group(2) != '*' else 0
+    return start, total
+
+
+def read_part_validator(meta_path: Path) -> Optional[str]:
+    """Return the If-Range validator saved next to a partial download"""
+    try:
+        return meta_path.read_text(encoding='utf-8').strip() or None
+    except OSError:
+        return None
+
+
+def part_validator(response_headers) -> Optional[str]:
+    """Pick the If-Range validator for a response: a strong ETag, else Last-Modified"""
+    etag = response_headers.get('ETag', '')
+    # If-Range only accepts strong ETags
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response_headers.get('Last-Modified') or None
+
+
+def write_part_validator(meta_path: Path, response_headers):
+    """Remember the ETag (or Last-Modified) so a partial download can be resumed safely"""
+    validator = part_validator(response_headers)
+    if validator:
+        meta_path.write_text(validator, encoding='utf-8')
+    elif meta_path.exists():
+        meta_path.unlink()
+
+
+def preallocate(f, size: int):
+    """Reserve size bytes for a file so segments can be written at their offsets"""
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except (AttributeError, OSError):
+        f.truncate(size)
+
+
+def discard_part(part_path: Path, meta_path: Path):
+    """Remove a partial download that can't be resumed"""
+    for stale in (part_path, meta_path):
+        if stale.exists():
+            stale.unlink()
+
+
+def finish_part(job: DownloadJob, path: Path, part_path: Path, meta_path: Path, size: int,
+                digests: dict = None, etag: str = "") -> DownloadResult:
+    """Atomically move a completed .part file to its final name"""
+    os.replace(part_path, path)
+    if meta_path.exists():
+        meta_path.unlink()
+    digests = digests or {}
+    if digests.get('sha256'):
+        record_checksum(path, digests['sha256'])
+        OBJECT_STORE.adopt(path, digests['sha256'])
+    return DownloadResult(job, 'done', size=size, sha256=digests.get('sha256', ""), xxh64=digests.get('xxh64', ""),
+                          etag=etag)
+
+
+CHECKSUM_LOCK = threading.Lock()
+
+
+def read_checksums(folder: Path) -> dict:
+    """Filename -> SHA-256 from a folder's SHA256SUMS (later lines win)"""
+    checksums = {}
+    try:
+        with open(Path(folder) / 'SHA256SUMS', 'r', encoding='utf-8') as f:
+            for line in f:
+                digest, _, name = line.rstrip('\n').partition('  ')
+                if name:
+                    checksums[name] = digest
+    except OSError:
+        pass
+    return checksums
+
+
+def check_local_file(path: Path, size: int = 0, sha256: str = "", checksums: dict = None) -> str:
+    """Compare a file on disk with the host's metadata: 'missing', 'complete' or a mismatch reason
+    
+    The hash is only compared when the file is already in SHA256SUMS, so the
+    check never reads file contents.
+    """
+    if not path.exists():
+        return 'missing'
+    local_size = path.stat().st_size
+    if size and local_size != size:
+        return f"size {format_size(local_size)}, expected {format_size(size)}"
+    if not local_size:
+        return "empty file"
+    recorded = (checksums or {}).get(path.name)
+    if sha256 and recorded and recorded != sha256.lower():
+        return "SHA-256 differs from the host's"
+    return 'complete'
+
+
+def forget_checksum(path: Path):
+    """Drop a file's lines from SHA256SUMS before it is downloaded again"""
+    sums_path = path.parent / 'SHA256SUMS'
+    try:
+        with CHECKSUM_LOCK:
+            with open(sums_path, 'r', encoding='utf-8') as f:
+                lines = [line for line in f if line.rstrip('\n').partition('  ')[2] != path.name]
+            with open(sums_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+    except OSError:
+        pass
+
+
+def record_checksum(path: Path, sha256: str):
+    """Append a file's hash to SHA256SUMS in its folder (checkable with sha256sum -c)"""
+    try:
+        with CHECKSUM_LOCK, open(path.parent / 'SHA256SUMS', 'a', encoding='utf-8') as f:
+            f.write(f"{sha256}  {path.name}\n")
+    except OSError as e:
+        print(f"    ⚠ Could not record checksum for {path.name}: {e}")
+
+
+# ============ OBJECT STORE ============
+
+FICLONE = 0x40049409    # ioctl number from linux/fs.h
+
+
+def reflink(src: Path, dst: Path):
+    """Copy-on-write clone of src at dst (btrfs, XFS, ...); raises OSError where unsupported"""
+    if fcntl is None:
+        raise OSError("reflinks need Linux")
+    with open(src, 'rb') as source, open(dst, 'xb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.unlink(dst)
+            raise
+
+
+class ObjectStore:
+    """Content-addressed copies of finished downloads (<output>/.objects/ab/cd/<sha256>)
+    
+    Album, thread and post folders hold hardlinks (or reflinks where hardlinks
+    fail) to these objects, so a file found in several places takes disk space
+    once. Downloads whose hash is known before fetching (Pixeldrain metadata,
+    Kemono/Coomer URLs, the manifest) are linked instead when the store holds
+    them; the rest are deduplicated as soon as they finish. Linked copies share
+    their data, so edit a copy of a downloaded file, not the file itself.
+    Until open() is called nothing is stored or linked.
+    """
+    
+    def __init__(self):
+        self.root = None
+        self.linked = 0             # Links made instead of downloads
+        self.deduplicated = 0       # Downloads that turned out to be held already
+        self.bytes_saved = 0
+    
+    def open(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+    
+    def path_for(self, sha256: str) -> Path:
+        sha256 = sha256.lower()
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+    
+    def size_of(self, sha256: str) -> Optional[int]:
+        """Size of the stored object, None if the store doesn't hold it"""
+        if self.root is None or len(sha256 or "") != 64:
+            return None
+        try:
+            return self.path_for(sha256).stat().st_size
+        except OSError:
+            return None
+    
+    def holds(self, sha256: str) -> bool:
+        return self.size_of(sha256) is not None
+    
+    def _clone(self, src: Path, dst: Path, copy: bool = False):
+        """Hardlink, else reflink, else (only if copy) a plain copy of src at dst"""
+        try:
+            os.link(src, dst)
+        except FileExistsError:
+            raise
+        except OSError:
+            try:
+                reflink(src, dst)
+            except OSError:
+                if not copy:
+                    raise
+                shutil.copyfile(src, dst)
+    
+    def _replace_with(self, obj: Path, path: Path):
+        """Atomically point path at obj's data"""
+        temp = path.with_name(path.name + '.link')
+        if temp.exists():
+            temp.unlink()
+        self._clone(obj, temp, copy=True)
+        os.replace(temp, path)
+    
+    def link(self, sha256: str, path: Path) -> bool:
+        """Put the object with this hash at path; False if it isn't held or can't be linked"""
+        size = self.size_of(sha256)
+        if size is None:
+            return False
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._replace_with(self.path_for(sha256), path)
+        except OSError as e:
+            print(f"    ⚠ Could not link {path.name} from the object store: {e}")
+            return False
+        self.linked += 1
+        self.bytes_saved += size
+        return True
+    
+    def adopt(self, path: Path, sha256: str):
+        """Take a finished file into the store, or swap it for a link if the store already has it"""
+        if self.root is None or len(sha256 or "") != 64:
+            return
+        path = Path(path)
+        obj = self.path_for(sha256)
+        try:
+            if not obj.exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    # Shares the file's data, no copy; a plain copy would double the disk use instead
+                    self._clone(path, obj)
+                    return
+                except FileExistsError:
+                    pass            # Another worker stored the same content just now
+                except OSError as e:
+                    print(f"    ⚠ No hardlinks or reflinks here ({e}), object store turned off")
+                    self.root = None
+                    return
+            if os.path.samefile(obj, path):
+                return
+            size = path.stat().st_size
+            self._replace_with(obj, path)
+            self.deduplicated += 1
+            self.bytes_saved += size
+        except OSError as e:
+            print(f"    ⚠ Could not add {path.name} to the object store: {e}")
+    
+    def print_stats(self):
+        if self.linked or self.deduplicated:
+            print(f"🔗 Object store: {self.linked} files linked instead of downloaded, "
+                  f"{self.deduplicated} duplicates replaced by links, {format_size(self.bytes_saved)} saved")
+
+
+OBJECT_STORE = ObjectStore()
+
+
+# ============ DOWNLOAD MANIFEST ============
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    url TEXT PRIMARY KEY,
+    source TEXT NOT NULL DEFAULT '',
+    path TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL DEFAULT 0,
+    sha256 TEXT NOT NULL DEFAULT '',
+    etag TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    reason TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_source ON items (source);
+CREATE INDEX IF NOT EXISTS items_path ON items (path);
+CREATE TABLE IF NOT EXISTS pages (
+    source TEXT PRIMARY KEY,
+    folder TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    items INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class DownloadManifest:
+    """Record of everything downloaded into an output folder (<output>/.manifest.sqlite)
+    
+    One row per media URL with the page it came from, its final path, size,
+    SHA-256, ETag and status ('done', 'failed' or 'skipped' with a reason), so
+    a re-run can skip finished files before making any requests. Source pages
+    also get a row: the folder they download into (so re-runs reuse it) and,
+    for posts, whether every file finished. Scrapers can keep other state as
+    JSON (get_state/set_state). Paths are stored relative to the output
+    folder. Until open() is called every lookup misses and records are dropped,
+    and the same goes for the rest of the run once the database fails (locked
+    or corrupt), as with --no-manifest. Async code calls it through
+    run_in_executor: every query is a blocking SQLite call.
+    """
+    
+    def __init__(self):
+        self.db = None
+        self.root = None
+        self.lock = threading.Lock()
+    
+    def open(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit: each record is its own small transaction, WAL keeps those cheap
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(MANIFEST_SCHEMA)
+        self.root = path.parent.resolve()
+    
+    def close(self) -> bool:
+        """Close the database, returning False if it wasn't open"""
+        with self.lock:
+            db, self.db = self.db, None
+        if db is None:
+            return False
+        try:
+            db.close()
+        except sqlite3.Error:
+            pass
+        return True
+    
+    def _failed(self, error: sqlite3.Error):
+        if self.close():
+            print(f"    ⚠ Download manifest error: {error} (continuing without it)")
+    
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        if self.db is None:
+            return []
+        try:
+            with self.lock:
+                return self.db.execute(sql, params).fetchall() if self.db is not None else []
+        except sqlite3.Error as e:
+            self._failed(e)
+            return []
+    
+    def _execute(self, sql: str, params: tuple = ()):
+        if self.db is None:
+            return
+        try:
+            with self.lock:
+                if self.db is not None:
+                    self.db.execute(sql, params)
+        except sqlite3.Error as e:
+            self._failed(e)
+    
+    def _stored_path(self, path) -> str:
+        try:
+            return os.path.relpath(os.path.abspath(path), str(self.root))
+        except ValueError:
+            # Another drive on Windows
+            return os.path.abspath(path)
+    
+    def local_path(self, stored: str) -> Path:
+        return self.root / stored
+    
+    def _intact(self, row) -> bool:
+        try:
+            return self.local_path(row['path']).stat().st_size == row['size']
+        except OSError:
+            return False
+    
+    def completed(self, url: str):
+        """The row for a URL that finished in an earlier run and is still on disk, else None"""
+        rows = self._query("SELECT * FROM items WHERE url = ? AND status = 'done'", (url,))
+        if rows and self._intact(rows[0]):
+            return rows[0]
+        return None
+    
+    def completed_from(self, source: str):
+        """A finished, intact file found on this source page, else None"""
+        rows = self._query("SELECT * FROM items WHERE source = ? AND status = 'done'", (source,))
+        return next((row for row in rows if self._intact(row)), None)
+    
+    def sha256_of(self, url: str) -> str:
+        """SHA-256 of a URL that finished in an earlier run, even if its file is gone since"""
+        rows = self._query("SELECT sha256 FROM items WHERE url = ? AND status = 'done'", (url,))
+        return rows[0]['sha256'] if rows else ""
+    
+    def near_duplicate(self, url: str) -> bool:
+        """Whether suppress_near_duplicates removed this URL's file in an earlier run"""
+        rows = self._query("SELECT reason FROM items WHERE url = ? AND status = 'skipped'", (url,))
+        return bool(rows) and rows[0]['reason'].startswith(NEAR_DUPLICATE_REASON)
+    
+    def owner(self, path) -> Optional[str]:
+        """URL of the finished download saved at this path, if any"""
+        if self.db is None:
+            return None
+        rows = self._query("SELECT url FROM items WHERE path = ? AND status = 'done'", (self._stored_path(path),))
+        return rows[0]['url'] if rows else None
+    
+    def record(self, url: str, path, status: str, size: int = 0, sha256: str = "", etag: str = "",
+               source: str = "", reason: str = "", overwrite: bool = True):
+        """Store the outcome for a URL (overwrite=False keeps an existing row)"""
+        verb = 'INSERT OR REPLACE' if overwrite else 'INSERT OR IGNORE'
+        self._execute(f"{verb} INTO items (url, source, path, size, sha256, etag, status, reason, updated) "
+                      f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                      (url, source, self._stored_path(path) if self.db is not None else "", size, sha256, etag,
+                       status, reason, time.time()))
+    
+    def record_result(self, result: DownloadResult):
+        job = result.job
+        if result.status == 'exists':
+            # Found on disk: only fills in files that predate the manifest
+            self.record(job.url, job.path, 'done', result.size, result.sha256, result.etag, job.source,
+                        overwrite=False)
+        elif result.status == 'linked':
+            self.record(job.url, job.path, 'done', result.size, result.sha256, source=job.source)
+        else:
+            self.record(job.url, job.path, result.status, result.size, result.sha256, result.etag, job.source,
+                        result.error)
+    
+    def _page(self, source: str):
+        rows = self._query("SELECT * FROM pages WHERE source = ?", (source,))
+        return rows[0] if rows else None
+    
+    def _update_page(self, source: str, **values):
+        self._execute("INSERT OR IGNORE INTO pages (source, updated) VALUES (?, ?)", (source, time.time()))
+        assignments = ', '.join(f"{column} = ?" for column in values)
+        self._execute(f"UPDATE pages SET {assignments}, updated = ? WHERE source = ?",
+                      tuple(values.values()) + (time.time(), source))
+    
+    def folder_for(self, source: str, default: str) -> str:
+        """The folder an earlier run used for this source, or default (remembered for next time)"""
+        page = self._page(source)
+        if page and page['folder'] and self.local_path(page['folder']).is_dir():
+            folder = str(self.local_path(page['folder']))
+            print(f"📂 Continuing in {folder}")
+            return folder
+        if self.db is not None:
+            self._update_page(source, folder=self._stored_path(default))
+        return default
+    
+    def page_done(self, source: str, folder=None) -> Optional[int]:
+        """Number of files of a post that finished completely in an earlier run
+        
+        None if it didn't, or if any of its files has since gone missing,
+        changed size or (with folder) lies outside folder, so the post is
+        fetched again.
+        """
+        page = self._page(source)
+        if not page or page['status'] != 'done':
+            return None
+        rows = self._query("SELECT * FROM items WHERE source = ? AND status = 'done'", (source,))
+        if len(rows) < (page['items'] or 0) or not all(self._intact(row) for row in rows):
+            return None
+        if folder is not None:
+            root = os.path.realpath(folder)
+            try:
+                if any(os.path.commonpath([root, os.path.realpath(self.local_path(row['path']))]) != root
+                       for row in rows):
+                    return None
+            except ValueError:
+                # Another drive on Windows
+                return None
+        return page['items']
+    
+    def mark_page_done(self, source: str, items: int):
+        self._update_page(source, status='done', items=items)
+    
+    def get_state(self, key: str) -> dict:
+        """Scraper state saved under key by an earlier run ({} if none)"""
+        rows = self._query("SELECT value FROM state WHERE key = ?", (key,))
+        try:
+            return json.loads(rows[0]['value']) if rows else {}
+        except ValueError:
+            return {}
+    
+    def set_state(self, key: str, value: dict):
+        self._execute("INSERT OR REPLACE INTO state (key, value, updated) VALUES (?, ?, ?)",
+                      (key, json.dumps(value), time.time()))
+
+
+MANIFEST = DownloadManifest()
+
+
+# ============ PAGE CACHE ============
+
+PAGE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT '',
+    encoding TEXT NOT NULL DEFAULT 'utf-8',
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL
+);
+"""
+
+
+def compress_page(data: bytes) -> tuple:
+    """(codec, compressed bytes): zstd when installed, otherwise zlib"""
+    if ZSTD_AVAILABLE:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 6)
+
+
+def decompress_page(codec: str, blob: bytes) -> Optional[bytes]:
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(blob) if ZSTD_AVAILABLE else None
+    return zlib.decompress(blob)
+
+
+class CachedPage:
+    """A page served from the PageCache or the archive, with the parts of requests.Response the scrapers use"""
+    
+    def __init__(self, url: str, text: str, status_code: int = 200):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error (recorded) for url: {self.url}", response=self)
+
+
+class PageCache:
+    """On-disk cache of fetched HTML pages (<output>/.cache/pages.sqlite)
+    
+    Only 200 responses are kept, compressed, with their ETag/Last-Modified.
+    A page younger than its host's page_ttl is served without any request;
+    an older one is revalidated with If-None-Match/If-Modified-Since, so an
+    unchanged page costs a 304 instead of the whole body. Until open() is
+    called every lookup misses and nothing is stored.
+    """
+    
+    MAX_BODY = 16 * 1024 * 1024
+    
+    def __init__(self, rate_limiter: RateLimiter = None):
+        self.rate_limiter = rate_limiter or RATE_LIMITER
+        self.db = None
+        self.lock = threading.Lock()
+        self.fresh = 0              # Served without a request
+        self.revalidated = 0        # 304 Not Modified
+        self.fetched = 0            # Full downloads
+        self.bytes_saved = 0
+    
+    def open(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(PAGE_CACHE_SCHEMA)
+    
+    def close(self):
+        if self.db is not None:
+            with self.lock:
+                self.db.close()
+                self.db = None
+    
+    def _lookup(self, url: str):
+        if self.db is None:
+            return None
+        with self.lock:
+            return self.db.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+    
+    def _text(self, row) -> Optional[str]:
+        try:
+            body = decompress_page(row['codec'], row['body'])
+        except Exception:
+            return None
+        return body.decode(row['encoding'], errors='replace') if body is not None else None
+    
+    def _store(self, url: str, headers, body: bytes, encoding: str):
+        if self.db is None or len(body) > self.MAX_BODY:
+            return
+        codec, blob = compress_page(body)
+        try:
+            with self.lock:
+                self.db.execute("INSERT OR REPLACE INTO pages (url, etag, last_modified, encoding, codec, body, size, fetched) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (url, headers.get('ETag', ''), headers.get('Last-Modified', ''), encoding or 'utf-8',
+                                 codec, blob, len(body), time.time()))
+        except sqlite3.Error as e:
+            print(f"    ⚠ Could not cache {url}: {e}")
+    
+    def _touch(self, url: str):
+        with self.lock:
+            self.db.execute("UPDATE pages SET fetched = ? WHERE url = ?", (time.time(), url))
+    
+    def _cached(self, url: str):
+        """(row, text) for a usable cache entry, (None, None) otherwise"""
+        row = self._lookup(url)
+        text = self._text(row) if row is not None else None
+        return (row, text) if text is not None else (None, None)
+    
+    def _is_fresh(self, url: str, row) -> bool:
+        return time.time() - row['fetched'] < self.rate_limiter.limit_for(url).page_ttl
+    
+    def _validators(self, row) -> dict:
+        headers = {}
+        if row['etag']:
+            headers['If-None-Match'] = row['etag']
+        if row['last_modified']:
+            headers['If-Modified-Since'] = row['last_modified']
+        return headers
+    
+    def get(self, session: requests.Session, url: str, headers: dict = None, timeout: float = 30,
+            cache: bool = True):
+        """GET a page through the cache with a requests session
+        
+        Returns a CachedPage for fresh and revalidated pages, otherwise the live
+        response (only 200s are stored). cache=False always fetches and stores
+        nothing, for pages with expiring tokens. Goes through the archive under
+        --record/--replay either way.
+        """
+        if ARCHIVE.replaying:
+            status, text = ARCHIVE.load(url)
+            return CachedPage(url, text, status)
+        if cache:
+            response = self._get(session, url, headers, timeout)
+        else:
+            self.rate_limiter.wait(url)
+            response = session.get(url, headers=headers, timeout=timeout)
+        if ARCHIVE.recording:
+            ARCHIVE.save(url, response.text, status=response.status_code)
+        return response
+    
+    def _get(self, session: requests.Session, url: str, headers: dict, timeout: float):
+        row, text = self._cached(url)
+        if row is not None and self._is_fresh(url, row):
+            self.fresh += 1
+            self.bytes_saved += row['size']
+            return CachedPage(url, text)
+        request_headers = dict(headers or {})
+        if row is not None:
+            request_headers.update(self._validators(row))
+        self.rate_limiter.wait(url)
+        response = session.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and row is not None:
+            self._touch(url)
+            self.revalidated += 1
+            self.bytes_saved += row['size']
+            return CachedPage(url, text)
+        if response.status_code == 200:
+            self.fetched += 1
+            self._store(url, response.headers, response.content, response.encoding or response.apparent_encoding)
+        return response
+    
+    async def fetch_text(self, session: aiohttp.ClientSession, url: str, headers: dict = None,
+                         timeout: float = 60) -> str:
+        """Async version of get() for aiohttp; raises ClientResponseError for error statuses"""
+        if ARCHIVE.replaying:
+            status, text = ARCHIVE.load(url)
+            if status >= 400:
+                raise ReplayError(f"HTTP {status} (recorded): {url}")
+            return text
+        text = await self._fetch_text(session, url, headers, timeout)
+        ARCHIVE.save(url, text)
+        return text
+    
+    async def _fetch_text(self, session: aiohttp.ClientSession, url: str, headers: dict, timeout: float) -> str:
+        row, text = self._cached(url)
+        if row is not None and self._is_fresh(url, row):
+            self.fresh += 1
+            self.bytes_saved += row['size']
+            return text
+        request_headers = dict(headers or {})
+        if row is not None:
+            request_headers.update(self._validators(row))
+        await self.rate_limiter.acquire(url)
+        async with session.get(url, headers=request_headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status == 304 and row is not None:
+                self._touch(url)
+                self.revalidated += 1
+                self.bytes_saved += row['size']
+                return text
+            response.raise_for_status()
+            body = await response.read()
+            try:
+                encoding = response.get_encoding()
+            except Exception:
+                encoding = 'utf-8'
+            self.fetched += 1
+            self._store(url, response.headers, body, encoding)
+            return body.decode(encoding, errors='replace')
+    
+    def print_stats(self):
+        if self.fresh or self.revalidated:
+            print(f"🗄 Page cache: {self.fresh} fresh, {self.revalidated} unchanged (304), {self.fetched} downloaded, "
+                  f"{format_size(self.bytes_saved)} not re-downloaded")
+
+
+PAGE_CACHE = PageCache()
+
+
+RENDER_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rendered (
+    url TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL,
+    stored INTEGER NOT NULL,
+    render_seconds REAL NOT NULL,
+    rendered REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rendered_used ON rendered (used);
+"""
+
+
+class RenderCache:
+    """Rendered HTML of Playwright page loads (<output>/.cache/rendered.sqlite)
+    
+    Post pages are reused for post_ttl seconds, profile listings only for
+    listing_ttl since they change whenever the creator posts. Compressed
+    renders are capped at max_bytes in total, evicting the least recently
+    used first. Counts hits, misses and the browser time the hits saved.
+    Until open() is called every lookup misses and nothing is stored.
+    """
+    
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, post_ttl: float = 7 * 86400, listing_ttl: float = 600):
+        self.max_bytes = max_bytes
+        self.post_ttl = post_ttl
+        self.listing_ttl = listing_ttl
+        self.db = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0    # Render time of the pages served from the cache
+        self.seconds_spent = 0.0    # Render time of the pages rendered this run
+    
+    def open(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(RENDER_CACHE_SCHEMA)
+    
+    def close(self):
+        if self.db is not None:
+            with self.lock:
+                self.db.close()
+                self.db = None
+    
+    def get(self, url: str, max_age: float) -> Optional[str]:
+        """The cached render of url if it's younger than max_age seconds, else None"""
+        if self.db is None or max_age <= 0:
+            return None
+        with self.lock:
+            row = self.db.execute("SELECT * FROM rendered WHERE url = ?", (url,)).fetchone()
+            if row is None or time.time() - row['rendered'] > max_age:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE rendered SET used = ? WHERE url = ?", (time.time(), url))
+        try:
+            body = decompress_page(row['codec'], row['body'])
+        except Exception:
+            body = None
+        if body is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.seconds_saved += row['render_seconds']
+        return body.decode('utf-8')
+    
+    def put(self, url: str, html_content: str, render_seconds: float):
+        self.seconds_spent += render_seconds
+        if self.db is None:
+            return
+        codec, blob = compress_page(html_content.encode('utf-8'))
+        now = time.time()
+        try:
+            with self.lock:
+                self.db.execute("INSERT OR REPLACE INTO rendered (url, codec, body, stored, render_seconds, rendered, used) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)", (url, codec, blob, len(blob), render_seconds, now, now))
+                self._evict()
+        except sqlite3.Error as e:
+            print(f"    ⚠ Could not cache the render of {url}: {e}")
+    
+    def _evict(self):
+        """Drop least recently used renders until the total fits in max_bytes"""
+        total = self.db.execute("SELECT COALESCE(SUM(stored), 0) FROM rendered").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in self.db.execute("SELECT url, stored FROM rendered ORDER BY used").fetchall():
+            self.db.execute("DELETE FROM rendered WHERE url = ?", (row['url'],))
+            total -= row['stored']
+            if total <= self.max_bytes:
+                break
+    
+    def print_stats(self):
+        if self.hits or self.misses:
+            print(f"⚡ Render cache: {self.hits} hits, {self.misses} misses, saved ~{self.seconds_saved:.0f}s "
+                  f"of browser time ({self.seconds_spent:.0f}s spent rendering)")
+
+
+RENDER_CACHE = RenderCache()
+
+
+# ============ RECORD / REPLAY ARCHIVE ============
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (url, kind)
+);
+"""
+
+
+class ReplayError(requests.exceptions.ConnectionError):
+    """--replay needed a response the archive doesn't have"""
+
+
+class ResponseArchive:
+    """Every page, API response and browser render of a run (--record / --replay FILE)
+    
+    One SQLite file holding compressed bodies indexed by (url, kind): 'page'
+    for plain GETs, 'json' for API calls, 'rendered' for Playwright's DOM and
+    'capture' for the download URLs a browser session captured, since one URL
+    can answer differently to each. Recording stores what the scrapers got,
+    including pages served from the page and render caches. Replaying serves
+    it back without touching the network: no browser is started, nothing is
+    downloaded, and a request that wasn't recorded raises ReplayError.
+    """
+    
+    def __init__(self):
+        self.db = None
+        self.mode = ''              # '', 'record' or 'replay'
+        self.lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+    
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+    
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+    
+    def open(self, path, mode: str):
+        path = Path(path)
+        if mode == 'replay' and not path.is_file():
+            raise FileNotFoundError(f"No archive at {path}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(ARCHIVE_SCHEMA)
+        self.mode = mode
+    
+    def close(self):
+        if self.db is not None:
+            with self.lock:
+                self.db.close()
+                self.db = None
+    
+    def save(self, url: str, text: str, kind: str = 'page', status: int = 200):
+        if not self.recording or text is None:
+            return
+        codec, blob = compress_page(text.encode('utf-8'))
+        try:
+            with self.lock:
+                self.db.execute("INSERT OR REPLACE INTO responses (url, kind, status, codec, body, size, recorded) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)", (url, kind, status, codec, blob, len(text), time.time()))
+            self.recorded += 1
+        except sqlite3.Error as e:
+            print(f"    ⚠ Could not record {url}: {e}")
+    
+    def load(self, url: str, kind: str = 'page') -> tuple:
+        """(status, text) recorded for url; raises ReplayError if there is none"""
+        with self.lock:
+            row = self.db.execute("SELECT * FROM responses WHERE url = ? AND kind = ?", (url, kind)).fetchone()
+        body = decompress_page(row['codec'], row['body']) if row is not None else None
+        if body is None:
+            self.missing += 1
+            raise ReplayError(f"Not in the archive ({kind}): {url}")
+        self.replayed += 1
+        return row['status'], body.decode('utf-8')
+    
+    def print_stats(self):
+        if self.recording:
+            print(f"📼 Recorded {self.recorded} responses")
+        elif self.replaying:
+            print(f"📼 Replayed {self.replayed} responses, {self.missing} not in the archive")
+
+
+ARCHIVE = ResponseArchive()
+
+
+async def fetch_json(session: aiohttp.ClientSession, url: str, headers: dict = None) -> tuple:
+    """(status, parsed body or None) of an API GET, recorded or replayed by the archive"""
+    if ARCHIVE.replaying:
+        status, text = ARCHIVE.load(url, 'json')
+    else:
+        async with session.get(url, headers=headers) as response:
+            status = response.status
+            text = await response.text()
+        ARCHIVE.save(url, text, 'json', status)
+    return status, (json.loads(text) if status == 200 else None)
+
+
+def run_downloads(download_jobs: list, **engine_options) -> list:
+    """Run download jobs to completion from synchronous scraper code"""
+    async def runner():
+        async with DownloadEngine(**engine_options) as engine:
+            return await engine.run(download_jobs)
+    
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(runner())
+    
+    # Called from inside main()'s event loop: use a private loop on a helper thread
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(lambda: asyncio.run(runner())).result()
+
+
+# ============ STREAMING ZIP EXTRACTION ============
+
+class ZipStreamExtractor:
+    """Extract a zip archive from a stream of chunks as it arrives
+    
+    Only the local file headers are read, so nothing waits for the central
+    directory at the end and the archive is never held in memory or on disk.
+    Entries may be stored or deflated, with or without a data descriptor;
+    stored entries with a descriptor are ended by finding a descriptor whose
+    CRC and size match the bytes seen so far. Each entry is written to a
+    .part file, checked against its CRC-32 and hashed like engine downloads.
+    """
+    
+    LOCAL_HEADER = b'PK\x03\x04'
+    DESCRIPTOR = b'PK\x07\x08'
+    
+    def __init__(self, output_dir: Path, expected: dict = None):
+        self.output_dir = Path(output_dir)
+        self.expected = expected or {}      # filename -> (size, sha256) from the host's metadata
+        self.buffer = bytearray()
+        self.state = 'header'
+        self.entry = None
+        self.extracted = []                 # (filename, size, sha256) of every verified entry
+        self.failed = []                    # (filename, reason)
+    
+    def feed(self, data: bytes):
+        self.buffer += data
+        while self.state != 'done' and self._step():
+            pass
+    
+    def finish(self):
+        """Call after the last chunk; raises if the stream ended inside an entry"""
+        if self.state not in ('header', 'done') or (self.state == 'header' and self.buffer):
+            self.abort()
+            raise ValueError("Zip stream ended in the middle of an entry")
+    
+    def _step(self) -> bool:
+        if self.state == 'header':
+            return self._read_header()
+        if self.state == 'data':
+            return self._read_data()
+        return self._read_descriptor()
+    
+    def _read_header(self) -> bool:
+        if len(self.buffer) < 4:
+            return False
+        if self.buffer[:4] != self.LOCAL_HEADER:
+            # Central directory (or anything else) means there are no more entries
+            self.state = 'done'
+            self.buffer = bytearray()
+            return False
+        if len(self.buffer) < 30:
+            return False
+        (flags, method, crc, compressed, size, name_len, extra_len) = struct.unpack('<2xHH4xIIIHH', self.buffer[4:30])
+        end = 30 + name_len + extra_len
+        if len(self.buffer) < end:
+            return False
+        raw_name = bytes(self.buffer[30:30 + name_len])
+        extra = bytes(self.buffer[30 + name_len:end])
+        del self.buffer[:end]
+        
+        zip64 = False
+        while len(extra) >= 4:
+            tag, length = struct.unpack('<HH', extra[:4])
+            if tag == 0x0001:
+                zip64 = True
+                values = list(struct.unpack(f'<{min(length, 16) // 8}Q', extra[4:4 + min(length, 16) // 8 * 8]))
+                if size == 0xFFFFFFFF and values:
+                    size = values.pop(0)
+                if compressed == 0xFFFFFFFF and values:
+                    compressed = values.pop(0)
+            extra = extra[4 + length:]
+        
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437', errors='replace')
+        filename = re.sub(r'[<>:"/\\|?*]', '', name.replace('\\', '/').rsplit('/', 1)[-1])
+        if method not in (0, 8):
+            raise ValueError(f"Unsupported zip compression method {method} for {name}")
+        
+        streamed = bool(flags & 0x08)
+        entry = {
+            'name': filename,
+            'method': method,
+            'streamed': streamed,           # Sizes and CRC follow the data in a descriptor
+            'zip64': zip64,
+            'crc': crc,
+            'remaining': None if streamed else compressed,
+            'running_crc': 0,
+            'written': 0,
+            'hasher': FileHasher(),
+            'inflater': zlib.decompressobj(-15) if method == 8 else None,
+            'file': None,
+            'path': None,
+            'scan_from': 0,
+        }
+        # Entries the caller doesn't need (e.g. already on disk) are read past without writing
+        if filename and not name.endswith('/') and (not self.expected or filename in self.expected):
+            entry['path'] = self.output_dir / filename
+            entry['file'] = open(entry['path'].with_name(filename + '.part'), 'wb')
+        self.entry = entry
+        self.state = 'data'
+        return True
+    
+    def _write(self, data):
+        entry = self.entry
+        if not data:
+            return
+        entry['running_crc'] = zlib.crc32(data, entry['running_crc'])
+        entry['written'] += len(data)
+        if entry['file'] is not None:
+            entry['hasher'].update(data)
+            entry['file'].write(data)
+    
+    def _read_data(self) -> bool:
+        entry = self.entry
+        if not self.buffer:
+            return False
+        if entry['inflater'] is not None:
+            # Deflate streams mark their own end, with or without a descriptor
+            if entry['remaining'] is not None:
+                take = min(entry['remaining'], len(self.buffer))
+                data, self.buffer = bytes(self.buffer[:take]), self.buffer[take:]
+                entry['remaining'] -= take
+            else:
+                data, self.buffer = bytes(self.buffer), bytearray()
+            self._write(entry['inflater'].decompress(data))
+            if entry['inflater'].eof:
+                self.buffer = bytearray(entry['inflater'].unused_data) + self.buffer
+                self._end_data()
+            return True
+        if entry['remaining'] is not None:
+            take = min(entry['remaining'], len(self.buffer))
+            self._write(bytes(self.buffer[:take]))
+            del self.buffer[:take]
+            entry['remaining'] -= take
+            if entry['remaining'] == 0:
+                self._end_data()
+            return True
+        return self._scan_stored()
+    
+    def _scan_stored(self) -> bool:
+        """Find the end of a stored entry of unknown size by its data descriptor"""
+        entry = self.entry
+        position = self.buffer.find(self.DESCRIPTOR, entry['scan_from'])
+        while position != -1:
+            descriptor = self.buffer[position + 4:position + 24]
+            if len(descriptor) < (20 if entry['zip64'] else 12):
+                entry['scan_from'] = position
+                return self._write_safe_prefix(position)
+            crc = zlib.crc32(self.buffer[:position], entry['running_crc'])
+            size = entry['written'] + position
+            (descriptor_crc, compressed) = struct.unpack('<II', descriptor[:8])
+            if entry['zip64']:
+                (descriptor_crc, compressed) = struct.unpack('<IQ', descriptor[:12])
+            if crc == descriptor_crc and compressed == size % (1 << 64 if entry['zip64'] else 1 << 32):
+                self._write(bytes(self.buffer[:position]))
+                del self.buffer[:position]
+                entry['scan_from'] = 0
+                self._end_data()
+                return True
+            position = self.buffer.find(self.DESCRIPTOR, position + 1)
+        # Keep 3 bytes back in case a signature is split across chunks
+        return self._write_safe_prefix(max(0, len(self.buffer) - 3))
+    
+    def _write_safe_prefix(self, length: int) -> bool:
+        if not length:
+            return False
+        self._write(bytes(self.buffer[:length]))
+        del self.buffer[:length]
+        self.entry['scan_from'] = max(0, self.entry['scan_from'] - length)
+        return True
+    
+    def _end_data(self):
+        self.state = 'descriptor' if self.entry['streamed'] else 'header'
+        if self.state == 'header':
+            self._close_entry(self.entry['crc'])
+    
+    def _read_descriptor(self) -> bool:
+        entry = self.entry
+        if len(self.buffer) < 4:
+            return False
+        offset = 4 if self.buffer[:4] == self.DESCRIPTOR else 0
+        length = offset + (20 if entry['zip64'] else 12)
+        if len(self.buffer) < length:
+            return False
+        crc = struct.unpack('<I', self.buffer[offset:offset + 4])[0]
+        del self.buffer[:length]
+        self.state = 'header'
+        self._close_entry(crc)
+        return True
+    
+    def _close_entry(self, crc: int):
+        entry, self.entry = self.entry, None
+        if entry['file'] is None:
+            return
+        entry['file'].close()
+        part_path = entry['path'].with_name(entry['name'] + '.part')
+        sha256 = entry['hasher'].digests()['sha256']
+        expected_size, expected_sha256 = self.expected.get(entry['name'], (None, None))
+        if entry['running_crc'] != crc:
+            reason = "CRC mismatch"
+        elif expected_size is not None and entry['written'] != expected_size:
+            reason = f"size {entry['written']} != {expected_size}"
+        elif expected_sha256 and sha256 != expected_sha256.lower():
+            reason = "SHA-256 mismatch"
+        else:
+            os.replace(part_path, entry['path'])
+            record_checksum(entry['path'], sha256)
+            self.extracted.append((entry['name'], entry['written'], sha256))
+            return
+        part_path.unlink()
+        self.failed.append((entry['name'], reason))
+    
+    def abort(self):
+        """Drop the entry being written when the stream fails"""
+        if self.entry and self.entry['file'] is not None:
+            self.entry['file'].close()
+            part_path = self.entry['path'].with_name(self.entry['name'] + '.part')
+            if part_path.exists():
+                part_path.unlink()
+        self.entry = None
+
+
+# Lists with at least this many files averaging at most this size are fetched as one zip
+PIXELDRAIN_ZIP_MIN_FILES = 50
+PIXELDRAIN_ZIP_MAX_AVERAGE = 8 * 1024 * 1024
+
+
+def pixeldrain_filename(file_info: dict) -> str:
+    """Local filename for an entry of a Pixeldrain list"""
+    return re.sub(r'[<>:"/\\|?*]', '', file_info.get('name', f"{file_info.get('id')}.bin"))
+
+
+# ============ NEAR-DUPLICATE IMAGES ============
+
+NEAR_DUPLICATE_DISTANCE = 4     # dHash bits two copies of one picture may differ in (resizing, recompression)
+NEAR_DUPLICATE_REASON = "Near-duplicate of "
+NEAR_DUPLICATE_BUCKET = 256     # Band buckets holding more hashes than this are indexed again on their other bits
+
+
+def image_dhash(path: str) -> Optional[tuple]:
+    """(64-bit difference hash, width, height) of an image, None if PIL can't read it
+    
+    Runs in worker processes. JPEGs are decoded at a fraction of their size
+    (draft mode) since the hash only looks at a 9x8 thumbnail anyway.
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            img.draft('L', (64, 64))
+            pixels = list(img.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+    except Exception:
+        return None
+    dhash = 0
+    for row in range(0, 72, 9):
+        for left, right in zip(pixels[row:row + 8], pixels[row + 1:row + 9]):
+            dhash = (dhash << 1) | (left > right)
+    return dhash, width, height
+
+
+def hash_images(paths: list) -> list:
+    """image_dhash of every path, decoded in a process pool"""
+    if len(paths) < 32:
+        # Not worth starting the pool
+        return [image_dhash(path) for path in paths]
+    try:
+        with concurrent.futures.ProcessPoolExecutor() as pool:
+            return list(pool.map(image_dhash, paths, chunksize=16))
+    except (OSError, concurrent.futures.process.BrokenProcessPool) as e:
+        print(f"    ⚠ Hashing in one process ({e})")
+        return [image_dhash(path) for path in paths]
+
+
+if hasattr(int, 'bit_count'):          # Python 3.10+
+    popcount = int.bit_count
+else:
+    def popcount(value: int) -> int:
+        return bin(value).count('1')
+
+
+class HashIndex:
+    """Distinct 64-bit hashes, searchable for those within a few bits of a hash
+    
+    The bits that vary between the hashes are cut into distance + 1 bands;
+    two hashes that close agree on at least one whole band, so a search only
+    compares the hashes sharing one of its band values. Flat or dark images
+    agree on whole bands, so a band value shared by more than
+    NEAR_DUPLICATE_BUCKET hashes gets its own index over the bits they still
+    differ in instead of a bucket that every search would scan.
+    """
+    
+    def __init__(self, values: list, distance: int = NEAR_DUPLICATE_DISTANCE, positions=range(64)):
+        self.distance = distance
+        varying = 0
+        for value in values:
+            varying |= value ^ values[0]
+        positions = [position for position in positions if varying >> position & 1]
+        if len(positions) <= distance:
+            masks = [0]                 # Too few bits left to differ in more than distance of them
+        else:
+            # Bands take every (distance + 1)th bit so a dark row doesn't fill a whole band
+            masks = [sum(1 << position for position in positions[band::distance + 1]) for band in range(distance + 1)]
+        self.bands = []                 # (mask, {band value: set of hashes or HashIndex})
+        for mask in masks:
+            buckets = {}
+            for value in values:
+                buckets.setdefault(value & mask, set()).add(value)
+            for key, members in buckets.items():
+                if mask and len(members) > NEAR_DUPLICATE_BUCKET:
+                    buckets[key] = HashIndex(list(members), distance, [p for p in positions if not mask >> p & 1])
+            self.bands.append((mask, buckets))
+    
+    def near(self, value: int) -> set:
+        """Hashes still in the index at most distance bits from value"""
+        found = set()
+        for mask, buckets in self.bands:
+            members = buckets.get(value & mask, ())
+            if isinstance(members, HashIndex):
+                found |= members.near(value)
+            else:
+                found.update(other for other in members if popcount(value ^ other) <= self.distance)
+        return found
+    
+    def remove(self, value: int):
+        for mask, buckets in self.bands:
+            members = buckets.get(value & mask)
+            if isinstance(members, HashIndex):
+                members.remove(value)
+            elif members:
+                members.discard(value)
+
+
+def near_duplicate_clusters(hashes: list, order: list = None, distance: int = NEAR_DUPLICATE_DISTANCE) -> list:
+    """Lists of indexes into hashes, each led by the image it keeps
+    
+    Leaders are taken in order (default: index order) from what's not yet
+    grouped, and every other member is at most distance bits from its
+    leader, so a chain of small differences never joins unlike images.
+    Grouped hashes leave the index, so a large group is only searched once.
+    """
+    same = {}
+    for i, value in enumerate(hashes):
+        same.setdefault(value, []).append(i)
+    index = HashIndex(list(same), distance) if same else None
+    
+    grouped = set()
+    clusters = []
+    for i in (range(len(hashes)) if order is None else order):
+        if i in grouped:
+            continue
+        near = index.near(hashes[i])
+        near.discard(hashes[i])
+        cluster = [i]
+        for value in [hashes[i]] + sorted(near):
+            cluster += [j for j in same[value] if j != i]
+            index.remove(value)
+        grouped.update(cluster)
+        clusters.append(cluster)
+    return clusters
+
+
+def suppress_near_duplicates(results: list) -> list:
+    """Keep only the largest image of each near-duplicate cluster among this run's downloads
+    
+    Files that were already there ('exists', 'linked') are never touched.
+    The others are deleted and recorded in the manifest as skipped, so later
+    runs don't fetch them again. Returns the DownloadResults removed.
+    """
+    candidates = [result for result in results
+                  if result.status == 'done' and job_lane(result.job) == 'image' and os.path.isfile(result.job.path)]
+    if len(candidates) < 2:
+        return []
+    print(f"\n🔍 Looking for near-duplicates among {len(candidates)} images...")
+    hashed = [(result, info) for result, info in zip(candidates, hash_images([str(r.job.path) for r in candidates]))
+              if info is not None]
+    # Most pixels first, then the bigger file (less compressed), so each cluster keeps its largest image
+    order = sorted(range(len(hashed)), key=lambda i: (hashed[i][1][1] * hashed[i][1][2], hashed[i][0].size),
+                   reverse=True)
+    removed = []
+    for cluster in near_duplicate_clusters([info[0] for _, info in hashed], order):
+        if len(cluster) < 2:
+            continue
+        kept = Path(hashed[cluster[0]][0].job.path)
+        for i in cluster[1:]:
+            result = hashed[i][0]
+            path = Path(result.job.path)
+            if path == kept:
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"    ⚠ Could not remove {path.name}: {e}")
+                continue
+            forget_checksum(path)
+            MANIFEST.record(result.job.url, path, 'skipped', result.size, result.sha256, source=result.job.source,
+                            reason=NEAR_DUPLICATE_REASON + kept.name)
+            removed.append(result)
+    if removed:
+        print(f"🧹 Removed {len(removed)} near-duplicates "
+              f"({format_size(sum(result.size for result in removed))}), kept the largest copy of each")
+    return removed
+
+
+# ============ PROFILE POST PIPELINE ============
+
+async def run_post_pipeline(first_batch: list, more_batches, download_post, first: int = 1, last: int = None,
+                            workers: int = 4, total_label: str = "?") -> list:
+    """Download posts while pagination is still discovering more
+    
+    Post URLs from first_batch, then from the more_batches async iterator, go
+    through a bounded FIFO queue to workers calling download_post(url, header).
+    Only posts numbered first..last (1-based, in profile order) are queued.
+    Returns [(index, post_id, result)] in post order. If pagination or a
+    post raises, everything else is cancelled and the error is re-raised.
+    """
+    post_queue = asyncio.Queue(maxsize=workers * 2)
+    results = []
+    
+    async def queue_posts():
+        index = 0
+        batch = first_batch
+        while batch is not None:
+            for post_url in batch:
+                index += 1
+                if index < first:
+                    continue
+                if last and index > last:
+                    return
+                await post_queue.put((index, post_url))
+            try:
+                batch = await more_batches.__anext__()
+            except StopAsyncIteration:
+                batch = None
+    
+    async def produce():
+        try:
+            await queue_posts()
+        finally:
+            await more_batches.aclose()
+        for _ in range(workers):
+            await post_queue.put(None)
+    
+    async def consume():
+        while True:
+            item = await post_queue.get()
+            if item is None:
+                return
+            index, post_url = item
+            post_id = post_url.split('/post/')[-1].split('?')[0] if '/post/' in post_url else f'{index}'
+            header = f"\n[{index - first + 1}/{total_label}] Post {post_id}:"
+            results.append((index, post_id, await download_post(post_url, header)))
+    
+    tasks = [asyncio.ensure_future(produce())] + [asyncio.ensure_future(consume()) for _ in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Without this a failed worker leaves the producer blocked on the full queue
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return sorted(results, key=lambda item: item[0])
+
+
+def post_id_of(post_url: str) -> str:
+    return post_url.split('/post/')[-1].split('?')[0] if '/post/' in post_url else ''
+
+
+class PostSync:
+    """--sync bookkeeping for one Kemono/Coomer creator
+    
+    The manifest keeps the newest post ID seen for the creator and the new
+    posts that failed last time. Profiles list posts newest first, so post IDs
+    up to the newest one are known. Pagination stops after the page where that
+    newest post shows up again (or a page of nothing but known posts), as long
+    as the page ends in known posts: a pinned or out-of-order old post on its
+    own doesn't end the sync.
+    """
+    
+    def __init__(self, profile_url: str):
+        self.key = f"sync:{profile_url}"
+        state = MANIFEST.get_state(self.key)
+        self.newest = state.get('newest', '')
+        self.pending = state.get('pending', [])
+        self.latest = self.newest
+        self.reached_known = False
+        self.queued = []
+    
+    def is_known(self, post_url: str) -> bool:
+        post_id = post_id_of(post_url)
+        if not self.newest or not post_id:
+            return False
+        if post_id.isdigit() and self.newest.isdigit():
+            return int(post_id) <= int(self.newest)
+        return post_id == self.newest
+    
+    def _filter(self, batch: list) -> list:
+        for post_url in batch:
+            post_id = post_id_of(post_url)
+            if not self.latest or (post_id.isdigit() and self.latest.isdigit() and int(post_id) > int(self.latest)):
+                self.latest = post_id
+        known = [self.is_known(post_url) for post_url in batch]
+        new_posts = [post_url for post_url, is_known in zip(batch, known) if not is_known]
+        seen_newest = any(post_id_of(post_url) == self.newest for post_url in batch)
+        if known and known[-1] and (seen_newest or all(known)):
+            self.reached_known = True
+        self.queued += new_posts
+        return new_posts
+    
+    def start(self, first_batch: list, post_pages):
+        """New posts from page 1 plus last run's failures, and an iterator over later pages' new posts"""
+        new_posts = self._filter(first_batch)
+        retry = [post_url for post_url in self.pending if post_url not in new_posts]
+        self.queued += retry
+        if not self.newest:
+            print("🔄 Sync: first run for this creator, downloading every post")
+        else:
+            more = "" if self.reached_known else "+"
+            print(f"🔄 Sync: {len(new_posts)}{more} new posts since post {self.newest}"
+                  + (f", retrying {len(retry)} that failed last time" if retry else ""))
+        return new_posts + retry, self._more(post_pages)
+    
+    async def _more(self, post_pages):
+        try:
+            while not self.reached_known:
+                try:
+                    batch = await post_pages.__anext__()
+                except StopAsyncIteration:
+                    return
+                yield self._filter(batch)
+        finally:
+            await post_pages.aclose()
+    
+    def save(self, post_results: list, listing_complete: bool = True):
+        """Remember the newest post and which of this run's posts still need another try
+        
+        If a listing page failed to load, its posts are somewhere below the
+        new newest post, so the old one is kept and the next sync lists them again.
+        """
+        failed_ids = {post_id for _, post_id, (_, failed, _) in post_results if failed}
+        pending = [post_url for post_url in self.queued if post_id_of(post_url) in failed_ids]
+        newest = self.latest if listing_complete else self.newest
+        MANIFEST.set_state(self.key, {'newest': newest, 'pending': pending})
+        if not listing_complete:
+            since = f"since post {newest}" if newest else "on the profile"
+            print(f"🔄 Some profile pages didn't load, so the next --sync checks every post {since} again")
+        if pending:
+            print(f"🔄 {len(pending)} posts had failures and will be retried by the next --sync")
+
 
 class UniversalScraper:
-    def __init__(self, output_dir: str = "downloads", rate_limit: int = 5, pixeldrain_api_key: str = None):
+    def __init__(self, output_dir: str = "downloads", rate_limit: int = 5, pixeldrain_api_key: str = None,
+                 jobs: int = 4, per_host: int = 2, video_jobs: int = 2, order: str = 'sjf',
+                 segments: int = 1, segment_threshold: int = 50 * 1024 * 1024, pixeldrain_zip: str = 'auto'):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.rate_limit = rate_limit
@@ -42,6 +2776,17 @@ class UniversalScraper:
         self.browser = None
         self.context = None
         self.pixeldrain_api_key = pixeldrain_api_key
+        self.pixeldrain_zip = pixeldrain_zip  # 'auto', 'on' or 'off'
+        self.session = None  # Shared aiohttp session, created on first use
+        self.jobs = jobs
+        self.per_host = per_host
+        self.video_jobs = video_jobs
+        self.order = order
+        self.segments = segments
+        self.segment_threshold = segment_threshold
+        self.engine = None
+        self.resolve_slots = None  # Limits concurrent Bunkr page resolutions
+        self.preferred_mirrors = {}  # First candidate's host -> mirror host that won its last probe
         
         # Load API key from environment if not provided
         if not self.pixeldrain_api_key:
@@ -90,6 +2835,38 @@ class UniversalScraper:
         except:
             pass
     
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it if needed"""
+        if self.session is None or self.session.closed:
+            self.session = create_client_session(limit_per_host=max(6, self.per_host * 4 * self.segments))
+        return self.session
+    
+    async def get_engine(self) -> DownloadEngine:
+        """Return the download engine, sharing this scraper's HTTP session"""
+        if self.engine is None:
+            self.engine = DownloadEngine(
+                jobs=self.jobs,
+                per_host=self.per_host,
+                video_jobs=self.video_jobs,
+                order=self.order,
+                session=await self.get_session(),
+                segments=self.segments,
+                segment_threshold=self.segment_threshold
+            )
+        return self.engine
+    
+    async def close_session(self):
+        """Close the shared HTTP session and its pooled connections"""
+        if self.engine:
+            await self.engine.close()
+            self.engine = None
+        try:
+            if self.session and not self.session.closed:
+                await self.session.close()
+        except:
+            pass
+        self.session = None
+    
     def get_pixeldrain_headers(self) -> dict:
         """Get headers with API key authentication for Pixeldrain"""
         headers = {
@@ -106,163 +2883,41 @@ class UniversalScraper:
     
     async def fetch_page(self, url: str) -> BeautifulSoup:
         """Fetch HTML page"""
-        async with aiohttp.ClientSession() as session:
-            await asyncio.sleep(0.2)
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                response.raise_for_status()
-                html = await response.text()
-                return BeautifulSoup(html, 'html.parser')
+        session = await self.get_session()
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        html = await PAGE_CACHE.fetch_text(session, url, headers, timeout=60)
+        return BeautifulSoup(html, 'html.parser')
     
-    async def download_file(self, url: str, filepath: Path, desc: str = ""):
-        """Download file with retries"""
-        if filepath.exists() and filepath.stat().st_size > 0:
-            print(f"    ⊙ File exists: {filepath.name}")
-            return True
-            
-        retries = 5  # Increased retries for 502 errors
-        for attempt in range(retries):
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Referer': 'https://bunkr.cr/'
-                }
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=headers, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=300)) as response:
-                        if response.status == 502 or response.status == 503:
-                            print(f"    ⚠ HTTP {response.status} - Server temporarily unavailable")
-                            if attempt < retries - 1:
-                                wait_time = 2 ** attempt  # Exponential backoff: 1, 2, 4, 8, 16 seconds
-                                print(f"    ⏳ Waiting {wait_time}s before retry...")
-                                await asyncio.sleep(wait_time)
-                                continue
-                            return False
-                        
-                        if response.status != 200:
-                            print(f"    ✗ HTTP {response.status}")
-                            if attempt < retries - 1 and response.status >= 500:
-                                await asyncio.sleep(2)
-                                continue
-                            return False
-                        
-                        # Check content type
-                        content_type = response.headers.get('content-type', '').lower()
-                        if 'text/html' in content_type:
-                            print(f"    ✗ Got HTML instead of file")
-                            return False
-                        
-                        total_size = int(response.headers.get('content-length', 0))
-                        
-                        pbar = tqdm(
-                            total=total_size if total_size > 0 else None,
-                            unit='B',
-                            unit_scale=True,
-                            desc=f"    ↓ {filepath.name[:50]}",
-                            leave=False
-                        )
-                        
-                        bytes_downloaded = 0
-                        async with aiofiles.open(filepath, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                await f.write(chunk)
-                                bytes_downloaded += len(chunk)
-                                pbar.update(len(chunk))
-                        
-                        pbar.close()
-                        
-                        if bytes_downloaded == 0:
-                            print(f"    ✗ Downloaded 0 bytes")
-                            if filepath.exists():
-                                filepath.unlink()
-                            return False
-                        
-                        print(f"    ✓ {filepath.name} ({bytes_downloaded / 1024 / 1024:.2f} MB)")
-                        return True
-                        
-            except asyncio.TimeoutError:
-                print(f"    ✗ Timeout (attempt {attempt+1}/{retries})")
-                if filepath.exists():
-                    filepath.unlink()
-                if attempt < retries - 1:
-                    await asyncio.sleep(2)
-            except Exception as e:
-                print(f"    ✗ Download error (attempt {attempt+1}/{retries}): {e}")
-                if filepath.exists():
-                    filepath.unlink()
-                if attempt < retries - 1:
-                    await asyncio.sleep(2)
-                    
-        return False
+    def get_bunkr_headers(self) -> dict:
+        """Headers Bunkr's CDNs expect on file requests"""
+        return {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': 'https://bunkr.cr/'
+        }
     
-    async def download_file_pixeldrain(self, url: str, filepath: Path, desc: str = ""):
+    async def download_file(self, url: str, filepath: Path, desc: str = "", source: str = ""):
+        """Download file with retries"""
+        engine = await self.get_engine()
+        # Extra retries for Bunkr's frequent 502/503 errors
+        result = await engine.submit(DownloadJob(url=url, path=str(filepath), headers=self.get_bunkr_headers(),
+                                                 label=filepath.name, retries=5, source=source))
+        return result.ok
+    
+    async def download_file_pixeldrain(self, url: str, filepath: Path, desc: str = "", size: int = 0,
+                                       sha256: str = "", source: str = ""):
         """Download file from Pixeldrain with authentication"""
-        if filepath.exists() and filepath.stat().st_size > 0:
-            print(f"    ⊙ File exists: {filepath.name}")
-            return True
-            
-        retries = 3
-        for attempt in range(retries):
-            try:
-                headers = self.get_pixeldrain_headers()
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=headers, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=300)) as response:
-                        if response.status != 200:
-                            print(f"    ✗ HTTP {response.status}")
-                            if attempt < retries - 1:
-                                await asyncio.sleep(2)
-                                continue
-                            return False
-                        
-                        # Check content type
-                        content_type = response.headers.get('content-type', '').lower()
-                        if 'text/html' in content_type:
-                            print(f"    ✗ Got HTML instead of file")
-                            return False
-                        
-                        total_size = int(response.headers.get('content-length', 0))
-                        
-                        pbar = tqdm(
-                            total=total_size if total_size > 0 else None,
-                            unit='B',
-                            unit_scale=True,
-                            desc=f"    ↓ {filepath.name[:50]}",
-                            leave=False
-                        )
-                        
-                        bytes_downloaded = 0
-                        async with aiofiles.open(filepath, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                await f.write(chunk)
-                                bytes_downloaded += len(chunk)
-                                pbar.update(len(chunk))
-                        
-                        pbar.close()
-                        
-                        if bytes_downloaded == 0:
-                            print(f"    ✗ Downloaded 0 bytes")
-                            if filepath.exists():
-                                filepath.unlink()
-                            return False
-                        
-                        print(f"    ✓ {filepath.name} ({bytes_downloaded / 1024 / 1024:.2f} MB)")
-                        return True
-                        
-            except Exception as e:
-                print(f"    ✗ Download error (attempt {attempt+1}/{retries}): {e}")
-                if filepath.exists():
-                    filepath.unlink()
-                if attempt < retries - 1:
-                    await asyncio.sleep(2)
-                    
-        return False
+        engine = await self.get_engine()
+        result = await engine.submit(DownloadJob(url=url, path=str(filepath), headers=self.get_pixeldrain_headers(),
+                                                 label=filepath.name, retries=3, size_hint=size,
+                                                 expected_size=size, expected_sha256=sha256, source=source))
+        return result.ok
     
     # ============ PIXELDRAIN METHODS ============
     
-    async def scrape_pixeldrain_file(self, file_id: str, output_dir: Path, filename: str = None):
+    async def scrape_pixeldrain_file(self, file_id: str, output_dir: Path, filename: str = None, size: int = 0,
+                                     sha256: str = "", source: str = ""):
         """Download a single file from Pixeldrain"""
         try:
             # Show API key status only when actually scraping Pixeldrain
@@ -277,13 +2932,14 @@ class UniversalScraper:
                 info_url = f"https://pixeldrain.com/api/file/{file_id}/info"
                 headers = self.get_pixeldrain_headers()
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(info_url, headers=headers) as response:
-                        if response.status == 200:
-                            info = await response.json()
-                            filename = info.get('name', f"{file_id}.bin")
-                        else:
-                            filename = f"{file_id}.bin"
+                session = await self.get_session()
+                status, info = await fetch_json(session, info_url, headers)
+                if status == 200:
+                    filename = info.get('name', f"{file_id}.bin")
+                    size = info.get('size', 0)
+                    sha256 = info.get('hash_sha256', "")
+                else:
+                    filename = f"{file_id}.bin"
             
             # Sanitize filename
             filename = re.sub(r'[<>:"/\\|?*]', '', filename)
@@ -294,13 +2950,78 @@ class UniversalScraper:
             filepath = output_dir / filename
             
             # Download with authentication
-            success = await self.download_file_pixeldrain(download_url, filepath, filename)
+            success = await self.download_file_pixeldrain(download_url, filepath, filename, size, sha256,
+                                                          source or f"https://pixeldrain.com/u/{file_id}")
             return success
             
         except Exception as e:
             print(f"    ✗ Error: {e}")
             return False
     
+    def use_pixeldrain_zip(self, files: list, album_dir: Path) -> bool:
+        """Whether to fetch a list as one zip instead of file by file"""
+        if self.pixeldrain_zip == 'off' or not files or ARCHIVE.replaying:
+            return False
+        if self.pixeldrain_zip == 'on':
+            return True
+        # Per-file downloads resume and skip what's already there, so only bulk-fetch a fresh album
+        if any(album_dir.iterdir()):
+            return False
+        average = sum(f.get('size', 0) for f in files) / len(files)
+        return len(files) >= PIXELDRAIN_ZIP_MIN_FILES and average <= PIXELDRAIN_ZIP_MAX_AVERAGE
+    
+    async def download_pixeldrain_zip(self, list_id: str, album_dir: Path, files: list) -> set:
+        """Stream a list's zip and extract it as it arrives, returning the filenames extracted"""
+        zip_url = f"https://pixeldrain.com/api/list/{list_id}/zip"
+        total = sum(f.get('size', 0) for f in files)
+        expected = {pixeldrain_filename(f): (f.get('size') or None, f.get('hash_sha256', ""))
+                    for f in files}
+        print(f"📦 Bulk mode: downloading {len(files)} files as one zip ({format_size(total)})")
+        
+        extractor = ZipStreamExtractor(album_dir, expected)
+        loop = asyncio.get_running_loop()
+        session = await self.get_session()
+        await RATE_LIMITER.acquire(zip_url)
+        flow = BANDWIDTH.open_flow(RATE_LIMITER.limit_for(zip_url).share)
+        pbar = tqdm(total=total or None, unit='B', unit_scale=True, desc="    ↓ zip", leave=False)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+        try:
+            async with session.get(zip_url, headers=self.get_pixeldrain_headers(), timeout=timeout) as response:
+                if response.status != 200:
+                    print(f"    ⚠ Zip download failed: HTTP {response.status}")
+                    return set()
+                # Extraction runs off the event loop in ~1MB batches
+                batch = bytearray()
+                async for chunk in response.content.iter_any():
+                    batch += chunk
+                    pbar.update(len(chunk))
+                    await BANDWIDTH.throttle(len(chunk), flow)
+                    if len(batch) >= 1024 * 1024:
+                        await loop.run_in_executor(None, extractor.feed, bytes(batch))
+                        batch = bytearray()
+                await loop.run_in_executor(None, extractor.feed, bytes(batch))
+                extractor.finish()
+        except (asyncio.TimeoutError, aiohttp.ClientError, ValueError, OSError) as e:
+            print(f"    ⚠ Zip stream stopped: {e}")
+            extractor.abort()
+        finally:
+            BANDWIDTH.close_flow(flow)
+            pbar.close()
+        
+        by_name = {pixeldrain_filename(f): f for f in files}
+        
+        def record_extracted():
+            for name, size, sha256 in extractor.extracted:
+                OBJECT_STORE.adopt(album_dir / name, sha256)
+                MANIFEST.record(f"https://pixeldrain.com/api/file/{by_name[name].get('id')}", album_dir / name,
+                                'done', size, sha256, source=f"https://pixeldrain.com/l/{list_id}")
+        
+        await loop.run_in_executor(None, record_extracted)
+        for name, reason in extractor.failed:
+            print(f"    ✗ {name}: {reason}")
+        print(f"    ✓ Extracted {len(extractor.extracted)} files from the zip")
+        return {name for name, _, _ in extractor.extracted}
+    
     async def scrape_pixeldrain_list(self, list_id: str):
         """Scrape a Pixeldrain list/album"""
         # Show API key status only when actually scraping Pixeldrain
@@ -315,54 +3036,67 @@ class UniversalScraper:
         headers = self.get_pixeldrain_headers()
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, headers=headers) as response:
-                    if response.status != 200:
-                        print(f"✗ Failed to get list info: HTTP {response.status}")
-                        return
-                    
-                    data = await response.json()
-                    
-                    list_title = data.get('title', list_id)
-                    files = data.get('files', [])
-                    
-                    print(f"Album: {list_title}")
-                    print(f"Found {len(files)} files\n")
-                    
-                    # Sanitize album name
-                    album_name = re.sub(r'[<>:"/\\|?*]', '', list_title)
-                    album_dir = self.output_dir / album_name
-                    album_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    success_count = 0
-                    fail_count = 0
-                    
-                    # Download each file
-                    for idx, file_info in enumerate(files, 1):
-                        file_id = file_info.get('id')
-                        filename = file_info.get('name', f"{file_id}.bin")
-                        
-                        print(f"[{idx}/{len(files)}] {filename}")
-                        
-                        success = await self.scrape_pixeldrain_file(file_id, album_dir, filename)
-                        
-                        if success:
-                            success_count += 1
-                        else:
-                            fail_count += 1
-                        
-                        print()
-                        
-                        # Rate limiting
-                        if idx < len(files):
-                            await asyncio.sleep(0.5)
-                    
-                    print(f"\n{'='*60}")
-                    print(f"✓ Album complete: {album_dir}")
-                    print(f"✓ Successfully downloaded: {success_count}/{len(files)}")
-                    print(f"✗ Failed: {fail_count}/{len(files)}")
-                    print(f"{'='*60}")
-                    
+            session = await self.get_session()
+            status, data = await fetch_json(session, api_url, headers)
+            if status != 200:
+                print(f"✗ Failed to get list info: HTTP {status}")
+                return
+            
+            list_title = data.get('title', list_id)
+            files = data.get('files', [])
+            
+            print(f"Album: {list_title}")
+            print(f"Found {len(files)} files\n")
+            
+            # Sanitize album name
+            album_name = re.sub(r'[<>:"/\\|?*]', '', list_title)
+            album_dir = self.output_dir / album_name
+            album_dir.mkdir(parents=True, exist_ok=True)
+            
+            # Check local copies against the list metadata, so a re-run only fetches what's missing or wrong
+            checksums = read_checksums(album_dir)
+            remaining = []
+            for file_info in files:
+                local_path = album_dir / pixeldrain_filename(file_info)
+                state = check_local_file(local_path, file_info.get('size', 0), file_info.get('hash_sha256', ""),
+                                         checksums)
+                if state == 'complete':
+                    continue
+                if state != 'missing':
+                    print(f"  ⚠ {local_path.name}: {state}, downloading again")
+                    local_path.unlink()
+                    forget_checksum(local_path)
+                remaining.append(file_info)
+            if len(remaining) < len(files):
+                print(f"  ⊙ {len(files) - len(remaining)} files already complete, {len(remaining)} to download\n")
+            
+            # Big lists of small files go much faster as one zip stream
+            if self.use_pixeldrain_zip(remaining, album_dir):
+                extracted = await self.download_pixeldrain_zip(list_id, album_dir, remaining)
+                missing = [f for f in remaining if pixeldrain_filename(f) not in extracted]
+                if missing:
+                    print(f"  → {len(missing)} files not in the zip, downloading them one by one\n")
+                remaining = missing
+            
+            # Queue every file at once; the download engine limits concurrency
+            results = await asyncio.gather(*[
+                self.scrape_pixeldrain_file(file_info.get('id'), album_dir,
+                                            file_info.get('name', f"{file_info.get('id')}.bin"),
+                                            file_info.get('size', 0),
+                                            file_info.get('hash_sha256', ""),
+                                            f"https://pixeldrain.com/l/{list_id}")
+                for file_info in remaining
+            ])
+            
+            success_count = len(files) - len(remaining) + sum(1 for success in results if success)
+            fail_count = len(files) - success_count
+            
+            print(f"\n{'='*60}")
+            print(f"✓ Album complete: {album_dir}")
+            print(f"✓ Successfully downloaded: {success_count}/{len(files)}")
+            print(f"✗ Failed: {fail_count}/{len(files)}")
+            print(f"{'='*60}")
+            
         except Exception as e:
             print(f"✗ Error scraping Pixeldrain list: {e}")
             import traceback
@@ -372,6 +3106,15 @@ class UniversalScraper:
     
     async def get_download_url_with_network_capture(self, url: str) -> Optional[list]:
         """Capture actual download URL by monitoring network requests - returns list of URLs to try"""
+        if ARCHIVE.replaying:
+            _, text = ARCHIVE.load(url, 'capture')
+            return json.loads(text)
+        download_urls = await self.capture_download_urls(url)
+        ARCHIVE.save(url, json.dumps(download_urls), 'capture')
+        return download_urls
+    
+    async def capture_download_urls(self, url: str) -> Optional[list]:
+        """Open url in the browser and collect the media URLs it requests"""
         if not self.context:
             await self.init_browser()
             
@@ -396,6 +3139,7 @@ class UniversalScraper:
             
             page.on('request', capture_request)
             
+            await RATE_LIMITER.acquire(url)
             try:
                 await page.goto(url, wait_until='domcontentloaded', timeout=20000)
             except PlaywrightTimeout:
@@ -462,7 +3206,6 @@ class UniversalScraper:
             
             if prioritized:
                 print(f"    → Found {len(prioritized)} download URL(s)")
-                await asyncio.sleep(1)
                 return prioritized
             
             return download_urls if download_urls else None
@@ -478,6 +3221,110 @@ class UniversalScraper:
     
     async def scrape_bunkr_file(self, url: str, output_dir: Path):
         """Scrape a single file from Bunkr"""
+        if self.resolve_slots is None:
+            self.resolve_slots = asyncio.Semaphore(2)
+        
+        try:
+            # Resolving needs a browser, so check the manifest for this file page first
+            done = await asyncio.get_running_loop().run_in_executor(None, MANIFEST.completed_from, url)
+            if done:
+                print(f"    ⊙ Already downloaded: {MANIFEST.local_path(done['path']).name}")
+                return True
+            
+            async with self.resolve_slots:
+                download_urls, filename = await self.resolve_bunkr_file(url)
+            
+            if not download_urls:
+                return False
+            
+            filepath = output_dir / filename
+            
+            mirror_key = urlparse(download_urls[0]).netloc.lower()
+            if len(download_urls) > 1:
+                download_urls = await self.rank_mirrors(download_urls)
+            
+            # Start with the fastest mirror, keeping the rest as fallbacks
+            for idx, download_url in enumerate(download_urls, 1):
+                if len(download_urls) > 1:
+                    print(f"    → Trying URL {idx}/{len(download_urls)}")
+                
+                success = await self.download_file(download_url, filepath, filename, source=url)
+                
+                if success:
+                    return True
+                
+                if self.preferred_mirrors.get(mirror_key) == urlparse(download_url).netloc.lower():
+                    del self.preferred_mirrors[mirror_key]
+                
+                if idx < len(download_urls):
+                    print(f"    ⚠ Failed, trying next URL...")
+            
+            print(f"    ✗ All download URLs failed")
+            return False
+            
+        except Exception as e:
+            print(f"    ✗ Error: {e}")
+            return False
+    
+    async def rank_mirrors(self, urls: list) -> list:
+        """Order candidate URLs by racing a small Range request to each
+        
+        The first mirror to return a byte wins and the other probes are
+        cancelled. The winning host is remembered for files whose first
+        candidate is on the same CDN host, so later files skip the probe.
+        """
+        if ARCHIVE.replaying:
+            return urls
+        key = urlparse(urls[0]).netloc.lower()
+        preferred = self.preferred_mirrors.get(key)
+        if preferred:
+            known = [u for u in urls if urlparse(u).netloc.lower() == preferred]
+            if known:
+                return known + [u for u in urls if u not in known]
+        
+        session = await self.get_session()
+        headers = dict(self.get_bunkr_headers(), Range='bytes=0-1023')
+        
+        async def probe(probe_url):
+            await RATE_LIMITER.acquire(probe_url)
+            started = time.monotonic()
+            async with session.get(probe_url, headers=headers, timeout=aiohttp.ClientTimeout(total=15)) as response:
+                content_type = response.headers.get('content-type', '').lower()
+                if response.status not in (200, 206) or 'text/html' in content_type:
+                    raise RetryableDownloadError(f"HTTP {response.status}")
+                await response.content.read(1)
+                return time.monotonic() - started
+        
+        tasks = {asyncio.ensure_future(probe(u)): u for u in urls}
+        pending = set(tasks)
+        winner, failed = None, []
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                finished = []
+                for task in done:
+                    if task.exception() is None:
+                        finished.append((task.result(), tasks[task]))
+                    else:
+                        failed.append(tasks[task])
+                if finished:
+                    ttfb, winner = min(finished)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        if winner is None:
+            print(f"    ⚠ No mirror answered the probe, trying them in order")
+            return urls
+        winner_host = urlparse(winner).netloc.lower()
+        self.preferred_mirrors[key] = winner_host
+        print(f"    ⚡ Fastest of {len(urls)} mirrors: {winner_host} ({ttfb:.2f}s)")
+        # Mirrors that failed the probe go last; the rest keep their original order
+        return [winner] + [u for u in urls if u != winner and u not in failed] + failed
+    
+    async def resolve_bunkr_file(self, url: str):
+        """Resolve a Bunkr file page to (candidate download URLs, filename)"""
         try:
             soup = await self.fetch_page(url)
             
@@ -498,7 +3345,7 @@ class UniversalScraper:
             
             if not download_btn:
                 print(f"    ✗ No download button found")
-                return False
+                return None, filename
             
             reinforced_url = download_btn.get('href')
             if reinforced_url and reinforced_url.startswith('/'):
@@ -511,7 +3358,7 @@ class UniversalScraper:
                     reinforced_url = f"https://get.bunkrr.su/file/{data_id}"
                 else:
                     print(f"    ✗ No valid download URL found")
-                    return False
+                    return None, filename
             
             print(f"    → Reinforced URL: {reinforced_url}")
             
@@ -520,31 +3367,13 @@ class UniversalScraper:
             
             if not download_urls:
                 print(f"    ✗ Could not resolve download URL")
-                return False
-            
-            filepath = output_dir / filename
-            
-            # Try each URL in order until one works
-            for idx, download_url in enumerate(download_urls, 1):
-                if len(download_urls) > 1:
-                    print(f"    → Trying URL {idx}/{len(download_urls)}")
-                
-                success = await self.download_file(download_url, filepath, filename)
-                
-                if success:
-                    return True
-                
-                # If not last URL, wait a bit before trying next
-                if idx < len(download_urls):
-                    print(f"    ⚠ Failed, trying next URL...")
-                    await asyncio.sleep(1)
+                return None, filename
             
-            print(f"    ✗ All download URLs failed")
-            return False
+            return download_urls, filename
             
         except Exception as e:
             print(f"    ✗ Error: {e}")
-            return False
+            return None, None
     
     async def get_all_bunkr_pages(self, base_url: str) -> list:
         """Detect and return URLs for all pages in a Bunkr album"""
@@ -601,6 +3430,7 @@ class UniversalScraper:
         all_success_count = 0
         all_fail_count = 0
         all_file_count = 0
+        file_tasks = []
         
         for page_idx, page_url in enumerate(page_urls, 1):
             if len(page_urls) > 1:
@@ -628,22 +3458,19 @@ class UniversalScraper:
                         link = f"{parsed.scheme}://{parsed.netloc}{link}"
                     
                     print(f"[Page {page_idx}, {idx}/{len(cards)}] {link}")
-                    success = await self.scrape_bunkr_file(link, album_dir)
-                    
-                    if success:
-                        all_success_count += 1
-                    else:
-                        all_fail_count += 1
-                        
-                    print()
-                    
-                    if idx < len(cards):
-                        await asyncio.sleep(1)
+                    # Resolve and download in the background while the next card starts
+                    file_tasks.append(asyncio.create_task(self.scrape_bunkr_file(link, album_dir)))
                     
                 except Exception as e:
                     print(f"[Page {page_idx}, {idx}/{len(cards)}] ✗ Error: {e}\n")
                     all_fail_count += 1
         
+        for success in await asyncio.gather(*file_tasks, return_exceptions=True):
+            if success is True:
+                all_success_count += 1
+            else:
+                all_fail_count += 1
+        
         print(f"\n{'='*60}")
         print(f"✓ Album complete: {album_dir}")
         print(f"📄 Total pages processed: {len(page_urls)}")
@@ -673,7 +3500,8 @@ class UniversalScraper:
                     
             elif 'bunkr' in url:
                 # Bunkr needs browser
-                await self.init_browser()
+                if not ARCHIVE.replaying:
+                    await self.init_browser()
                 
                 if '/a/' in url:
                     await self.scrape_bunkr_album(url)
@@ -685,14 +3513,24 @@ class UniversalScraper:
                 print("❌ Unsupported site (only Pixeldrain and Bunkr supported)")
                 
         finally:
+            await self.close_session()
             await self.close_browser()
 
 
 class ForumImageDownloader:
     """Simpcity forum image downloader"""
     
-    def __init__(self, output_dir: str = "downloads", debug_mode: bool = False):
+    def __init__(self, output_dir: str = "downloads", debug_mode: bool = False, jobs: int = 4, per_host: int = 2,
+                 video_jobs: int = 2, order: str = 'sjf', follow: bool = False, near_duplicates: bool = False):
         self.session = requests.Session()
+        self.jobs = jobs
+        self.per_host = per_host
+        self.video_jobs = video_jobs
+        self.order = order
+        self.follow = follow        # Only pages and images added since the last run (see download_images)
+        self.near_duplicates = near_duplicates  # Keep only the largest of visually identical images
+        self.follow_state = {}
+        self.last_page = None       # (number, url, html) of the last page fetched
         
         # Create cookies directory if it doesn't exist (safety net)
         self.cookies_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cookies')
@@ -715,6 +3553,7 @@ class ForumImageDownloader:
         
         # Filter settings - More lenient defaults
         self.min_file_size = 5000  # Skip files smaller than 5KB (likely broken/icons)
+        self.size_hints = {}  # Sizes seen while validating, used to schedule the downloads
         self.max_dimension_to_skip = 100  # Skip images where BOTH dimensions are <= 100px
         self.skip_square_small = True  # Skip small square images
         self.max_square_size = 150  # Maximum size for square images to skip
@@ -775,8 +3614,19 @@ class ForumImageDownloader:
             print(f"\n✗ Error loading cookies: {e}")
             return False
     
+    def is_jpg_host(self, url):
+        """jpg*.su image hosts need a forum referer"""
+        return 'jpg6.su' in url or any(f'jpg{i}.su' in url for i in range(1, 11))
+    
+    def get_cookie_header(self, url):
+        """Cookie header the forum session would send for this URL"""
+        prepared = requests.Request('GET', url).prepare()
+        return requests.cookies.get_cookie_header(self.session.cookies, prepared)
+    
     def check_image_validity(self, url):
         """Check if an image should be downloaded by examining its actual properties"""
+        if ARCHIVE.replaying:
+            return True, "Not checked while replaying", 0, None
         try:
             check_headers = self.headers.copy()
             if 'jpg6.su' in url or any(f'jpg{i}.su' in url for i in range(1, 11)):
@@ -789,6 +3639,7 @@ class ForumImageDownloader:
                         'ibb.co', 'imgbb.com', 'i.imgur.com', 'i.redd.it']
             
             is_cdn = any(cdn in parsed.netloc for cdn in cdn_hosts)
+            RATE_LIMITER.wait(url)
             
             if is_cdn:
                 # For CDN hosts, skip file size checking but still check dimensions
@@ -817,6 +3668,7 @@ class ForumImageDownloader:
                     
                     if content_length:
                         file_size = int(content_length)
+                        self.size_hints[url] = file_size
                         if file_size < self.min_file_size:
                             return False, f"File too small ({file_size} bytes < {self.min_file_size})", file_size, None
                 except:
@@ -827,6 +3679,7 @@ class ForumImageDownloader:
                 range_headers = check_headers.copy()
                 range_headers['Range'] = 'bytes=0-32768'
                 
+                RATE_LIMITER.wait(url)
                 partial_response = self.session.get(url, headers=range_headers, timeout=10, stream=True)
                 
                 first_chunk = b''
@@ -835,6 +3688,10 @@ class ForumImageDownloader:
                     if len(first_chunk) >= 32768:
                         break
                 
+                _, total_size = parse_content_range(partial_response.headers.get('content-range', ''))
+                if total_size:
+                    self.size_hints[url] = total_size
+                
                 if not file_size:
                     content_length = partial_response.headers.get('content-length')
                     if content_length:
@@ -1006,9 +3863,7 @@ class ForumImageDownloader:
                         dimension_reasons[dim_key] = 0
                     dimension_reasons[dim_key] += 1
             
-            if i < len(img_urls):
-                time.sleep(0.05)  # Reduced delay since we're skipping CDN checks
-        
+
         print()
         print(f"\n  Results:")
         print(f"    ✓ Valid images: {len(validated_urls)}")
@@ -1133,11 +3988,14 @@ class ForumImageDownloader:
     
     def scrape_all_pages(self, start_url):
         """Scrape all pages of a forum thread"""
+        if self.follow_state.get('last_page_url'):
+            return self.scrape_new_pages()
+        
         print(f"\nDetecting pagination for: {start_url}")
         print("-" * 60)
         
         try:
-            response = self.session.get(start_url, headers=self.headers, timeout=30)
+            response = PAGE_CACHE.get(self.session, start_url, headers=self.headers, timeout=30)
             
             if self.debug_mode:
                 print(f"\nDEBUG: Response status code: {response.status_code}")
@@ -1174,6 +4032,7 @@ class ForumImageDownloader:
             
             if len(sorted_pages) <= 1:
                 print("✓ Single page thread detected")
+                self.last_page = (self.extract_page_numbers([start_url])[0][0], start_url, response.text)
                 return [start_url], [response.text]
             
             print(f"✓ Found {len(sorted_pages)} pages")
@@ -1245,21 +4104,20 @@ class ForumImageDownloader:
                 try:
                     print(f"  [{i}/{len(pages_to_scrape)}] Fetching page {i}...")
                     
-                    page_response = self.session.get(page_url, headers=self.headers, timeout=30)
+                    page_response = PAGE_CACHE.get(self.session, page_url, headers=self.headers, timeout=30)
                     page_response.raise_for_status()
                     all_html_contents.append(page_response.text)
+                    self.last_page = (self.extract_page_numbers([page_url])[0][0], page_url, page_response.text)
                     
                     consecutive_failures = 0
-                    
-                    if i < len(pages_to_scrape):
-                        time.sleep(rate_limit_delay)
                         
                 except requests.exceptions.HTTPError as e:
                     if '429' in str(e):
                         consecutive_failures += 1
                         rate_limit_delay = min(5.0, rate_limit_delay * 2)
-                        print(f"  ✗ Rate limited (429). Slowing down... (delay now {rate_limit_delay}s)")
-                        time.sleep(rate_limit_delay)
+                        print(f"  ✗ Rate limited (429). Slowing down...")
+                        # Honors Retry-After, otherwise backs off with a doubling delay
+                        RATE_LIMITER.observe(page_url, 429, e.response.headers, fallback=rate_limit_delay)
                     else:
                         print(f"  ✗ Failed to fetch page {i}: {e}")
                     
@@ -1292,6 +4150,85 @@ class ForumImageDownloader:
             print(f"✗ Error accessing page: {e}")
             return [], []
     
+    def thread_key(self, url):
+        """The thread's URL without a page number, so every page maps to the same thread"""
+        url = url.split('#')[0]
+        url = re.sub(r'/page-\d+/?$', '/', url, flags=re.IGNORECASE)
+        url = re.sub(r'([?&])(?:page|p|pg|pagina|pag)=\d+&?', r'\1', url, flags=re.IGNORECASE)
+        return url.rstrip('?&')
+    
+    def page_url_for(self, template_url, template_num, page_num):
+        """URL of page_num, built from the URL of another page of the same thread"""
+        for pattern in (r'(/page-)%d(?=/|$)', r'([?&](?:page|p|pg|pagina|pag)=)%d(?!\d)'):
+            new_url, count = re.subn(pattern % template_num, r'\g<1>%d' % page_num, template_url, flags=re.IGNORECASE)
+            if count:
+                return new_url
+        return None
+    
+    def last_post_anchor(self, html_content):
+        """ID of the last post on a page (XenForo-style id="post-123"), or None"""
+        post_ids = re.findall(r'id=["\'](post-\d+)["\']', html_content)
+        return post_ids[-1] if post_ids else None
+    
+    def html_after_post(self, html_content, anchor):
+        """The part of a page that comes after the post with this anchor (the whole page if it isn't there)"""
+        match = re.search(r'id=["\']%s["\']' % re.escape(anchor), html_content) if anchor else None
+        if not match:
+            return html_content
+        next_post = re.search(r'id=["\']post-\d+["\']', html_content[match.end():])
+        if not next_post:
+            return ""
+        return html_content[html_content.rfind('<', 0, match.end() + next_post.start()):]
+    
+    def scrape_new_pages(self):
+        """--follow: fetch the last page seen before plus any newer ones"""
+        state = self.follow_state
+        last_num, last_url = state['last_page'], state['last_page_url']
+        print(f"\n🔁 Following thread from page {last_num}: {last_url}")
+        print("-" * 60)
+        
+        try:
+            response = PAGE_CACHE.get(self.session, last_url, headers=self.headers, timeout=30)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Error accessing page: {e}")
+            return [], []
+        
+        # Only posts after the last one seen before are new
+        self.last_page = (last_num, last_url, response.text)
+        page_urls = [last_url]
+        html_contents = [self.html_after_post(response.text, state.get('last_post'))]
+        
+        # Page navigation usually skips pages between the neighbours and the last page, so fill the gaps
+        newer = {}
+        for page_num, url in self.extract_page_numbers(self.detect_pagination(response.text, last_url)):
+            if page_num > last_num and self.thread_key(url) == self.thread_key(last_url):
+                newer.setdefault(page_num, url)
+        if newer:
+            highest = max(newer)
+            for page_num in range(last_num + 1, highest):
+                if page_num not in newer:
+                    url = self.page_url_for(newer[highest], highest, page_num)
+                    if url:
+                        newer[page_num] = url
+        print(f"✓ {len(newer)} new page(s) since the last run")
+        
+        for page_num in sorted(newer):
+            url = newer[page_num]
+            try:
+                print(f"  Fetching page {page_num}...")
+                page_response = PAGE_CACHE.get(self.session, url, headers=self.headers, timeout=30)
+                page_response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                # Stop here so the next run continues from the last page that worked
+                print(f"  ✗ Failed to fetch page {page_num}: {e}")
+                break
+            page_urls.append(url)
+            html_contents.append(page_response.text)
+            self.last_page = (page_num, url, page_response.text)
+        
+        return page_urls, html_contents
+    
     def extract_images_improved(self, html_content, base_url):
         """Improved extraction for all image URLs from HTML content"""
         img_urls = set()
@@ -1442,11 +4379,42 @@ class ForumImageDownloader:
         
         return filename
     
+    def save_follow_state(self, key, results, saved=(), count=0, choices=None):
+        """--follow: remember how far this run got through the thread"""
+        if not self.follow or not self.last_page:
+            return
+        state = self.follow_state
+        page_num, page_url, html_content = self.last_page
+        # A page with no posts found (or an unusual layout) keeps the previous anchor
+        state['last_post'] = self.last_post_anchor(html_content) or (
+            state.get('last_post') if page_url == state.get('last_page_url') else None)
+        state['last_page'], state['last_page_url'] = page_num, page_url
+        state['saved'] = sorted(set(state.get('saved', [])) | set(saved) |
+                                {result.job.url for result in results if result.ok})
+        # Files that were too small or filtered won't get better; everything else is retried
+        state['pending'] = [result.job.url for result in results
+                            if not result.ok and not result.error.startswith('Too small')]
+        state['count'] = state.get('count', 0) + count
+        if choices:
+            state['choices'] = choices
+        MANIFEST.set_state(key, state)
+        print(f"🔁 Following: next run starts at page {page_num}")
+    
     def download_images(self, forum_url):
-        """Main download function with improved filtering"""
+        """Main download function with improved filtering
+        
+        With --follow, the manifest keeps per-thread state: the last page and
+        post seen, the image URLs saved, failures to retry and the answers to
+        the prompts. A re-run then fetches only the last known page and newer
+        ones, and saves only new images into the same folder without asking.
+        """
         print(f"\nProcessing: {forum_url}")
         print("-" * 60)
         
+        follow_key = f"follow:{self.thread_key(forum_url)}"
+        self.follow_state = MANIFEST.get_state(follow_key) if self.follow else {}
+        remembered = self.follow_state.get('choices')
+        
         page_urls, html_contents = self.scrape_all_pages(forum_url)
         
         if not html_contents:
@@ -1513,24 +4481,51 @@ class ForumImageDownloader:
         print('='*60)
         filtered_img_urls = self.filter_images(all_img_urls_list, html_contents)
         
+        if self.follow:
+            # Images saved by earlier runs stay skipped even if they were deleted since
+            saved = set(self.follow_state.get('saved', []))
+            filtered_img_urls = [img_url for img_url in filtered_img_urls if img_url not in saved]
+            retry = [img_url for img_url in self.follow_state.get('pending', []) if img_url not in filtered_img_urls]
+            if retry:
+                print(f"\n🔁 Retrying {len(retry)} images that failed last time")
+            filtered_img_urls += retry
+        
         if not filtered_img_urls:
-            print("✗ No images remained after URL/filename filtering.")
+            if self.follow_state.get('last_page_url'):
+                print("✓ No new images since the last run.")
+            else:
+                print("✗ No images remained after URL/filename filtering.")
+            self.save_follow_state(follow_key, [])
             return
         
+        # Images finished in an earlier run need neither checking nor downloading
+        already_done = {img_url for img_url in filtered_img_urls
+                        if MANIFEST.completed(img_url) or (self.near_duplicates and MANIFEST.near_duplicate(img_url))}
+        if already_done:
+            print(f"\n⊙ {len(already_done)} images already downloaded in an earlier run")
+            filtered_img_urls = [img_url for img_url in filtered_img_urls if img_url not in already_done]
+            if not filtered_img_urls:
+                print("✓ Nothing new to download.")
+                self.save_follow_state(follow_key, [], saved=already_done)
+                return
+        
         print(f"\n{'='*60}")
         print("FILTERING PHASE 2: Actual image properties")
         print('='*60)
         
         print(f"\nPhase 1 passed: {len(filtered_img_urls)} images")
-        print("\nWould you like to check actual image dimensions and file sizes?")
-        print("⚠ WARNING: This can be overly aggressive and filter out valid images,")
-        print("  especially on CDN hosts like jpg6.su. Consider skipping for forum downloads.")
-        print("\n1. Yes, check all images (may filter too many)")
-        print("2. No, skip property checking (recommended for forums)")
-        
-        check_choice = input("\nChoose option (1/2): ").strip()
-        if not check_choice:
-            check_choice = '2'  # Default to skip
+        if remembered:
+            check_choice = remembered['check']
+        else:
+            print("\nWould you like to check actual image dimensions and file sizes?")
+            print("⚠ WARNING: This can be overly aggressive and filter out valid images,")
+            print("  especially on CDN hosts like jpg6.su. Consider skipping for forum downloads.")
+            print("\n1. Yes, check all images (may filter too many)")
+            print("2. No, skip property checking (recommended for forums)")
+            
+            check_choice = input("\nChoose option (1/2): ").strip()
+            if not check_choice:
+                check_choice = '2'  # Default to skip
         
         if check_choice == '1':
             validated_img_urls = self.filter_by_actual_properties(filtered_img_urls)
@@ -1538,7 +4533,7 @@ class ForumImageDownloader:
             # Check if too many were filtered
             filtered_percentage = ((len(filtered_img_urls) - len(validated_img_urls)) / len(filtered_img_urls) * 100) if filtered_img_urls else 0
             
-            if filtered_percentage > 80:
+            if filtered_percentage > 80 and not remembered:
                 print(f"\n{'='*60}")
                 print("⚠ WARNING: Property checking filtered out {:.0f}% of images!".format(filtered_percentage))
                 print('='*60)
@@ -1558,6 +4553,7 @@ class ForumImageDownloader:
         
         if not validated_img_urls:
             print("✗ No images remained after filtering.")
+            self.save_follow_state(follow_key, [], saved=already_done)
             return
         
         print(f"\n✓ Final count: {len(validated_img_urls)} images after all filtering")
@@ -1570,46 +4566,50 @@ class ForumImageDownloader:
             if len(validated_img_urls) > 5:
                 print(f"  ... and {len(validated_img_urls) - 5} more")
         
-        print("\n" + "="*60)
-        print("FILENAME SETTINGS")
-        print("="*60)
-        
-        suggested_prefix = ""
-        parsed_url = urlparse(forum_url)
-        path_parts = parsed_url.path.strip('/').split('/')
-        if path_parts:
-            for part in reversed(path_parts):
-                if part and not part.isdigit() and len(part) > 2:
-                    clean_part = re.sub(r'[^a-zA-Z0-9_-]', '_', part)
-                    suggested_prefix = clean_part + '_'
-                    break
-        
-        if not suggested_prefix:
-            suggested_prefix = "image_"
-        
-        print(f"\nSuggested prefix: '{suggested_prefix}'")
-        prefix = input(f"Enter filename prefix (press Enter for '{suggested_prefix}'): ").strip()
-        
-        if not prefix:
-            prefix = suggested_prefix
-        
-        print("\nOverwrite existing files?")
-        overwrite = input("(y)es, (n)o (skip), (a)uto-rename: ").strip().lower()
-        if overwrite not in ['y', 'n', 'a']:
-            overwrite = 'a'
-        
-        print("\nFile type filtering:")
-        print("1. Download only JPG/JPEG/PNG files")
-        print("2. Download all image types")
-        print("3. Skip GIF files only")
-        
-        filetype_choice = input("Choose option (1/2/3): ").strip()
-        
-        print(f"\n{'-'*60}")
-        proceed = input(f"Download {len(validated_img_urls)} images from {total_pages} pages? (y/n): ").strip().lower()
-        if proceed not in ['y', 'yes']:
-            print("Download cancelled.")
-            return
+        if remembered:
+            prefix, overwrite, filetype_choice = remembered['prefix'], remembered['overwrite'], remembered['filetype']
+            print(f"\n🔁 Using the settings from the last run (prefix '{prefix}')")
+        else:
+            print("\n" + "="*60)
+            print("FILENAME SETTINGS")
+            print("="*60)
+            
+            suggested_prefix = ""
+            parsed_url = urlparse(forum_url)
+            path_parts = parsed_url.path.strip('/').split('/')
+            if path_parts:
+                for part in reversed(path_parts):
+                    if part and not part.isdigit() and len(part) > 2:
+                        clean_part = re.sub(r'[^a-zA-Z0-9_-]', '_', part)
+                        suggested_prefix = clean_part + '_'
+                        break
+            
+            if not suggested_prefix:
+                suggested_prefix = "image_"
+            
+            print(f"\nSuggested prefix: '{suggested_prefix}'")
+            prefix = input(f"Enter filename prefix (press Enter for '{suggested_prefix}'): ").strip()
+            
+            if not prefix:
+                prefix = suggested_prefix
+            
+            print("\nOverwrite existing files?")
+            overwrite = input("(y)es, (n)o (skip), (a)uto-rename: ").strip().lower()
+            if overwrite not in ['y', 'n', 'a']:
+                overwrite = 'a'
+            
+            print("\nFile type filtering:")
+            print("1. Download only JPG/JPEG/PNG files")
+            print("2. Download all image types")
+            print("3. Skip GIF files only")
+            
+            filetype_choice = input("Choose option (1/2/3): ").strip()
+            
+            print(f"\n{'-'*60}")
+            proceed = input(f"Download {len(validated_img_urls)} images from {total_pages} pages? (y/n): ").strip().lower()
+            if proceed not in ['y', 'yes']:
+                print("Download cancelled.")
+                return
         
         successful = 0
         skipped = 0
@@ -1631,11 +4631,17 @@ class ForumImageDownloader:
                     thread_name = part
                     break
         
-        download_subfolder = os.path.join(self.download_path, f"{thread_name}_{timestamp}")
+        download_subfolder = MANIFEST.folder_for(self.thread_key(forum_url),
+                                                 os.path.join(self.download_path, f"{thread_name}_{timestamp}"))
         if not os.path.exists(download_subfolder):
             os.makedirs(download_subfolder)
         
-        for i, img_url in enumerate(validated_img_urls, 1):
+        download_jobs = []
+        planned_paths = set()
+        
+        # Followed threads keep numbering where the last run stopped
+        first_index = self.follow_state.get('count', 0) + 1
+        for i, img_url in enumerate(validated_img_urls, first_index):
             parsed = urlparse(img_url)
             filename = os.path.basename(parsed.path)
             file_ext = os.path.splitext(filename)[1].lower() if '.' in filename else ''
@@ -1656,91 +4662,62 @@ class ForumImageDownloader:
             
             save_path = os.path.join(download_subfolder, final_filename)
             
-            if os.path.exists(save_path):
-                if overwrite == 'n':
+            # Downloads run concurrently, so also check names already queued
+            if os.path.exists(save_path) or save_path in planned_paths:
+                if MANIFEST.owner(save_path) not in (None, img_url):
+                    overwrite_this = 'a'    # An earlier run's image, not an older copy of this one
+                else:
+                    overwrite_this = overwrite
+                if overwrite_this == 'n':
                     print(f"[{i}/{len(validated_img_urls)}] Skipped (exists): {final_filename[:40]}...")
                     skipped += 1
                     continue
-                elif overwrite == 'a':
+                elif overwrite_this == 'a':
                     base_name, ext = os.path.splitext(final_filename)
                     counter = 1
-                    while os.path.exists(save_path):
+                    while os.path.exists(save_path) or save_path in planned_paths:
                         final_filename = f"{base_name}_{counter}{ext}"
                         save_path = os.path.join(download_subfolder, final_filename)
                         counter += 1
             
-            try:
-                print(f"[{i}/{len(validated_img_urls)}] Downloading: {final_filename[:40]}...")
-                
-                download_headers = self.headers.copy()
-                if 'jpg6.su' in img_url or any(f'jpg{i}.su' in img_url for i in range(1, 11)):
-                    download_headers['Referer'] = 'https://simpcity.su/'
-                    download_headers['Accept'] = 'image/webp,image/apng,image/*,*/*;q=0.8'
-                
-                for attempt in range(3):
-                    try:
-                        img_response = self.session.get(img_url, headers=download_headers, 
-                                                      stream=True, timeout=60)
-                        img_response.raise_for_status()
-                        break
-                    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-                        if attempt < 2:
-                            print(f"  Retry ({attempt+1}/3)...")
-                            time.sleep(2)
-                            continue
-                        else:
-                            raise
-                
-                content_type = img_response.headers.get('content-type', '')
-                if content_type and not content_type.startswith('image/'):
-                    print(f"  ⚠ Not an image (Content-Type: {content_type})")
-                
-                file_size = int(img_response.headers.get('content-length', 0))
-                
-                with open(save_path, 'wb') as f:
-                    if file_size == 0:
-                        f.write(img_response.content)
-                    else:
-                        for chunk in img_response.iter_content(chunk_size=32768):
-                            if chunk:
-                                f.write(chunk)
-                
-                actual_size = os.path.getsize(save_path)
-                
-                if actual_size < 2048:
-                    print(f"  ⚠ File very small ({actual_size} bytes), may not be valid image")
-                    os.remove(save_path)
-                    failed += 1
-                else:
-                    size_kb = actual_size / 1024
-                    if size_kb > 1024:
-                        size_mb = size_kb / 1024
-                        print(f"  ✓ Saved ({size_mb:.2f} MB)")
-                    else:
-                        print(f"  ✓ Saved ({size_kb:.1f} KB)")
-                    successful += 1
-                
-            except Exception as e:
-                error_msg = str(e)
-                if "404" in error_msg:
-                    print(f"  ✗ Failed: 404 Not Found")
-                    failed_urls.append((img_url, "404 Not Found"))
-                elif "403" in error_msg:
-                    print(f"  ✗ Failed: 403 Forbidden")
-                    failed_urls.append((img_url, "403 Forbidden"))
-                elif "timeout" in error_msg.lower():
-                    print(f"  ✗ Failed: Timeout")
-                    failed_urls.append((img_url, "Timeout"))
-                else:
-                    print(f"  ✗ Failed: {type(e).__name__}")
-                    failed_urls.append((img_url, f"{type(e).__name__}: {error_msg[:50]}"))
+            planned_paths.add(save_path)
+            
+            download_headers = self.headers.copy()
+            if self.is_jpg_host(img_url):
+                download_headers['Referer'] = 'https://simpcity.su/'
+                download_headers['Accept'] = 'image/webp,image/apng,image/*,*/*;q=0.8'
+            cookie_header = self.get_cookie_header(img_url)
+            if cookie_header:
+                download_headers['Cookie'] = cookie_header
+            
+            download_jobs.append(DownloadJob(
+                url=img_url,
+                path=save_path,
+                headers=download_headers,
+                label=final_filename[:40],
+                min_size=2048,          # Anything smaller is not a valid image
+                reject_html=False,
+                skip_existing=False,    # Overwrite choice was handled above
+                size_hint=self.size_hints.get(img_url, 0),
+                source=forum_url,
+            ))
+        
+        print(f"Queued {len(download_jobs)} downloads ({self.jobs} at a time)\n")
+        results = run_downloads(download_jobs, jobs=self.jobs, per_host=self.per_host,
+                                video_jobs=self.video_jobs, order=self.order)
+        near_duplicates = suppress_near_duplicates(results) if self.near_duplicates else []
+        
+        for result in results:
+            if result.ok:
+                successful += 1
+            else:
                 failed += 1
-            
-            if i < len(validated_img_urls):
-                if 'jpg6.su' in img_url or any(f'jpg{i}.su' in img_url for i in range(1, 11)):
-                    time.sleep(1.0)
-                else:
-                    time.sleep(0.5)
+                failed_urls.append((result.job.url, result.error))
+        successful -= len(near_duplicates)
+        
+        self.save_follow_state(follow_key, results, saved=already_done, count=len(validated_img_urls),
+                               choices={'check': check_choice, 'prefix': prefix, 'overwrite': overwrite,
+                                        'filetype': filetype_choice})
         
         print(f"\n{'='*60}")
         print("DOWNLOAD SUMMARY")
@@ -1753,6 +4730,10 @@ class ForumImageDownloader:
         print(f"Filtered by file type: {filtered_by_type}")
         print(f"Successfully downloaded: {successful}")
         print(f"Skipped (already existed): {skipped}")
+        if near_duplicates:
+            print(f"Removed as near-duplicates: {len(near_duplicates)}")
+        if already_done:
+            print(f"Already downloaded earlier: {len(already_done)}")
         print(f"Failed: {failed}")
         print(f"Location: {download_subfolder}")
         
@@ -1785,9 +4766,15 @@ class ForumImageDownloader:
 class GenericGalleryDownloader:
     """Generic image AND video downloader for gallery sites like viralthots.tv"""
     
-    def __init__(self, output_dir: str = "downloads"):
+    def __init__(self, output_dir: str = "downloads", jobs: int = 4, per_host: int = 2,
+                 video_jobs: int = 2, order: str = 'sjf', near_duplicates: bool = False):
         self.session = requests.Session()
         self.download_path = output_dir
+        self.jobs = jobs
+        self.per_host = per_host
+        self.video_jobs = video_jobs
+        self.order = order
+        self.near_duplicates = near_duplicates  # Keep only the largest of visually identical images
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -1834,7 +4821,8 @@ class GenericGalleryDownloader:
         for embed_url in embed_urls:
             try:
                 print(f"    → Fetching embed: {embed_url[:60]}...")
-                response = self.session.get(embed_url, headers=self.headers, timeout=15)
+                # Embed pages carry expiring tokens: recorded for --replay, never cached
+                response = PAGE_CACHE.get(self.session, embed_url, headers=self.headers, timeout=15, cache=False)
                 response.raise_for_status()
                 embed_html = response.text
                 
@@ -1870,8 +4858,6 @@ class GenericGalleryDownloader:
                                 video_urls.add(match)
                                 print(f"      ✓ Found video: {match[:60]}...")
                 
-                time.sleep(0.3)  # Rate limiting
-                
             except Exception as e:
                 print(f"      ✗ Failed to fetch embed: {e}")
                 continue
@@ -2088,7 +5074,7 @@ class GenericGalleryDownloader:
         print("-" * 60)
         
         try:
-            response = self.session.get(url, headers=self.headers, timeout=30)
+            response = PAGE_CACHE.get(self.session, url, headers=self.headers, timeout=30)
             response.raise_for_status()
             
             # Check if it's a SINGLE VIDEO page (not gallery)
@@ -2228,34 +5214,22 @@ class GenericGalleryDownloader:
             if path_parts and path_parts[-1]:
                 gallery_name = path_parts[-1]
             
-            download_subfolder = os.path.join(self.download_path, f"{gallery_name}_{timestamp}")
+            download_subfolder = MANIFEST.folder_for(url, os.path.join(self.download_path, f"{gallery_name}_{timestamp}"))
             if not os.path.exists(download_subfolder):
                 os.makedirs(download_subfolder)
             
+            download_jobs = []
+            planned_paths = set()
+            already_done = 0
+            
             for i, img_url in enumerate(sorted(img_urls), 1):
                 # Detect if URL is a video
                 is_video = self.is_video_url(img_url)
                 file_type = "VIDEO" if is_video else "IMAGE"
                 
-                # Check file size for videos if filtering is enabled
-                if is_video and skip_small_videos:
-                    try:
-                        # Quick HEAD request to check file size
-                        head_response = self.session.head(img_url, headers=self.headers, timeout=10, allow_redirects=True)
-                        content_length = head_response.headers.get('content-length')
-                        
-                        if content_length:
-                            file_size_bytes = int(content_length)
-                            file_size_mb = file_size_bytes / (1024 * 1024)
-                            
-                            if file_size_mb < min_video_size_mb:
-                                print(f"[{i}/{len(img_urls)}] [VIDEO] Skipping: {os.path.basename(urlparse(img_url).path)[:35]}...")
-                                print(f"  ⊘ Too small ({file_size_mb:.2f} MB < {min_video_size_mb} MB minimum)")
-                                skipped_small_videos += 1
-                                continue
-                    except:
-                        # If we can't check size, proceed with download
-                        pass
+                if MANIFEST.completed(img_url) or (self.near_duplicates and MANIFEST.near_duplicate(img_url)):
+                    already_done += 1
+                    continue
                 
                 if prefix:
                     filename = self.get_prefixed_filename(img_url, i, prefix, is_video)
@@ -2270,101 +5244,78 @@ class GenericGalleryDownloader:
                 
                 save_path = os.path.join(download_subfolder, filename)
                 
-                # Check if exists
-                if os.path.exists(save_path):
-                    if overwrite == 'n':
+                # Check if exists (or already queued under the same name)
+                if os.path.exists(save_path) or save_path in planned_paths:
+                    if MANIFEST.owner(save_path) not in (None, img_url):
+                        overwrite_this = 'a'    # An earlier run's file, not an older copy of this one
+                    else:
+                        overwrite_this = overwrite
+                    if overwrite_this == 'n':
                         print(f"[{i}/{len(img_urls)}] [{file_type}] Skipped (exists): {filename[:35]}...")
                         skipped += 1
                         continue
-                    elif overwrite == 'a':
+                    elif overwrite_this == 'a':
                         base_name, ext = os.path.splitext(filename)
                         counter = 1
-                        while os.path.exists(save_path):
+                        while os.path.exists(save_path) or save_path in planned_paths:
                             filename = f"{base_name}_{counter}{ext}"
                             save_path = os.path.join(download_subfolder, filename)
                             counter += 1
                 
-                try:
-                    print(f"[{i}/{len(img_urls)}] [{file_type}] Downloading: {filename[:35]}...")
-                    
-                    # Add special headers for token-based video URLs
-                    download_headers = self.headers.copy()
-                    
-                    # If URL is from an embed source, add referer from the original page
-                    parsed_url = urlparse(img_url)
-                    if 'get_file' in img_url or 'v-acctoken' in img_url or 'token' in img_url.lower():
-                        # For token-based URLs, add referer and origin
-                        embed_domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
-                        download_headers['Referer'] = url  # Original page URL
-                        download_headers['Origin'] = embed_domain
-                        print(f"  → Using referer: {url[:50]}...")
-                    
-                    # Download with retry
-                    for attempt in range(2):
-                        try:
-                            img_response = self.session.get(img_url, headers=download_headers, 
-                                                          stream=True, timeout=60)  # Increased timeout for videos
-                            img_response.raise_for_status()
-                            break
-                        except requests.exceptions.Timeout:
-                            if attempt == 0:
-                                print(f"  Timeout, retrying...")
-                                time.sleep(1)
-                                continue
-                            else:
-                                raise
-                    
-                    # Download
-                    with open(save_path, 'wb') as f:
-                        for chunk in img_response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                    
-                    actual_size = os.path.getsize(save_path)
-                    
+                planned_paths.add(save_path)
+                
+                # Add special headers for token-based video URLs
+                download_headers = self.headers.copy()
+                
+                # If URL is from an embed source, add referer from the original page
+                parsed_url = urlparse(img_url)
+                if 'get_file' in img_url or 'v-acctoken' in img_url or 'token' in img_url.lower():
+                    # For token-based URLs, add referer and origin
+                    embed_domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+                    download_headers['Referer'] = url  # Original page URL
+                    download_headers['Origin'] = embed_domain
+                
+                download_jobs.append(DownloadJob(
+                    url=img_url,
+                    path=save_path,
+                    headers=download_headers,
+                    label=f"[{file_type}] {filename[:35]}",
                     # Videos can be larger, so only flag very small files
-                    min_size = 1024 if not is_video else 10240  # 1KB for images, 10KB for videos
-                    if actual_size < min_size:
-                        print(f"  ⚠ File very small ({actual_size} bytes), may not be valid")
-                        os.remove(save_path)
-                        failed += 1
-                    else:
-                        size_kb = actual_size / 1024
-                        if size_kb > 1024:
-                            print(f"  ✓ Saved ({size_kb/1024:.2f} MB)")
-                        else:
-                            print(f"  ✓ Saved ({size_kb:.1f} KB)")
-                        
-                        # Warn if video is suspiciously small (but above minimum filter)
-                        if is_video and actual_size < 5 * 1024 * 1024:  # Less than 5 MB
-                            if not skip_small_videos or actual_size >= min_video_size_mb * 1024 * 1024:
-                                print(f"     ⚠ Warning: Video is relatively small, may be low quality or preview")
-                        
-                        successful += 1
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    error_type = type(e).__name__
-                    
-                    # Try to get HTTP status code if available
-                    if hasattr(e, 'response') and e.response is not None:
-                        status_code = e.response.status_code
-                        print(f"  ✗ Failed: HTTP {status_code} ({error_type})")
-                        
-                        # Give hints based on status code
-                        if status_code == 403:
-                            print(f"     → Likely: Access token expired or invalid")
-                        elif status_code == 404:
-                            print(f"     → Likely: File not found or URL expired")
-                        elif status_code == 401:
-                            print(f"     → Likely: Authentication required")
-                    else:
-                        print(f"  ✗ Failed: {error_type}")
-                    
+                    min_size=10240 if is_video else 1024,
+                    # Small videos are usually previews; the engine checks Content-Length
+                    min_remote_size=int(min_video_size_mb * 1024 * 1024) if is_video and skip_small_videos else 0,
+                    reject_html=False,
+                    skip_existing=False,    # Overwrite choice was handled above
+                    lane='video' if is_video else 'image',
+                    source=url,
+                ))
+            
+            if already_done:
+                print(f"⊙ {already_done} files already downloaded in an earlier run")
+            print(f"Queued {len(download_jobs)} downloads ({self.jobs} at a time)\n")
+            results = run_downloads(download_jobs, jobs=self.jobs, per_host=self.per_host, retries=2,
+                                    video_jobs=self.video_jobs, order=self.order)
+            near_duplicates = suppress_near_duplicates(results) if self.near_duplicates else []
+            successful -= len(near_duplicates)
+            
+            for result in results:
+                if result.ok:
+                    successful += 1
+                    # Warn if video is suspiciously small (but above minimum filter)
+                    if self.is_video_url(result.job.url) and result.size < 5 * 1024 * 1024:
+                        print(f"     ⚠ Warning: {result.job.label} is relatively small, may be low quality or preview")
+                elif result.status == 'skipped':
+                    skipped_small_videos += 1
+                else:
                     failed += 1
-                
-                if i < len(img_urls):
-                    time.sleep(0.2)
+                    # Give hints based on status code
+                    hints = {
+                        'HTTP 403': "Access token expired or invalid",
+                        'HTTP 404': "File not found or URL expired",
+                        'HTTP 401': "Authentication required",
+                    }
+                    if result.error in hints:
+                        print(f"     → {result.job.label}: likely {hints[result.error]}")
             
             # Summary
             print(f"\n{'='*60}")
@@ -2373,6 +5324,10 @@ class GenericGalleryDownloader:
             print(f"Total files found: {len(img_urls)} ({image_count} images, {video_count} videos)")
             print(f"Successfully downloaded: {successful}")
             print(f"Skipped (already existed): {skipped}")
+            if near_duplicates:
+                print(f"Removed as near-duplicates: {len(near_duplicates)}")
+            if already_done:
+                print(f"Already downloaded earlier: {already_done}")
             if skipped_small_videos > 0:
                 print(f"Skipped (small videos < {min_video_size_mb} MB): {skipped_small_videos}")
             print(f"Failed: {failed}")
@@ -2394,9 +5349,21 @@ class GenericGalleryDownloader:
 class CoomerScraper:
     """Scraper for coomer.st using Playwright to render the page"""
     
-    def __init__(self, output_dir: str = "downloads"):
-        self.session = requests.Session()
+    def __init__(self, output_dir: str = "downloads", jobs: int = 4, per_host: int = 2,
+                 video_jobs: int = 2, order: str = 'sjf', segments: int = 1, segment_threshold: int = 50 * 1024 * 1024,
+                 sync: bool = False):
         self.download_path = output_dir
+        self.jobs = jobs
+        self.per_host = per_host
+        self.video_jobs = video_jobs
+        self.order = order
+        self.segments = segments
+        self.segment_threshold = segment_threshold
+        self.sync = sync            # Only posts newer than the last run (see PostSync)
+        self.engine = None
+        self.render_lock = None  # Post pages render one at a time
+        self.expected_posts = None  # Post count reported by page 1 of the profile
+        self.failed_pages = 0  # Profile listing pages that didn't load
         self.playwright = None
         self.browser = None
         self.context = None
@@ -2440,15 +5407,37 @@ class CoomerScraper:
         except:
             pass
     
-    async def get_rendered_page(self, url, max_retries=3):
-        """Get fully rendered page content with retry logic"""
+    async def get_rendered_page(self, url, max_retries=3, max_age=None):
+        """Get fully rendered page content with retry logic
+        
+        A render cached less than max_age seconds ago (default: the render
+        cache's listing TTL) is returned without opening the browser.
+        """
+        if ARCHIVE.replaying:
+            try:
+                return ARCHIVE.load(url, 'rendered')[1]
+            except ReplayError as e:
+                # Same as a page that failed to load
+                print(f"  ✗ {e}")
+                return None
+        html_content = RENDER_CACHE.get(url, RENDER_CACHE.listing_ttl if max_age is None else max_age)
+        if html_content is not None:
+            ARCHIVE.save(url, html_content, 'rendered')
+            return html_content
+        
         if not self.browser:
             await self.init_browser()
         
         page = await self.context.new_page()
         
         for attempt in range(max_retries):
+            if not RETRY_POLICY.allow(url):
+                print(f"  ✗ {urlparse(url).netloc} keeps failing, skipped (circuit open)")
+                await page.close()
+                return None
             try:
+                await RATE_LIMITER.acquire(url)
+                started = time.monotonic()
                 # Increased timeout to 60 seconds
                 await page.goto(url, wait_until='networkidle', timeout=60000)
                 
@@ -2462,14 +5451,18 @@ class CoomerScraper:
                 html_content = await page.content()
                 
                 await page.close()
+                RETRY_POLICY.record(url, True)
+                RENDER_CACHE.put(url, html_content, time.monotonic() - started)
+                ARCHIVE.save(url, html_content, 'rendered')
                 return html_content
                 
             except Exception as e:
                 error_type = type(e).__name__
+                RETRY_POLICY.record(url, False)
                 
-                if attempt < max_retries - 1:
-                    wait_time = 5 * (attempt + 1)  # 5s, 10s, 15s
-                    print(f"  ✗ {error_type} (attempt {attempt+1}/{max_retries}), retrying in {wait_time}s...")
+                if attempt < max_retries - 1 and RETRY_POLICY.take_retry(url):
+                    wait_time = RETRY_POLICY.backoff(attempt + 1, 5)
+                    print(f"  ✗ {error_type} (attempt {attempt+1}/{max_retries}), retrying in {wait_time:.1f}s...")
                     
                     # Close the failed page
                     try:
@@ -2530,26 +5523,35 @@ class CoomerScraper:
         
         return post_links
     
-    async def get_all_post_links(self, profile_url):
-        """Get ALL post links from profile by following pagination"""
+    async def iter_post_links(self, profile_url):
+        """Yield post links page by page, following pagination
+        
+        self.expected_posts holds the profile's post count once page 1 is loaded,
+        and self.failed_pages counts the later pages that couldn't be loaded.
+        """
         print("🔍 Loading profile page...")
+        self.expected_posts = None
+        self.failed_pages = 0
         
-        # Get first page
-        html_content = await self.get_rendered_page(profile_url)
+        # Get first page (--sync needs to see the newest posts)
+        html_content = await self.get_rendered_page(profile_url, max_age=0 if self.sync else None)
         
         if not html_content:
             print("✗ Could not load profile page")
-            return []
+            return
         
         # Extract total posts count
         total_posts = self.extract_pagination_info(html_content)
+        self.expected_posts = total_posts
         
         if total_posts:
             print(f"📊 Profile has {total_posts} total posts")
         
         # Extract posts from first page
         all_post_links = self.extract_post_links_from_html(html_content, profile_url)
+        seen_links = set(all_post_links)
         print(f"✓ Extracted {len(all_post_links)} posts from page 1")
+        yield list(all_post_links)
         
         # If we have total count, calculate pages needed
         if total_posts and total_posts > 50:
@@ -2569,7 +5571,8 @@ class CoomerScraper:
                     page_posts = self.extract_post_links_from_html(page_html, profile_url)
                     
                     # Add only new posts (avoid duplicates)
-                    new_posts = [p for p in page_posts if p not in all_post_links]
+                    new_posts = [p for p in page_posts if p not in seen_links]
+                    seen_links.update(new_posts)
                     all_post_links.extend(new_posts)
                     
                     print(f"    ✓ Found {len(new_posts)} new posts (total: {len(all_post_links)})")
@@ -2578,13 +5581,12 @@ class CoomerScraper:
                     if len(new_posts) == 0:
                         print(f"    ℹ No more new posts, stopping pagination")
                         break
+                    yield new_posts
                 else:
+                    self.failed_pages += 1
                     print(f"    ✗ Failed to load page {page_num} after all retries")
                     print(f"    ⚠ Continuing with remaining pages...")
                     # Don't stop entirely, continue to next page
-                
-                # Rate limiting between pages
-                await asyncio.sleep(2)
         
         # Summary of pagination
         if total_posts:
@@ -2593,8 +5595,6 @@ class CoomerScraper:
                 print(f"\n⚠ WARNING: Expected {total_posts} posts but found {len(all_post_links)}")
                 print(f"   Missing {missing} posts (likely due to failed page loads)")
                 print(f"   You can re-run the script later to get the missing posts")
-        
-        return all_post_links
     
     def extract_media_from_html(self, html_content, base_url):
         """Extract media URLs from rendered post HTML"""
@@ -2640,24 +5640,63 @@ class CoomerScraper:
         
         return list(media_urls)
     
-    async def download_single_post(self, post_url, user_folder):
+    async def download_single_post(self, post_url, user_folder, header=None):
         """Download all media from a single post"""
-        if not self.browser:
-            await self.init_browser()
-        
-        page = await self.context.new_page()
         failed_urls = []
         
+        # Posts whose files all finished in an earlier run aren't rendered again
+        done_files = await asyncio.get_running_loop().run_in_executor(None, MANIFEST.page_done, post_url, user_folder)
+        if done_files is not None:
+            if header:
+                print(header)
+            print(f"  ⊙ Already downloaded ({done_files} files)")
+            return done_files, 0, []
+        
         try:
-            await page.goto(post_url, wait_until='networkidle', timeout=30000)
-            
-            try:
-                await page.wait_for_selector('img[src*="/data/"], a[href*="/data/"], video', timeout=10000)
-            except:
-                await asyncio.sleep(3)
-            
-            html_content = await page.content()
-            await page.close()
+            if ARCHIVE.replaying:
+                try:
+                    html_content = ARCHIVE.load(post_url, 'rendered')[1]
+                except ReplayError as e:
+                    if header:
+                        print(header)
+                    print(f"  ✗ {e}")
+                    return 0, 1, []
+            else:
+                html_content = RENDER_CACHE.get(post_url, RENDER_CACHE.post_ttl)
+            if html_content is not None:
+                if header:
+                    print(header)
+                print("  ⚡ Reusing an earlier render of this post")
+            else:
+                # Only rendering is serialized; earlier posts keep downloading meanwhile
+                async with self.render_lock:
+                    if header:
+                        print(header)
+                    if not self.browser:
+                        await self.init_browser()
+                    
+                    page = await self.context.new_page()
+                    try:
+                        await RATE_LIMITER.acquire(post_url)
+                        started = time.monotonic()
+                        await page.goto(post_url, wait_until='networkidle', timeout=30000)
+                        
+                        rendered = True
+                        try:
+                            await page.wait_for_selector('img[src*="/data/"], a[href*="/data/"], video', timeout=10000)
+                        except:
+                            rendered = False    # Maybe a text-only post, maybe not loaded yet: don't cache
+                            await asyncio.sleep(3)
+                        
+                        html_content = await page.content()
+                        if rendered:
+                            RENDER_CACHE.put(post_url, html_content, time.monotonic() - started)
+                    finally:
+                        try:
+                            await page.close()
+                        except:
+                            pass
+            ARCHIVE.save(post_url, html_content, 'rendered')
             
             media_urls = self.extract_media_from_html(html_content, post_url)
             
@@ -2693,10 +5732,7 @@ class CoomerScraper:
             
             print(f"  ✓ Found {len(media_urls)} unique files ({image_count} images, {video_count} videos)")
             
-            successful = 0
-            failed = 0
-            skipped_small = 0
-            
+            download_jobs = []
             for i, media_url in enumerate(media_urls, 1):
                 is_video = any(ext in media_url.lower() for ext in ['.mp4', '.webm'])
                 file_type = "VIDEO" if is_video else "IMAGE"
@@ -2706,139 +5742,28 @@ class CoomerScraper:
                     ext = '.mp4' if is_video else '.jpg'
                     filename = f"file_{i:03d}{ext}"
                 
-                save_path = os.path.join(user_folder, filename)
-                
-                if os.path.exists(save_path) and os.path.getsize(save_path) > 0:
-                    print(f"    [{i}/{len(media_urls)}] [{file_type}] ⊙ Exists: {filename[:35]}...")
-                    successful += 1
-                    continue
-                
-                max_retries = 5
-                retry_delay = 3
-                download_failed = True
-                
-                for attempt in range(max_retries):
-                    try:
-                        if attempt > 0:
-                            print(f"    [{i}/{len(media_urls)}] [{file_type}] Retry {attempt}/{max_retries-1}: {filename[:35]}...")
-                        else:
-                            print(f"    [{i}/{len(media_urls)}] [{file_type}] Downloading: {filename[:35]}...")
-                        
-                        timeout_duration = 180 if is_video else 90
-                        
-                        response = self.session.get(
-                            media_url, 
-                            headers=self.headers, 
-                            stream=True, 
-                            timeout=timeout_duration
-                        )
-                        
-                        if response.status_code in [500, 503]:
-                            if attempt < max_retries - 1:
-                                wait_time = retry_delay * (2 ** attempt)
-                                print(f"      ✗ HTTP {response.status_code} (waiting {wait_time}s...)")
-                                await asyncio.sleep(wait_time)
-                                continue
-                            else:
-                                print(f"      ✗ HTTP {response.status_code} (exhausted retries)")
-                                failed += 1
-                                failed_urls.append((media_url, filename, f"HTTP {response.status_code}"))
-                                break
-                        
-                        response.raise_for_status()
-                        
-                        # Get file size for progress bar
-                        total_size = int(response.headers.get('content-length', 0))
-                        
-                        # Show progress bar for files larger than 10 MB
-                        show_progress = total_size > 10 * 1024 * 1024
-                        
-                        if show_progress:
-                            # Create progress bar
-                            pbar = tqdm(
-                                total=total_size,
-                                unit='B',
-                                unit_scale=True,
-                                unit_divisor=1024,
-                                desc=f"      ⬇ {filename[:30]}",
-                                leave=False,
-                                ncols=80
-                            )
-                            
-                            with open(save_path, 'wb') as f:
-                                downloaded = 0
-                                for chunk in response.iter_content(chunk_size=8192):
-                                    if chunk:
-                                        f.write(chunk)
-                                        downloaded += len(chunk)
-                                        pbar.update(len(chunk))
-                            
-                            pbar.close()
-                        else:
-                            # No progress bar for small files
-                            with open(save_path, 'wb') as f:
-                                for chunk in response.iter_content(chunk_size=8192):
-                                    if chunk:
-                                        f.write(chunk)
-                        
-                        actual_size = os.path.getsize(save_path)
-                        
-                        min_size = 1024 if is_video else 51200
-                        
-                        if actual_size < min_size:
-                            size_kb = actual_size / 1024
-                            print(f"      ✗ Too small ({size_kb:.1f} KB)")
-                            os.remove(save_path)
-                            failed += 1
-                            skipped_small += 1
-                            failed_urls.append((media_url, filename, f"Too small: {size_kb:.1f} KB"))
-                        else:
-                            size_kb = actual_size / 1024
-                            if size_kb > 1024:
-                                print(f"      ✓ Downloaded ({size_kb/1024:.2f} MB)")
-                            else:
-                                print(f"      ✓ Downloaded ({size_kb:.1f} KB)")
-                            successful += 1
-                            download_failed = False
-                        
-                        break
-                        
-                    except requests.exceptions.Timeout:
-                        if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)
-                            print(f"      ✗ Timeout (waiting {wait_time}s...)")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            print(f"      ✗ Timeout (exhausted retries)")
-                            failed += 1
-                            failed_urls.append((media_url, filename, "Timeout"))
-                            
-                    except requests.exceptions.HTTPError as e:
-                        status_code = e.response.status_code if hasattr(e, 'response') else 'unknown'
-                        if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)
-                            print(f"      ✗ HTTP {status_code} (waiting {wait_time}s...)")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            print(f"      ✗ HTTP {status_code} (exhausted retries)")
-                            failed += 1
-                            failed_urls.append((media_url, filename, f"HTTP {status_code}"))
-                        
-                    except Exception as e:
-                        error_name = type(e).__name__
-                        if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)
-                            print(f"      ✗ {error_name} (waiting {wait_time}s...)")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            print(f"      ✗ {error_name} (exhausted retries)")
-                            failed += 1
-                            failed_urls.append((media_url, filename, error_name))
-                
-                import random
-                base_delay = 1.5 if not is_video else 2.5
-                jitter = random.uniform(0, 0.5)
-                await asyncio.sleep(base_delay + jitter)
+                download_jobs.append(DownloadJob(
+                    url=media_url,
+                    path=os.path.join(user_folder, filename),
+                    headers=self.headers,
+                    label=f"[{file_type}] {filename[:35]}",
+                    min_size=1024 if is_video else 51200,
+                    timeout=180 if is_video else 90,
+                    expected_sha256=sha256_from_url(media_url),   # Files are stored under their hash
+                    source=post_url,
+                ))
+            
+            results = await self.engine.run(download_jobs)
+            
+            successful = sum(1 for result in results if result.ok)
+            failed = len(results) - successful
+            skipped_small = sum(1 for result in results if result.error.startswith('Too small'))
+            for result in results:
+                if not result.ok:
+                    failed_urls.append((result.job.url, os.path.basename(result.job.path), result.error))
+            # Files that are too small will be too small next time as well
+            if all(result.ok or result.error.startswith('Too small') for result in results):
+                await asyncio.get_running_loop().run_in_executor(None, MANIFEST.mark_page_done, post_url, successful)
             
             if skipped_small > 0:
                 print(f"  ℹ Skipped {skipped_small} file(s) < 50 KB")
@@ -2847,10 +5772,6 @@ class CoomerScraper:
             
         except Exception as e:
             print(f"  ✗ Error: {e}")
-            try:
-                await page.close()
-            except:
-                pass
             return 0, 1, []
     
     async def download_user_profile_async(self, url):
@@ -2869,10 +5790,16 @@ class CoomerScraper:
             print(f"User: {username}")
             print()
             
-            # Get ALL post links with pagination
-            post_links = await self.get_all_post_links(url)
+            # Page 1 is enough to choose what to download; later pages are
+            # discovered while the first posts are already downloading
+            post_pages = self.iter_post_links(url)
+            try:
+                post_links = await post_pages.__anext__()
+            except StopAsyncIteration:
+                post_links = []
             
             if not post_links:
+                await post_pages.aclose()
                 print("✗ No posts found on this profile")
                 print("\nThis could mean:")
                 print("  • The profile has no posts")
@@ -2880,54 +5807,69 @@ class CoomerScraper:
                 print("  • Posts are loaded via infinite scroll (need to scroll down)")
                 return
             
-            print(f"\n✓ Total posts found: {len(post_links)}")
-            
-            # Show sample
-            print("\nSample posts:")
-            for i, link in enumerate(post_links[:10], 1):
-                post_id = link.split('/post/')[-1].split('?')[0] if '/post/' in link else 'unknown'
-                print(f"  {i}. Post {post_id}")
-            if len(post_links) > 10:
-                print(f"  ... and {len(post_links) - 10} more")
-            
-            # Ask user
-            print(f"\n{'='*60}")
-            print("DOWNLOAD OPTIONS")
-            print('='*60)
-            print(f"1. Download ALL {len(post_links)} posts")
-            print(f"2. Download first N posts")
-            print(f"3. Download specific range (e.g., 1-100)")
-            print(f"4. Cancel")
-            
-            choice = input("\nChoose option (1/2/3/4): ").strip()
-            
-            if choice == '4':
-                print("Download cancelled.")
-                return
-            elif choice == '2':
-                try:
-                    n = int(input(f"How many posts? (1-{len(post_links)}): ").strip())
-                    post_links = post_links[:n]
-                    print(f"✓ Will download first {len(post_links)} posts")
-                except:
-                    print("Invalid, downloading all.")
-            elif choice == '3':
-                try:
-                    range_input = input("Enter range (e.g., 1-100 or 50-150): ").strip()
-                    if '-' in range_input:
-                        start, end = map(int, range_input.split('-'))
-                        start = max(1, start) - 1  # Convert to 0-indexed
-                        end = min(len(post_links), end)
-                        post_links = post_links[start:end]
-                        print(f"✓ Will download posts {start+1} to {end}")
-                except:
-                    print("Invalid range, downloading all.")
+            profile_key = url.split('?')[0].rstrip('/')
+            sync = PostSync(profile_key) if self.sync else None
+            if sync:
+                # Unattended: everything new since the last run, no questions
+                post_links, post_pages = sync.start(post_links, post_pages)
+                first_post, last_post, total_label = 1, None, "?"
+                if not post_links and sync.reached_known:
+                    await post_pages.aclose()
+                    print("✓ No new posts")
+                    return
             else:
-                print(f"✓ Will download all {len(post_links)} posts")
+                total_posts = max(self.expected_posts or 0, len(post_links))
+                print(f"\n✓ Total posts: {total_posts}")
+                
+                # Show sample
+                print("\nSample posts:")
+                for i, link in enumerate(post_links[:10], 1):
+                    post_id = link.split('/post/')[-1].split('?')[0] if '/post/' in link else 'unknown'
+                    print(f"  {i}. Post {post_id}")
+                if total_posts > 10:
+                    print(f"  ... and {total_posts - 10} more")
+                
+                # Ask user
+                print(f"\n{'='*60}")
+                print("DOWNLOAD OPTIONS")
+                print('='*60)
+                print(f"1. Download ALL {total_posts} posts")
+                print(f"2. Download first N posts")
+                print(f"3. Download specific range (e.g., 1-100)")
+                print(f"4. Cancel")
+                
+                choice = input("\nChoose option (1/2/3/4): ").strip()
+                
+                first_post, last_post = 1, total_posts
+                if choice == '4':
+                    await post_pages.aclose()
+                    print("Download cancelled.")
+                    return
+                elif choice == '2':
+                    try:
+                        n = int(input(f"How many posts? (1-{total_posts}): ").strip())
+                        last_post = min(total_posts, n)
+                        print(f"✓ Will download first {last_post} posts")
+                    except:
+                        print("Invalid, downloading all.")
+                elif choice == '3':
+                    try:
+                        range_input = input("Enter range (e.g., 1-100 or 50-150): ").strip()
+                        if '-' in range_input:
+                            start, end = map(int, range_input.split('-'))
+                            first_post = max(1, start)
+                            last_post = min(total_posts, end)
+                            print(f"✓ Will download posts {first_post} to {last_post}")
+                    except:
+                        print("Invalid range, downloading all.")
+                else:
+                    print(f"✓ Will download all {total_posts} posts")
+                total_label = str(last_post - first_post + 1)
             
             # Create folder
             timestamp = time.strftime("%Y%m%d_%H%M%S")
-            user_folder = os.path.join(self.download_path, f"coomer_{service}_{username}_{timestamp}")
+            user_folder = MANIFEST.folder_for(profile_key,
+                                              os.path.join(self.download_path, f"coomer_{service}_{username}_{timestamp}"))
             os.makedirs(user_folder, exist_ok=True)
             
             # Download each post
@@ -2935,15 +5877,27 @@ class CoomerScraper:
             print("DOWNLOADING POSTS")
             print('='*60)
             
+            # Shared engine: files from several posts download concurrently
+            self.engine = DownloadEngine(jobs=self.jobs, per_host=self.per_host, retries=5, retry_delay=3,
+                                         video_jobs=self.video_jobs, order=self.order,
+                                         segments=self.segments, segment_threshold=self.segment_threshold)
+            self.render_lock = asyncio.Lock()
+            
             total_files = 0
             total_failed = 0
             all_failed_urls = []  # ← ADD THIS: Collect all failed URLs
             
-            for i, post_url in enumerate(post_links, 1):
-                post_id = post_url.split('/post/')[-1].split('?')[0] if '/post/' in post_url else f'{i}'
-                print(f"\n[{i}/{len(post_links)}] Post {post_id}:")
-                
-                successful, failed, failed_urls = await self.download_single_post(post_url, user_folder)  # ← CHANGE
+            # Pages render in order while up to jobs * 2 posts have downloads in flight
+            post_results = await run_post_pipeline(
+                post_links, post_pages,
+                lambda post_url, header: self.download_single_post(post_url, user_folder, header),
+                first=first_post, last=last_post, workers=max(2, self.jobs * 2),
+                total_label=total_label
+            )
+            if sync:
+                sync.save(post_results, listing_complete=not self.failed_pages)
+            
+            for _, post_id, (successful, failed, failed_urls) in post_results:
                 total_files += successful
                 total_failed += failed
                 
@@ -2951,8 +5905,6 @@ class CoomerScraper:
                 if failed_urls:
                     for url, filename, error in failed_urls:
                         all_failed_urls.append((post_id, url, filename, error))
-                
-                await asyncio.sleep(1)
             
             # Summary
             print(f"\n{'='*60}")
@@ -2960,7 +5912,7 @@ class CoomerScraper:
             print('='*60)
             print(f"User: {username}")
             print(f"Service: {service}")
-            print(f"Total posts processed: {len(post_links)}")
+            print(f"Total posts processed: {len(post_results)}")
             print(f"Total files downloaded: {total_files}")
             print(f"Total files failed: {total_failed}")
             print(f"Location: {user_folder}")
@@ -2978,7 +5930,7 @@ class CoomerScraper:
             print('='*60)
             print(f"User: {username}")
             print(f"Service: {service}")
-            print(f"Total posts processed: {len(post_links)}")
+            print(f"Total posts processed: {len(post_results)}")
             print(f"Total files downloaded: {total_files}")
             print(f"Total files failed: {total_failed}")
             print(f"Location: {user_folder}")
@@ -3016,6 +5968,9 @@ class CoomerScraper:
             import traceback
             traceback.print_exc()
         finally:
+            if self.engine:
+                await self.engine.close()
+                self.engine = None
             await self.close_browser()
     
     async def scrape(self, url):
@@ -3025,9 +5980,14 @@ class CoomerScraper:
 class FapelloScraper:
     """Scraper for fapello.com profiles using Playwright"""
     
-    def __init__(self, output_dir: str = "downloads"):
+    def __init__(self, output_dir: str = "downloads", jobs: int = 4, per_host: int = 2,
+                 video_jobs: int = 2, order: str = 'sjf'):
         self.session = requests.Session()
         self.download_path = output_dir
+        self.jobs = jobs
+        self.per_host = per_host
+        self.video_jobs = video_jobs
+        self.order = order
         self.playwright = None
         self.browser = None
         self.context = None
@@ -3239,26 +6199,30 @@ class FapelloScraper:
             username = parsed.path.strip('/').split('/')[-1]
             print(f"User: {username}\n")
             
-            # Initialize browser
-            await self.init_browser()
-            
-            # Open page
-            print("🌐 Loading profile page...")
-            page = await self.context.new_page()
-            
+            page = None
             try:
-                await page.goto(profile_url, wait_until='domcontentloaded', timeout=30000)
-                
-                # Wait for content to load
-                await page.wait_for_selector('img, a[href*="jpg"]', timeout=10000)
-                
-                # Scroll to load all images
-                await self.scroll_to_load_all(page, max_scrolls=150)
-                
-                # Get the fully rendered HTML
-                html_content = await page.content()
-                
-                await page.close()
+                if ARCHIVE.replaying:
+                    html_content = ARCHIVE.load(profile_url, 'rendered')[1]
+                else:
+                    # Initialize browser
+                    await self.init_browser()
+                    
+                    # Open page
+                    print("🌐 Loading profile page...")
+                    page = await self.context.new_page()
+                    await page.goto(profile_url, wait_until='domcontentloaded', timeout=30000)
+                    
+                    # Wait for content to load
+                    await page.wait_for_selector('img, a[href*="jpg"]', timeout=10000)
+                    
+                    # Scroll to load all images
+                    await self.scroll_to_load_all(page, max_scrolls=150)
+                    
+                    # Get the fully rendered HTML
+                    html_content = await page.content()
+                    
+                    await page.close()
+                    ARCHIVE.save(profile_url, html_content, 'rendered')
                 
                 # Extract images from this profile
                 print("\n🔍 Extracting image URLs...")
@@ -3281,7 +6245,8 @@ class FapelloScraper:
                 
                 # Create folder
                 timestamp = time.strftime("%Y%m%d_%H%M%S")
-                download_folder = os.path.join(self.download_path, f"fapello_{username}_{timestamp}")
+                download_folder = MANIFEST.folder_for(profile_url, os.path.join(self.download_path,
+                                                                                 f"fapello_{username}_{timestamp}"))
                 os.makedirs(download_folder, exist_ok=True)
                 
                 # Download images
@@ -3289,9 +6254,7 @@ class FapelloScraper:
                 print("DOWNLOADING IMAGES")
                 print('='*60)
                 
-                successful = 0
-                failed = 0
-                
+                download_jobs = []
                 for i, img_url in enumerate(sorted(img_urls), 1):
                     filename = os.path.basename(urlparse(img_url).path)
                     
@@ -3302,56 +6265,21 @@ class FapelloScraper:
                     if not filename or '.' not in filename:
                         filename = f"{username}_{i:04d}.jpg"
                     
-                    save_path = os.path.join(download_folder, filename)
-                    
-                    if os.path.exists(save_path) and os.path.getsize(save_path) > 10240:
-                        print(f"[{i}/{len(img_urls)}] ⊙ Exists: {filename[:45]}...")
-                        successful += 1
-                        continue
-                    
-                    try:
-                        print(f"[{i}/{len(img_urls)}] Downloading: {filename[:45]}...", end=' ')
-                        
-                        # Download with retries
-                        for attempt in range(3):
-                            try:
-                                img_response = self.session.get(img_url, headers=self.headers, 
-                                                               stream=True, timeout=60)
-                                img_response.raise_for_status()
-                                break
-                            except:
-                                if attempt < 2:
-                                    await asyncio.sleep(2)
-                                    continue
-                                else:
-                                    raise
-                        
-                        with open(save_path, 'wb') as f:
-                            for chunk in img_response.iter_content(chunk_size=8192):
-                                if chunk:
-                                    f.write(chunk)
-                        
-                        file_size = os.path.getsize(save_path)
-                        
-                        # Require at least 10KB for images
-                        if file_size < 10240:
-                            print(f"✗ Too small ({file_size/1024:.1f} KB)")
-                            os.remove(save_path)
-                            failed += 1
-                        else:
-                            size_kb = file_size / 1024
-                            if size_kb > 1024:
-                                print(f"✓ ({size_kb/1024:.2f} MB)")
-                            else:
-                                print(f"✓ ({size_kb:.1f} KB)")
-                            successful += 1
-                        
-                    except Exception as e:
-                        print(f"✗ {type(e).__name__}")
-                        failed += 1
-                    
-                    # Rate limiting
-                    await asyncio.sleep(0.5)
+                    download_jobs.append(DownloadJob(
+                        url=img_url,
+                        path=os.path.join(download_folder, filename),
+                        headers=self.headers,
+                        label=filename[:45],
+                        min_size=10240,     # Require at least 10KB for images
+                        source=profile_url,
+                    ))
+                
+                async with DownloadEngine(jobs=self.jobs, per_host=self.per_host, retry_delay=2,
+                                          video_jobs=self.video_jobs, order=self.order) as engine:
+                    results = await engine.run(download_jobs)
+                
+                successful = sum(1 for result in results if result.ok)
+                failed = len(results) - successful
                 
                 # Summary
                 print(f"\n{'='*60}")
@@ -3391,9 +6319,14 @@ class FapelloScraper:
 class PixhostScraper:
     """Scraper for pixhost.to galleries"""
     
-    def __init__(self, output_dir: str = "downloads"):
+    def __init__(self, output_dir: str = "downloads", jobs: int = 4, per_host: int = 2,
+                 video_jobs: int = 2, order: str = 'sjf'):
         self.session = requests.Session()
         self.download_path = output_dir
+        self.jobs = jobs
+        self.per_host = per_host
+        self.video_jobs = video_jobs
+        self.order = order
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -3423,7 +6356,8 @@ class PixhostScraper:
                 
                 # Extract full image URL from individual page
                 try:
-                    response = self.session.get(href, headers=self.headers, timeout=15)
+                    response = PAGE_CACHE.get(self.session, href, headers=self.headers, timeout=15)
+                    RATE_LIMITER.observe(href, response.status_code, response.headers)
                     if response.status_code == 200:
                         # Look for the full-size image in the page
                         img_soup = BeautifulSoup(response.text, 'html.parser')
@@ -3448,8 +6382,6 @@ class PixhostScraper:
                                     image_urls.append(href2)
                                     break
                     
-                    time.sleep(0.3)  # Rate limiting
-                    
                 except Exception as e:
                     print(f"  ⚠ Failed to get image from {href}: {e}")
                     continue
@@ -3471,7 +6403,7 @@ class PixhostScraper:
             
             # Fetch gallery page
             print("🔍 Loading gallery page...")
-            response = self.session.get(gallery_url, headers=self.headers, timeout=30)
+            response = PAGE_CACHE.get(self.session, gallery_url, headers=self.headers, timeout=30)
             response.raise_for_status()
             
             # Extract image URLs
@@ -3501,7 +6433,8 @@ class PixhostScraper:
             
             # Create download folder
             timestamp = time.strftime("%Y%m%d_%H%M%S")
-            download_folder = os.path.join(self.download_path, f"pixhost_{gallery_id}_{timestamp}")
+            download_folder = MANIFEST.folder_for(gallery_url, os.path.join(self.download_path,
+                                                                            f"pixhost_{gallery_id}_{timestamp}"))
             os.makedirs(download_folder, exist_ok=True)
             
             # Download images
@@ -3509,9 +6442,7 @@ class PixhostScraper:
             print("DOWNLOADING IMAGES")
             print('='*60)
             
-            successful = 0
-            failed = 0
-            
+            download_jobs = []
             for i, img_url in enumerate(image_urls, 1):
                 filename = os.path.basename(urlparse(img_url).path)
                 
@@ -3522,58 +6453,19 @@ class PixhostScraper:
                 if not filename or '.' not in filename:
                     filename = f"pixhost_{i:04d}.jpg"
                 
-                save_path = os.path.join(download_folder, filename)
-                
-                # Skip if exists
-                if os.path.exists(save_path) and os.path.getsize(save_path) > 10240:
-                    print(f"[{i}/{len(image_urls)}] ⊙ Exists: {filename[:45]}...")
-                    successful += 1
-                    continue
-                
-                try:
-                    print(f"[{i}/{len(image_urls)}] Downloading: {filename[:45]}...", end=' ')
-                    
-                    # Download with retries
-                    for attempt in range(3):
-                        try:
-                            img_response = self.session.get(img_url, headers=self.headers, 
-                                                           stream=True, timeout=60)
-                            img_response.raise_for_status()
-                            break
-                        except:
-                            if attempt < 2:
-                                time.sleep(2)
-                                continue
-                            else:
-                                raise
-                    
-                    # Save file
-                    with open(save_path, 'wb') as f:
-                        for chunk in img_response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                    
-                    file_size = os.path.getsize(save_path)
-                    
-                    # Validate minimum size
-                    if file_size < 10240:  # 10KB minimum
-                        print(f"✗ Too small ({file_size/1024:.1f} KB)")
-                        os.remove(save_path)
-                        failed += 1
-                    else:
-                        size_kb = file_size / 1024
-                        if size_kb > 1024:
-                            print(f"✓ ({size_kb/1024:.2f} MB)")
-                        else:
-                            print(f"✓ ({size_kb:.1f} KB)")
-                        successful += 1
-                    
-                except Exception as e:
-                    print(f"✗ {type(e).__name__}")
-                    failed += 1
-                
-                # Rate limiting
-                time.sleep(0.5)
+                download_jobs.append(DownloadJob(
+                    url=img_url,
+                    path=os.path.join(download_folder, filename),
+                    headers=self.headers,
+                    label=filename[:45],
+                    min_size=10240,     # 10KB minimum, smaller files are placeholders
+                    source=gallery_url,
+                ))
+            
+            results = run_downloads(download_jobs, jobs=self.jobs, per_host=self.per_host,
+                                    video_jobs=self.video_jobs, order=self.order, retry_delay=2)
+            successful = sum(1 for result in results if result.ok)
+            failed = len(results) - successful
             
             # Summary
             print(f"\n{'='*60}")
@@ -3604,9 +6496,21 @@ class PixhostScraper:
 class KemonoScraper:
     """Scraper for kemono.party/kemono.cr/kemono.su using Playwright"""
     
-    def __init__(self, output_dir: str = "downloads"):
-        self.session = requests.Session()
+    def __init__(self, output_dir: str = "downloads", jobs: int = 4, per_host: int = 2,
+                 video_jobs: int = 2, order: str = 'sjf', segments: int = 1, segment_threshold: int = 50 * 1024 * 1024,
+                 sync: bool = False):
         self.download_path = output_dir
+        self.jobs = jobs
+        self.per_host = per_host
+        self.video_jobs = video_jobs
+        self.order = order
+        self.segments = segments
+        self.segment_threshold = segment_threshold
+        self.sync = sync            # Only posts newer than the last run (see PostSync)
+        self.engine = None
+        self.render_lock = None  # Post pages render one at a time
+        self.expected_posts = None  # Post count reported by page 1 of the profile
+        self.failed_pages = 0  # Profile listing pages that didn't load
         self.playwright = None
         self.browser = None
         self.context = None
@@ -3649,29 +6553,55 @@ class KemonoScraper:
         except:
             pass
     
-    async def get_rendered_page(self, url, max_retries=3):
-        """Get fully rendered page content with retry logic"""
+    async def get_rendered_page(self, url, max_retries=3, max_age=None):
+        """Get fully rendered page content with retry logic
+        
+        A render cached less than max_age seconds ago (default: the render
+        cache's listing TTL) is returned without opening the browser.
+        """
+        if ARCHIVE.replaying:
+            try:
+                return ARCHIVE.load(url, 'rendered')[1]
+            except ReplayError as e:
+                # Same as a page that failed to load
+                print(f"  ✗ {e}")
+                return None
+        html_content = RENDER_CACHE.get(url, RENDER_CACHE.listing_ttl if max_age is None else max_age)
+        if html_content is not None:
+            ARCHIVE.save(url, html_content, 'rendered')
+            return html_content
+        
         if not self.browser:
             await self.init_browser()
         
         page = await self.context.new_page()
         
         for attempt in range(max_retries):
+            if not RETRY_POLICY.allow(url):
+                print(f"  ✗ {urlparse(url).netloc} keeps failing, skipped (circuit open)")
+                await page.close()
+                return None
             try:
+                await RATE_LIMITER.acquire(url)
+                started = time.monotonic()
                 await page.goto(url, wait_until='networkidle', timeout=60000)
                 await page.wait_for_selector('article, .post, .card', timeout=20000)
                 await asyncio.sleep(2)
                 
                 html_content = await page.content()
                 await page.close()
+                RETRY_POLICY.record(url, True)
+                RENDER_CACHE.put(url, html_content, time.monotonic() - started)
+                ARCHIVE.save(url, html_content, 'rendered')
                 return html_content
                 
             except Exception as e:
                 error_type = type(e).__name__
+                RETRY_POLICY.record(url, False)
                 
-                if attempt < max_retries - 1:
-                    wait_time = 5 * (attempt + 1)
-                    print(f"  ✗ {error_type} (attempt {attempt+1}/{max_retries}), retrying in {wait_time}s...")
+                if attempt < max_retries - 1 and RETRY_POLICY.take_retry(url):
+                    wait_time = RETRY_POLICY.backoff(attempt + 1, 5)
+                    print(f"  ✗ {error_type} (attempt {attempt+1}/{max_retries}), retrying in {wait_time:.1f}s...")
                     
                     try:
                         await page.close()
@@ -3733,23 +6663,32 @@ class KemonoScraper:
         
         return max_offset
     
-    async def get_all_post_links(self, profile_url):
-        """Get ALL post links from profile by following pagination"""
+    async def iter_post_links(self, profile_url):
+        """Yield post links page by page, following pagination
+        
+        self.expected_posts holds an upper estimate of the post count once page 1 is loaded,
+        and self.failed_pages counts the later pages that couldn't be loaded.
+        """
         print("🔍 Loading profile page...")
+        self.expected_posts = None
+        self.failed_pages = 0
         
-        # Get first page
-        html_content = await self.get_rendered_page(profile_url)
+        # Get first page (--sync needs to see the newest posts)
+        html_content = await self.get_rendered_page(profile_url, max_age=0 if self.sync else None)
         
         if not html_content:
             print("✗ Could not load profile page")
-            return []
+            return
         
         # Extract posts from first page
         all_post_links = self.extract_post_links_from_html(html_content, profile_url)
+        seen_links = set(all_post_links)
         print(f"✓ Extracted {len(all_post_links)} posts from page 1")
         
         # Detect pagination
         max_offset = self.extract_pagination_info(html_content)
+        self.expected_posts = max_offset + 50 if max_offset > 0 else len(all_post_links)
+        yield list(all_post_links)
         
         if max_offset > 0:
             # Kemono typically uses 50 posts per page
@@ -3768,7 +6707,8 @@ class KemonoScraper:
                 
                 if page_html:
                     page_posts = self.extract_post_links_from_html(page_html, profile_url)
-                    new_posts = [p for p in page_posts if p not in all_post_links]
+                    new_posts = [p for p in page_posts if p not in seen_links]
+                    seen_links.update(new_posts)
                     all_post_links.extend(new_posts)
                     
                     print(f"    ✓ Found {len(new_posts)} new posts (total: {len(all_post_links)})")
@@ -3776,13 +6716,12 @@ class KemonoScraper:
                     if len(new_posts) == 0:
                         print(f"    ℹ No more new posts, stopping pagination")
                         break
+                    yield new_posts
                 else:
+                    self.failed_pages += 1
                     print(f"    ✗ Failed to load page after all retries")
                 
                 current_offset += 50
-                await asyncio.sleep(2)
-        
-        return all_post_links
     
     def extract_media_from_html(self, html_content, base_url):
         """Extract media URLs from rendered post HTML"""
@@ -3827,24 +6766,63 @@ class KemonoScraper:
         
         return list(media_urls)
     
-    async def download_single_post(self, post_url, user_folder):
+    async def download_single_post(self, post_url, user_folder, header=None):
         """Download all media from a single post"""
-        if not self.browser:
-            await self.init_browser()
-        
-        page = await self.context.new_page()
         failed_urls = []
         
+        # Posts whose files all finished in an earlier run aren't rendered again
+        done_files = await asyncio.get_running_loop().run_in_executor(None, MANIFEST.page_done, post_url, user_folder)
+        if done_files is not None:
+            if header:
+                print(header)
+            print(f"  ⊙ Already downloaded ({done_files} files)")
+            return done_files, 0, []
+        
         try:
-            await page.goto(post_url, wait_until='networkidle', timeout=30000)
-            
-            try:
-                await page.wait_for_selector('img[src*="/data/"], a[href*="/data/"], video', timeout=10000)
-            except:
-                await asyncio.sleep(3)
-            
-            html_content = await page.content()
-            await page.close()
+            if ARCHIVE.replaying:
+                try:
+                    html_content = ARCHIVE.load(post_url, 'rendered')[1]
+                except ReplayError as e:
+                    if header:
+                        print(header)
+                    print(f"  ✗ {e}")
+                    return 0, 1, []
+            else:
+                html_content = RENDER_CACHE.get(post_url, RENDER_CACHE.post_ttl)
+            if html_content is not None:
+                if header:
+                    print(header)
+                print("  ⚡ Reusing an earlier render of this post")
+            else:
+                # Only rendering is serialized; earlier posts keep downloading meanwhile
+                async with self.render_lock:
+                    if header:
+                        print(header)
+                    if not self.browser:
+                        await self.init_browser()
+                    
+                    page = await self.context.new_page()
+                    try:
+                        await RATE_LIMITER.acquire(post_url)
+                        started = time.monotonic()
+                        await page.goto(post_url, wait_until='networkidle', timeout=30000)
+                        
+                        rendered = True
+                        try:
+                            await page.wait_for_selector('img[src*="/data/"], a[href*="/data/"], video', timeout=10000)
+                        except:
+                            rendered = False    # Maybe a text-only post, maybe not loaded yet: don't cache
+                            await asyncio.sleep(3)
+                        
+                        html_content = await page.content()
+                        if rendered:
+                            RENDER_CACHE.put(post_url, html_content, time.monotonic() - started)
+                    finally:
+                        try:
+                            await page.close()
+                        except:
+                            pass
+            ARCHIVE.save(post_url, html_content, 'rendered')
             
             media_urls = self.extract_media_from_html(html_content, post_url)
             
@@ -3875,9 +6853,7 @@ class KemonoScraper:
             
             print(f"  ✓ Found {len(media_urls)} unique files ({image_count} images, {video_count} videos)")
             
-            successful = 0
-            failed = 0
-            
+            download_jobs = []
             for i, media_url in enumerate(media_urls, 1):
                 is_video = any(ext in media_url.lower() for ext in ['.mp4', '.webm'])
                 file_type = "VIDEO" if is_video else "IMAGE"
@@ -3887,108 +6863,36 @@ class KemonoScraper:
                     ext = '.mp4' if is_video else '.jpg'
                     filename = f"file_{i:03d}{ext}"
                 
-                save_path = os.path.join(user_folder, filename)
-                
-                if os.path.exists(save_path) and os.path.getsize(save_path) > 0:
-                    print(f"    [{i}/{len(media_urls)}] [{file_type}] ⊙ Exists: {filename[:35]}...")
-                    successful += 1
-                    continue
-                
-                max_retries = 5
-                retry_delay = 3
-                
-                for attempt in range(max_retries):
-                    try:
-                        if attempt > 0:
-                            print(f"    [{i}/{len(media_urls)}] [{file_type}] Retry {attempt}/{max_retries-1}: {filename[:35]}...", end=' ')
-                        else:
-                            print(f"    [{i}/{len(media_urls)}] [{file_type}] Downloading: {filename[:35]}...", end=' ')
-                        
-                        timeout_duration = 180 if is_video else 90
-                        
-                        # Set referer to kemono domain
-                        download_headers = self.headers.copy()
-                        download_headers['Referer'] = urlparse(media_url).scheme + '://' + urlparse(media_url).netloc + '/'
-                        
-                        response = self.session.get(
-                            media_url,
-                            headers=download_headers,
-                            stream=True,
-                            timeout=timeout_duration
-                        )
-                        
-                        if response.status_code in [500, 503]:
-                            if attempt < max_retries - 1:
-                                wait_time = retry_delay * (2 ** attempt)
-                                print(f"✗ HTTP {response.status_code} (waiting {wait_time}s...)")
-                                await asyncio.sleep(wait_time)
-                                continue
-                            else:
-                                print(f"✗ HTTP {response.status_code} (exhausted retries)")
-                                failed += 1
-                                failed_urls.append((media_url, filename, f"HTTP {response.status_code}"))
-                                break
-                        
-                        response.raise_for_status()
-                        
-                        with open(save_path, 'wb') as f:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                if chunk:
-                                    f.write(chunk)
-                        
-                        actual_size = os.path.getsize(save_path)
-                        min_size = 1024 if is_video else 51200
-                        
-                        if actual_size < min_size:
-                            size_kb = actual_size / 1024
-                            print(f"✗ Too small ({size_kb:.1f} KB)")
-                            os.remove(save_path)
-                            failed += 1
-                            failed_urls.append((media_url, filename, f"Too small: {size_kb:.1f} KB"))
-                        else:
-                            size_kb = actual_size / 1024
-                            if size_kb > 1024:
-                                print(f"✓ ({size_kb/1024:.2f} MB)")
-                            else:
-                                print(f"✓ ({size_kb:.1f} KB)")
-                            successful += 1
-                        
-                        break
-                        
-                    except requests.exceptions.Timeout:
-                        if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)
-                            print(f"✗ Timeout (waiting {wait_time}s...)")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            print(f"✗ Timeout (exhausted retries)")
-                            failed += 1
-                            failed_urls.append((media_url, filename, "Timeout"))
-                            
-                    except Exception as e:
-                        error_name = type(e).__name__
-                        if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)
-                            print(f"✗ {error_name} (waiting {wait_time}s...)")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            print(f"✗ {error_name} (exhausted retries)")
-                            failed += 1
-                            failed_urls.append((media_url, filename, error_name))
+                # Set referer to kemono domain
+                download_headers = self.headers.copy()
+                download_headers['Referer'] = urlparse(media_url).scheme + '://' + urlparse(media_url).netloc + '/'
                 
-                import random
-                base_delay = 1.5 if not is_video else 2.5
-                jitter = random.uniform(0, 0.5)
-                await asyncio.sleep(base_delay + jitter)
+                download_jobs.append(DownloadJob(
+                    url=media_url,
+                    path=os.path.join(user_folder, filename),
+                    headers=download_headers,
+                    label=f"[{file_type}] {filename[:35]}",
+                    min_size=1024 if is_video else 51200,
+                    timeout=180 if is_video else 90,
+                    expected_sha256=sha256_from_url(media_url),   # Files are stored under their hash
+                    source=post_url,
+                ))
+            
+            results = await self.engine.run(download_jobs)
+            
+            successful = sum(1 for result in results if result.ok)
+            failed = len(results) - successful
+            for result in results:
+                if not result.ok:
+                    failed_urls.append((result.job.url, os.path.basename(result.job.path), result.error))
+            # Files that are too small will be too small next time as well
+            if all(result.ok or result.error.startswith('Too small') for result in results):
+                await asyncio.get_running_loop().run_in_executor(None, MANIFEST.mark_page_done, post_url, successful)
             
             return successful, failed, failed_urls
             
         except Exception as e:
             print(f"  ✗ Error: {e}")
-            try:
-                await page.close()
-            except:
-                pass
             return 0, 1, []
     
     async def download_user_profile_async(self, url):
@@ -4007,59 +6911,81 @@ class KemonoScraper:
             print(f"User ID: {user_id}")
             print()
             
-            # Get ALL post links with pagination
-            post_links = await self.get_all_post_links(url)
+            # Page 1 is enough to choose what to download; later pages are
+            # discovered while the first posts are already downloading
+            post_pages = self.iter_post_links(url)
+            try:
+                post_links = await post_pages.__anext__()
+            except StopAsyncIteration:
+                post_links = []
             
             if not post_links:
+                await post_pages.aclose()
                 print("✗ No posts found on this profile")
                 return
             
-            print(f"\n✓ Total posts found: {len(post_links)}")
-            
-            # Show sample
-            print("\nSample posts:")
-            for i, link in enumerate(post_links[:10], 1):
-                post_id = link.split('/post/')[-1].split('?')[0] if '/post/' in link else 'unknown'
-                print(f"  {i}. Post {post_id}")
-            if len(post_links) > 10:
-                print(f"  ... and {len(post_links) - 10} more")
-            
-            # Ask user
-            print(f"\n{'='*60}")
-            print("DOWNLOAD OPTIONS")
-            print('='*60)
-            print(f"1. Download ALL {len(post_links)} posts")
-            print(f"2. Download first N posts")
-            print(f"3. Download specific range (e.g., 1-100)")
-            print(f"4. Cancel")
-            
-            choice = input("\nChoose option (1/2/3/4): ").strip()
-            
-            if choice == '4':
-                print("Download cancelled.")
-                return
-            elif choice == '2':
-                try:
-                    n = int(input(f"How many posts? (1-{len(post_links)}): ").strip())
-                    post_links = post_links[:n]
-                    print(f"✓ Will download first {len(post_links)} posts")
-                except:
-                    print("Invalid, downloading all.")
-            elif choice == '3':
-                try:
-                    range_input = input("Enter range (e.g., 1-100 or 50-150): ").strip()
-                    if '-' in range_input:
-                        start, end = map(int, range_input.split('-'))
-                        start = max(1, start) - 1
-                        end = min(len(post_links), end)
-                        post_links = post_links[start:end]
-                        print(f"✓ Will download posts {start+1} to {end}")
-                except:
-                    print("Invalid range, downloading all.")
+            profile_key = url.split('?')[0].rstrip('/')
+            sync = PostSync(profile_key) if self.sync else None
+            if sync:
+                # Unattended: everything new since the last run, no questions
+                post_links, post_pages = sync.start(post_links, post_pages)
+                first_post, last_post, total_label = 1, None, "?"
+                if not post_links and sync.reached_known:
+                    await post_pages.aclose()
+                    print("✓ No new posts")
+                    return
+            else:
+                # Kemono only exposes the last page offset, so the count is an estimate
+                total_posts = max(self.expected_posts or 0, len(post_links))
+                print(f"\n✓ Total posts: about {total_posts}")
+                
+                # Show sample
+                print("\nSample posts:")
+                for i, link in enumerate(post_links[:10], 1):
+                    post_id = link.split('/post/')[-1].split('?')[0] if '/post/' in link else 'unknown'
+                    print(f"  {i}. Post {post_id}")
+                if total_posts > 10:
+                    print(f"  ... and {total_posts - 10} more")
+                
+                # Ask user
+                print(f"\n{'='*60}")
+                print("DOWNLOAD OPTIONS")
+                print('='*60)
+                print(f"1. Download ALL ~{total_posts} posts")
+                print(f"2. Download first N posts")
+                print(f"3. Download specific range (e.g., 1-100)")
+                print(f"4. Cancel")
+                
+                choice = input("\nChoose option (1/2/3/4): ").strip()
+                
+                first_post, last_post = 1, total_posts
+                if choice == '4':
+                    await post_pages.aclose()
+                    print("Download cancelled.")
+                    return
+                elif choice == '2':
+                    try:
+                        n = int(input(f"How many posts? (1-{total_posts}): ").strip())
+                        last_post = min(total_posts, n)
+                        print(f"✓ Will download first {last_post} posts")
+                    except:
+                        print("Invalid, downloading all.")
+                elif choice == '3':
+                    try:
+                        range_input = input("Enter range (e.g., 1-100 or 50-150): ").strip()
+                        if '-' in range_input:
+                            start, end = map(int, range_input.split('-'))
+                            first_post = max(1, start)
+                            last_post = min(total_posts, end)
+                            print(f"✓ Will download posts {first_post} to {last_post}")
+                    except:
+                        print("Invalid range, downloading all.")
+                total_label = f"~{last_post - first_post + 1}"
             
             # Create folder
             timestamp = time.strftime("%Y%m%d_%H%M%S")
-            user_folder = os.path.join(self.download_path, f"kemono_{service}_{user_id}_{timestamp}")
+            user_folder = MANIFEST.folder_for(profile_key,
+                                              os.path.join(self.download_path, f"kemono_{service}_{user_id}_{timestamp}"))
             os.makedirs(user_folder, exist_ok=True)
             
             # Download each post
@@ -4067,23 +6993,33 @@ class KemonoScraper:
             print("DOWNLOADING POSTS")
             print('='*60)
             
+            # Shared engine: files from several posts download concurrently
+            self.engine = DownloadEngine(jobs=self.jobs, per_host=self.per_host, retries=5, retry_delay=3,
+                                         video_jobs=self.video_jobs, order=self.order,
+                                         segments=self.segments, segment_threshold=self.segment_threshold)
+            self.render_lock = asyncio.Lock()
+            
             total_files = 0
             total_failed = 0
             all_failed_urls = []
             
-            for i, post_url in enumerate(post_links, 1):
-                post_id = post_url.split('/post/')[-1].split('?')[0] if '/post/' in post_url else f'{i}'
-                print(f"\n[{i}/{len(post_links)}] Post {post_id}:")
-                
-                successful, failed, failed_urls = await self.download_single_post(post_url, user_folder)
+            # Pages render in order while up to jobs * 2 posts have downloads in flight
+            post_results = await run_post_pipeline(
+                post_links, post_pages,
+                lambda post_url, header: self.download_single_post(post_url, user_folder, header),
+                first=first_post, last=last_post, workers=max(2, self.jobs * 2),
+                total_label=total_label
+            )
+            if sync:
+                sync.save(post_results, listing_complete=not self.failed_pages)
+            
+            for _, post_id, (successful, failed, failed_urls) in post_results:
                 total_files += successful
                 total_failed += failed
                 
                 if failed_urls:
                     for url, filename, error in failed_urls:
                         all_failed_urls.append((post_id, url, filename, error))
-                
-                await asyncio.sleep(1)
             
             # Summary
             print(f"\n{'='*60}")
@@ -4091,7 +7027,7 @@ class KemonoScraper:
             print('='*60)
             print(f"User ID: {user_id}")
             print(f"Service: {service}")
-            print(f"Total posts processed: {len(post_links)}")
+            print(f"Total posts processed: {len(post_results)}")
             print(f"Total files downloaded: {total_files}")
             print(f"Total files failed: {total_failed}")
             print(f"Location: {user_folder}")
@@ -4127,6 +7063,9 @@ class KemonoScraper:
             import traceback
             traceback.print_exc()
         finally:
+            if self.engine:
+                await self.engine.close()
+                self.engine = None
             await self.close_browser()
     
     async def scrape(self, url):
@@ -4143,9 +7082,97 @@ async def main():
     parser.add_argument('--mode', choices=['auto', 'bunkr', 'pixeldrain', 'forum', 'gallery', 'coomer', 'fapello', 'pixhost', 'kemono'], default='auto')  # ← ADDED 'kemono'
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
     parser.add_argument('--key', help='Pixeldrain API key (optional)')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='Concurrent downloads in the image lane (default: 4)')
+    parser.add_argument('--per-host', type=int, default=2, help='Maximum concurrent downloads per host (default: 2)')
+    parser.add_argument('--video-jobs', type=int, default=2,
+                        help='Concurrent downloads in the video lane (videos, archives, files of 20MB+) (default: 2)')
+    parser.add_argument('--order', choices=['sjf', 'fifo'], default='sjf',
+                        help='Order within each lane: smallest first or as found (default: sjf)')
+    parser.add_argument('--segments', type=int, default=1,
+                        help='Split large files into N ranged connections (default: 1, off)')
+    parser.add_argument('--segment-min', type=parse_size, default='50M',
+                        help='Minimum file size for segmented downloads (default: 50M)')
+    parser.add_argument('--rate-config', help='JSON file with per-host rate limits (default: rate_limits.json if present)')
+    parser.add_argument('--max-rate', type=parse_size, default=0,
+                        help='Cap total download speed in bytes/sec, e.g. 50M (default: unlimited)')
+    parser.add_argument('--pixeldrain-zip', choices=['auto', 'on', 'off'], default='auto',
+                        help='Fetch Pixeldrain lists as one zip stream (default: auto, for big lists of small files)')
+    parser.add_argument('--retry-budget', type=int, default=200,
+                        help='Total retries allowed for the whole run (default: 200, 0 = unlimited)')
+    parser.add_argument('--http2', action='store_true',
+                        help='Use HTTP/2 for forum image CDNs (jpg*.su, selti-delivery.ru, imgur, ibb; needs httpx[http2])')
+    parser.add_argument('--no-page-cache', action='store_true',
+                        help="Don't cache HTML pages or browser renders in <output>/.cache")
+    parser.add_argument('--no-manifest', action='store_true',
+                        help="Don't read or update <output>/.manifest.sqlite (re-check everything)")
+    parser.add_argument('--sync', action='store_true',
+                        help='Kemono/Coomer: download only posts newer than the last --sync of that creator, without prompts')
+    parser.add_argument('--follow', action='store_true',
+                        help='Forum threads: fetch only pages and images added since the last --follow of that thread')
+    parser.add_argument('--near-duplicates', action='store_true',
+                        help='Forum threads and galleries: keep only the largest copy of visually identical images')
+    parser.add_argument('--object-store', action='store_true',
+                        help='Keep one copy of each file in <output>/.objects and hardlink it into album folders')
+    archive_mode = parser.add_mutually_exclusive_group()
+    archive_mode.add_argument('--record', metavar='FILE',
+                              help='Save every page, API response and browser render of this run to FILE')
+    archive_mode.add_argument('--replay', metavar='FILE',
+                              help='Serve pages from a --record archive: no network, no browser, no downloads')
     
     args = parser.parse_args()
     
+    rate_config = args.rate_config or 'rate_limits.json'
+    if os.path.exists(rate_config):
+        try:
+            RATE_LIMITER.load(rate_config)
+            print(f"⚙ Loaded rate limits from {rate_config}")
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠ Could not read rate limits from {rate_config}: {e}")
+    elif args.rate_config:
+        print(f"⚠ Rate limit file not found: {rate_config} (using defaults)")
+    if args.max_rate:
+        BANDWIDTH.configure(args.max_rate)
+        print(f"⚙ Total download speed capped at {format_size(args.max_rate)}/s")
+    RETRY_POLICY.budget = max(0, args.retry_budget)
+    if args.record or args.replay:
+        try:
+            ARCHIVE.open(args.record or args.replay, 'record' if args.record else 'replay')
+        except (OSError, sqlite3.Error) as e:
+            print(f"❌ Could not open the archive: {e}")
+            return
+        if args.replay:
+            # Replays must see exactly what was recorded, not what earlier runs left behind
+            args.no_manifest = args.no_page_cache = True
+            print(f"📼 Replaying {args.replay} (no network, nothing is downloaded)")
+        else:
+            print(f"📼 Recording to {args.record}")
+    if not args.no_manifest:
+        try:
+            MANIFEST.open(Path(args.output) / '.manifest.sqlite')
+        except sqlite3.Error as e:
+            print(f"⚠ Could not open the download manifest: {e} (continuing without it)")
+    if not args.no_page_cache:
+        try:
+            PAGE_CACHE.open(Path(args.output) / '.cache' / 'pages.sqlite')
+            RENDER_CACHE.open(Path(args.output) / '.cache' / 'rendered.sqlite')
+        except sqlite3.Error as e:
+            print(f"⚠ Could not open the page cache: {e} (continuing without it)")
+    if args.object_store:
+        try:
+            OBJECT_STORE.open(Path(args.output) / '.objects')
+        except OSError as e:
+            print(f"⚠ Could not open the object store: {e} (continuing without it)")
+    if args.sync and MANIFEST.db is None:
+        print("⚠ --sync keeps its state in the manifest, so every post will be checked")
+    if args.follow and MANIFEST.db is None:
+        print("⚠ --follow keeps its state in the manifest, so the whole thread will be fetched")
+    if args.http2:
+        if HTTP2_AVAILABLE:
+            RATE_LIMITER.enable_http2(HTTP2_HOSTS)
+            print(f"⚙ HTTP/2 enabled for {', '.join(HTTP2_HOSTS)}")
+        else:
+            print("⚠ --http2 needs httpx with HTTP/2 support: pip install httpx[http2] (using HTTP/1.1)")
+    
     # Interactive mode if no URL provided
     if not args.url:
         print("Choose scraper mode:")
@@ -4200,36 +7227,63 @@ async def main():
     # Run appropriate scraper
     if args.mode == 'kemono':
         print("🔧 Mode: Kemono Party Scraper\n")
-        scraper = KemonoScraper(output_dir=args.output)
+        scraper = KemonoScraper(output_dir=args.output, jobs=args.jobs, per_host=args.per_host,
+                                video_jobs=args.video_jobs, order=args.order,
+                                segments=args.segments, segment_threshold=args.segment_min, sync=args.sync)
         await scraper.scrape(args.url)    
     elif args.mode == 'pixhost':
         print("🔧 Mode: Pixhost Gallery Scraper\n")
-        scraper = PixhostScraper(output_dir=args.output)
+        scraper = PixhostScraper(output_dir=args.output, jobs=args.jobs, per_host=args.per_host,
+                                 video_jobs=args.video_jobs, order=args.order)
         scraper.download_gallery(args.url)
     elif args.mode == 'fapello':
         print("🔧 Mode: Fapello Scraper\n")
-        scraper = FapelloScraper(output_dir=args.output)
+        scraper = FapelloScraper(output_dir=args.output, jobs=args.jobs, per_host=args.per_host,
+                                 video_jobs=args.video_jobs, order=args.order)
         await scraper.scrape(args.url)
     elif args.mode == 'forum':
         print("🔧 Mode: Simpcity Forum Scraper\n")
-        downloader = ForumImageDownloader(output_dir=args.output, debug_mode=args.debug)
+        downloader = ForumImageDownloader(output_dir=args.output, debug_mode=args.debug,
+                                          jobs=args.jobs, per_host=args.per_host,
+                                          video_jobs=args.video_jobs, order=args.order, follow=args.follow,
+                                          near_duplicates=args.near_duplicates)
         downloader.download_images(args.url)
     elif args.mode == 'coomer':
         print("🔧 Mode: Coomer.st Scraper\n")
-        scraper = CoomerScraper(output_dir=args.output)
+        scraper = CoomerScraper(output_dir=args.output, jobs=args.jobs, per_host=args.per_host,
+                                video_jobs=args.video_jobs, order=args.order,
+                                segments=args.segments, segment_threshold=args.segment_min, sync=args.sync)
         await scraper.scrape(args.url)
     elif args.mode == 'gallery':
         print("🔧 Mode: Generic Gallery Scraper\n")
-        downloader = GenericGalleryDownloader(output_dir=args.output)
+        downloader = GenericGalleryDownloader(output_dir=args.output, jobs=args.jobs, per_host=args.per_host,
+                                              video_jobs=args.video_jobs, order=args.order,
+                                              near_duplicates=args.near_duplicates)
         downloader.download_images(args.url)
     else:
         print(f"🔧 Mode: Bunkr/Pixeldrain Scraper\n")
         scraper = UniversalScraper(
             output_dir=args.output,
-            pixeldrain_api_key=args.key
+            pixeldrain_api_key=args.key,
+            jobs=args.jobs,
+            per_host=args.per_host,
+            video_jobs=args.video_jobs,
+            order=args.order,
+            segments=args.segments,
+            segment_threshold=args.segment_min,
+            pixeldrain_zip=args.pixeldrain_zip
         )
         await scraper.scrape(args.url)
     
+    RETRY_POLICY.print_stats()
+    PAGE_CACHE.print_stats()
+    RENDER_CACHE.print_stats()
+    OBJECT_STORE.print_stats()
+    ARCHIVE.print_stats()
+    PAGE_CACHE.close()
+    RENDER_CACHE.close()
+    MANIFEST.close()
+    ARCHIVE.close()
     print()
     print("=" * 70)
     print("Complete!")